@@ -0,0 +1,108 @@
+""" bench_extract_items.py
+Benchmark: extraction of tracked items from raw movements
+(Scheduler._extract_items), with item IDs and first waypoints built row
+by row with DataFrame.apply (former behaviour) vs. column-wise.
+
+Usage: python -m benchmarks.bench_extract_items [--rows 1000000]
+"""
+
+import argparse
+from time import perf_counter
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmarks.synthetic import make_movements
+from product_trailer.scheduler import Scheduler
+
+
+def is_entry_point(mvts: pd.DataFrame) -> pd.Series:
+    return (mvts['Special Stock Ind Code'] == 'S0000') & (mvts['QTY'] < 0)
+
+
+def row_wise_extract_items(profile, raw_mvt: pd.DataFrame) -> pd.DataFrame:
+    """Former Scheduler._extract_items."""
+    ID_definition = ['Company', 'SLOC', 'Sold to', 'Mvt Code',
+                     'Posting Date', 'SKU', 'Batch']
+    company_features = ['Company', *profile.input['company_features']]
+    sku_features = ['SKU', *profile.input['sku_features']]
+    def build_ID(item):
+        return (
+            f"_{item['Company']}/{item['SLOC']}/{item['Sold to'][4:11]}_"
+            + f"{item['Mvt Code']}/{item['Posting Date']:%Y-%m-%d}_"
+            + f"{item['SKU']}:{item['Batch']}"
+        )
+    return (
+        raw_mvt.copy()
+        .pipe(lambda df: df.loc[profile.is_entry_point(df)])
+        .pivot_table(
+            observed=True,
+            values=['Unit_Value', 'QTY'],
+            aggfunc={'Unit_Value': 'mean','QTY': 'sum'},
+            index=ID_definition
+        )
+        .reset_index()
+        .assign(ID = lambda df: df.apply(build_ID, axis=1))
+        .merge(
+            raw_mvt.value_counts(company_features).reset_index()
+            [company_features].drop_duplicates(keep='first'), on='Company')
+        .merge(
+            raw_mvt.value_counts(sku_features).reset_index()
+            [sku_features].drop_duplicates(keep='first'), on='SKU')
+        .set_index('ID')
+        .assign(
+            Open = True,
+            QTY = lambda df: -df['QTY'],
+            Waypoints = lambda df: df.apply(
+                lambda row: [list(row.loc[Scheduler.DEF_WPT].values)],
+                axis=1
+            )
+        )
+        .rename(columns={
+            'Country': 'ini_country', 'SKU': 'sku', 'QTY': 'qty',
+            'Open': 'open', 'Waypoints': 'waypoints',
+            'Unit_Value': 'unit_value', 'Brand': 'brand',
+            'Category': 'category'
+        })
+        [['ini_country', 'sku', 'qty', 'open', 'waypoints', 'unit_value',
+          'brand', 'category']]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    mvts_per_sku = 20
+    mvts = make_movements(args.rows // mvts_per_sku, mvts_per_sku)
+    profile = SimpleNamespace(
+        input={'company_features': ['Country'],
+               'sku_features': ['Brand', 'Category']},
+        is_entry_point=is_entry_point,
+    )
+    print(f'{len(mvts)} movements, {is_entry_point(mvts).sum()} entry points')
+
+    start = perf_counter()
+    expected = row_wise_extract_items(profile, mvts)
+    row_wise_time = perf_counter() - start
+    print(f'Row-wise apply:  {row_wise_time:8.2f}s')
+
+    start = perf_counter()
+    items = Scheduler(profile)._extract_items(mvts)
+    columnar_time = perf_counter() - start
+    print(f'Column-wise:     {columnar_time:8.2f}s')
+    print(f'Speed-up: x{row_wise_time / columnar_time:.1f}')
+
+    identical = (
+        items.drop(columns='waypoints')
+        .equals(expected.drop(columns='waypoints'))
+        and items.index.equals(expected.index)
+        and repr(items['waypoints'].to_list())
+        == repr(expected['waypoints'].to_list())
+    )
+    print('Identical output:', identical)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+""" bench_long_route.py
+Stress benchmark: ForwardTracker._make_route on items travelling through
+hundreds to thousands of hops. Time and peak memory should grow linearly
+with the route length, and no route should hit the recursion limit.
+
+Usage: python -m benchmarks.bench_long_route [--hops 500 1000 2000 4000]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_route_movements
+from product_trailer.forwardtracker import ForwardTracker
+from product_trailer.item import Item
+from product_trailer.scheduler import Scheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hops', type=int, nargs='+',
+                        default=[500, 1000, 2000, 4000])
+    args = parser.parse_args()
+    print(f'Recursion limit: {sys.getrecursionlimit()}')
+
+    for n_hops in args.hops:
+        mvts = make_route_movements(n_hops)
+        item = Item(
+            id='_bench',
+            ini_country='SomeCountry',
+            sku='SKU',
+            qty=2,
+            open=True,
+            waypoints=[
+                [pd.NaT, '1000', 'NA', '', '', 'B1'],
+                [pd.Timestamp('2023-01-02'), '1000', 'S00000', np.nan, '632', 'B1']
+            ],
+            unit_value=10,
+            brand='SomeBrand',
+            category='SomeCategory'
+        )
+        tracemalloc.start()
+        start = perf_counter()
+        items = ForwardTracker(Scheduler.DEF_WPT, mvts)._make_route(item)
+        elapsed = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f'{n_hops:6d} hops: {len(items)} items, '
+            f'{max(len(i.waypoints) for i in items)} waypoints, '
+            f'{elapsed:7.2f}s ({n_hops / elapsed:5.0f} hops/s), '
+            f'peak memory {peak / 2**20:6.1f} MiB'
+        )
+
+
+if __name__ == '__main__':
+    main()
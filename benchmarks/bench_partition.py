@@ -0,0 +1,49 @@
+""" bench_partition.py
+Benchmark: selection of each task's movements in Scheduler.run, by
+filtering the whole table per SKU (former behaviour) vs. slicing the
+partitions built once in Scheduler.prepare.
+
+Usage: python -m benchmarks.bench_partition [--skus 50000] [--sample 500]
+"""
+
+import argparse
+from time import perf_counter
+
+from benchmarks.synthetic import make_movements
+from product_trailer.scheduler import Scheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--skus', type=int, default=50_000)
+    parser.add_argument('--mvts-per-sku', type=int, default=20)
+    parser.add_argument('--sample', type=int, default=500,
+                        help='Tasks timed with the full-scan method')
+    args = parser.parse_args()
+
+    mvts = make_movements(args.skus, args.mvts_per_sku)
+    tasklist = list(mvts['SKU'].unique())
+    print(f'{len(mvts)} movements, {len(tasklist)} SKUs')
+
+    # Former behaviour: one full-table scan per task. Timed on a sample of
+    # tasks and extrapolated, as the full loop takes minutes.
+    sample = tasklist[:args.sample]
+    start = perf_counter()
+    for task in sample:
+        mvts.loc[(mvts['SKU'] == task)]
+    scan_time = (perf_counter() - start) * len(tasklist) / len(sample)
+    print(f'Full scan per task:  {scan_time:8.2f}s (extrapolated)')
+
+    scheduler = Scheduler(profile=None)
+    scheduler.mvts = mvts
+    start = perf_counter()
+    scheduler._partition_mvts()
+    for task in tasklist:
+        scheduler._task_mvts(task)
+    partition_time = perf_counter() - start
+    print(f'Partitioned slices:  {partition_time:8.2f}s')
+    print(f'Speed-up: x{scan_time / partition_time:.0f}')
+
+
+if __name__ == '__main__':
+    main()
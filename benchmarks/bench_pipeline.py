@@ -0,0 +1,149 @@
+""" bench_pipeline.py
+Benchmark suite: time of the stages of a run (import_movements,
+Scheduler.prepare, Scheduler.run, postprocess) on synthetic raw extracts
+of increasing size (benchmarks.synthetic.make_raw_extract), with a
+throwaway profile using the default configuration.
+
+Each measure is appended to benchmarks/results.jsonl with the commit
+measured, so that timings can be compared across commits (--history).
+
+Usage: python -m benchmarks.bench_pipeline [--rows 10000 100000 1000000
+           10000000] [--workers 1] [--no-postprocess] [--history]
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw_extract, write_raw_extract
+from product_trailer.profile import Profile
+from product_trailer.scheduler import Scheduler
+
+
+RESULTS_PATH = Path(__file__).parent / 'results.jsonl'
+PROFILE_NAME = 'bench_pipeline'
+STAGES = ['import_movements', 'prepare', 'run', 'postprocess']
+
+
+def run_pipeline(
+    raw_path: Path, workers: int, postprocess: bool = True
+) -> dict:
+    """Seconds per stage, for one raw file tracked by a new profile."""
+    shutil.rmtree(Path('profiles') / PROFILE_NAME, ignore_errors=True)
+    profile = Profile(PROFILE_NAME)
+    profile.scheduler_config['workers'] = workers
+    profile.scheduler_config['checkpoint_interval'] = 0
+    seconds = {}
+    try:
+        start = perf_counter()
+        raw_mvt = profile.import_movements(str(raw_path))
+        seconds['import_movements'] = perf_counter() - start
+
+        profile.incr_run_count()
+        scheduler = Scheduler(profile)
+        start = perf_counter()
+        scheduler.prepare(raw_mvt)
+        seconds['prepare'] = perf_counter() - start
+
+        start = perf_counter()
+        all_items, _ = scheduler.run()
+        seconds['run'] = perf_counter() - start
+
+        if postprocess:
+            profile.save_items(all_items)
+            items = profile.fetch_items()
+            start = perf_counter()
+            profile.postprocess(items)
+            seconds['postprocess'] = perf_counter() - start
+        seconds['items'] = len(all_items)
+    finally:
+        shutil.rmtree(Path('profiles') / PROFILE_NAME, ignore_errors=True)
+    return seconds
+
+
+def git_commit() -> str:
+    """Short hash of HEAD, '+' if the working tree has changes."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('+' if dirty else '')
+
+
+def save_result(result: dict) -> None:
+    with open(RESULTS_PATH, 'a') as write_file:
+        write_file.write(json.dumps(result) + '\n')
+
+
+def print_history() -> None:
+    """Seconds per stage, by commit (in order of first measure) and rows."""
+    if not RESULTS_PATH.is_file():
+        print(f'No results in {RESULTS_PATH}.')
+        return
+    results = pd.read_json(RESULTS_PATH, lines=True)
+    commits = list(dict.fromkeys(results['commit']))
+    history = (
+        results
+        .groupby(['rows', 'commit'], sort=False)[
+            [stage for stage in STAGES if stage in results.columns]
+        ]
+        .last()
+        .reset_index()
+        .assign(commit=lambda df: pd.Categorical(df['commit'], commits))
+        .sort_values(['rows', 'commit'])
+        .set_index(['rows', 'commit'])
+    )
+    print(history.round(2).to_string())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--no-postprocess', default=False, action='store_true')
+    parser.add_argument('--history', default=False, action='store_true')
+    args = parser.parse_args()
+
+    if args.history:
+        print_history()
+        return
+
+    commit = git_commit()
+    print(f'Commit {commit}, {args.workers} worker(s)')
+    print(f"{'rows':>10} " + ' '.join(f'{stage:>16}' for stage in STAGES))
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            raw_path = Path(tmpdir) / 'Extract log synthetic.csv'
+            write_raw_extract(make_raw_extract(rows), raw_path)
+            seconds = run_pipeline(
+                raw_path, args.workers, not args.no_postprocess
+            )
+        print(f'{rows:>10} ' + ' '.join(
+            f'{seconds[stage]:>15.2f}s' if stage in seconds else f'{"-":>16}'
+            for stage in STAGES
+        ), f"  ({seconds.pop('items')} items)")
+        save_result({
+            'commit': commit,
+            'date': datetime.today().isoformat(timespec='seconds'),
+            'rows': rows,
+            'workers': args.workers,
+            **seconds,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+""" bench_prep_mvt.py
+Benchmark: time and peak memory (tracemalloc) of movements preparation
+(Scheduler._prep_mvt), with row-wise set and key creation (former
+behaviour) vs. columnar.
+
+Usage: python -m benchmarks.bench_prep_mvt [--rows 1000000]
+"""
+
+import argparse
+import tracemalloc
+from time import perf_counter
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmarks.synthetic import make_movements
+from product_trailer.scheduler import Scheduler
+
+
+def row_wise_prep_mvt(profile, tasklist, new_raw_mvt: pd.DataFrame):
+    """Former Scheduler._prep_mvt."""
+    return (
+        new_raw_mvt.loc[new_raw_mvt['SKU'].isin(tasklist)]
+        .copy()
+        .drop(
+            columns=[
+                *profile.input['company_features'],
+                *profile.input['sku_features'],
+                'Special Stock Ind Code',
+                'Unit_Value',
+            ]
+        )
+        .assign(
+            QTY_Unallocated=lambda df: df['QTY'].apply(abs),
+            Items_Allocated=lambda df: df.apply(
+                lambda _: set(), result_type='reduce', axis=1
+            ),
+            Company_SLOC_Batch=lambda df: df[['Company', 'SLOC', 'Batch']].apply(
+                lambda row: '-'.join(row), axis=1
+            ),
+        )
+    )
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    result = func(*args)
+    seconds = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    mvts_per_sku = 20
+    mvts = make_movements(args.rows // mvts_per_sku, mvts_per_sku)
+    profile = SimpleNamespace(input={
+        'company_features': ['Country'], 'sku_features': ['Brand', 'Category']
+    })
+    scheduler = Scheduler(profile)
+    scheduler.tasklist = list(mvts['SKU'].unique())
+    print(f'{len(mvts)} movements, '
+          f'input table {mvts.memory_usage(deep=True).sum() / 1e6:.0f} MB')
+
+    expected, old_time, old_peak = measure(
+        row_wise_prep_mvt, profile, scheduler.tasklist, mvts
+    )
+    old_size = expected.memory_usage(deep=True).sum() / 1e6
+    print(f'Row-wise: {old_time:7.2f}s  peak {old_peak:7.0f} MB  '
+          f'result {old_size:5.0f} MB')
+    del expected
+
+    prepared, new_time, new_peak = measure(scheduler._prep_mvt, mvts)
+    new_size = prepared.memory_usage(deep=True).sum() / 1e6
+    print(f'Columnar: {new_time:7.2f}s  peak {new_peak:7.0f} MB  '
+          f'result {new_size:5.0f} MB')
+    print(f'Speed-up: x{old_time / new_time:.1f}, '
+          f'peak memory: x{old_peak / new_peak:.1f} lower')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+""" bench_report.py
+Benchmark: outputs of the default postprocessing, summary sheet
+(postprocessing_tk.make_standard_report), details sheet
+(make_exportable_hist) and stock moves between companies
+(collect_stock_move), computed item by item or waypoint by waypoint with
+DataFrame.apply (former behaviour) vs. on the flat waypoint table. Both
+outputs are checked to be identical.
+
+Usage: python -m benchmarks.bench_report [--items 10000 100000 1000000]
+"""
+
+import argparse
+import functools
+from itertools import groupby
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_items
+from product_trailer.item_table import ItemTable
+from product_trailer.postprocessing_tk import (
+    collect_stock_move, make_exportable_hist, make_standard_report
+)
+
+
+def row_wise_standard_report(tracked_items: pd.DataFrame) -> pd.DataFrame:
+    """Former make_standard_report."""
+    def make_features(item):
+        wpts = item['waypoints']
+        list_companies = [i[0] for i in groupby(np.array(wpts)[:,1])]
+        return {
+            'Route': ' > '.join(list(map('.'.join, np.array(wpts)[:, 1:3]))),
+            'DCs': list_companies,
+            'Return_Date': wpts[1][0],
+            'Return_Month': wpts[1][0].strftime('%Y/%m'),
+            'Company(first)': wpts[0][1],
+            'SLOC(first)': wpts[0][2],
+            'SoldTo(first)': wpts[0][3],
+            'Company(last)': wpts[-1][1],
+            'SLOC(last)': wpts[-1][2],
+            'SoldTo(last)': wpts[-1][3],
+            'Num_Steps': len(wpts),
+            'Num_Companies': len(list_companies)
+        }
+    new_cols = tracked_items[['waypoints']].apply(make_features,
+                                                  axis=1, result_type='expand')
+    ti = pd.concat([tracked_items, new_cols], axis='columns')
+
+    item_max_date = max(ti['waypoints'].apply(lambda wpts: np.array(wpts)[-1,0]))
+    ti['Num_Days_Open'] = np.where(
+        ti['open'].fillna(False),
+        item_max_date - ti['Return_Date'],
+        ti['waypoints'].apply(lambda wpts: wpts[-1][0]) - ti['Return_Date']
+    )
+
+    ti['Return_Date'] = ti['Return_Date'].dt.strftime('%Y-%m-%d')
+    ti['DCs'] = ti['DCs'].apply(lambda DCs: ' > '.join(DCs))
+    def decorate_wpts(wpts):
+        return '  >>>  '.join(
+            [', '.join(map(str, ['-', *wpts[0][1:]]))]
+            + list(map(
+                lambda x: ', '.join(map(str, [x[0].strftime('%Y-%m-%d'), *x[1:]])),
+                wpts[1:]
+                ))
+            )
+    ti['waypoints'] = ti['waypoints'].apply(lambda wpts: decorate_wpts(wpts))
+    return ti.reset_index()
+
+
+def row_wise_exportable_hist(tracked_Items: pd.DataFrame) -> pd.DataFrame:
+    """Former make_exportable_hist."""
+    tobe_rtn = (
+        tracked_Items
+        .explode('waypoints')
+        .reset_index(names='id')
+        .assign(WaypointNo = lambda df_: 1+df_.groupby('id').cumcount(),
+                Landing_Date = lambda df_: df_['waypoints'].apply(lambda row: row[0]),
+                Landing_Code = lambda df_: df_['waypoints'].apply(lambda row: row[3]),
+                SLOC = lambda df_: df_['waypoints'].apply(lambda row: row[1]),
+                Soldto = lambda df_: df_['waypoints'].apply(lambda row: row[2]),
+                Batch_ = lambda df_: df_['waypoints'].apply(lambda row: row[4]),
+                Depart_Date = lambda df_: df_.groupby('id')['Landing_Date'].shift(-1))
+        .drop(columns=['waypoints'])
+    )
+    tobe_rtn['Landing_Date'] = tobe_rtn.apply(
+        lambda row: np.nan if row['WaypointNo']==1 else row['Landing_Date'],
+        axis=1
+        )
+    tobe_rtn['Landing_Code'] = tobe_rtn.apply(
+        lambda row: np.nan if row['WaypointNo']==1 else row['Landing_Code'],
+        axis=1
+        )
+    return tobe_rtn
+
+
+def row_wise_collect_stock_move(df: pd.DataFrame, node_level: str) -> dict:
+    """Former collect_stock_move."""
+    stock_move = dict()
+    def node_name(wpt, node_level):
+            if node_level == 'company':
+                return wpt[1]
+    node_name = functools.partial(node_name, node_level=node_level)
+
+    def assign_move(series):
+        qty = series['qty']
+        wpts = series['waypoints']
+        
+        for i, wpt in enumerate(wpts):
+            if i == 0:
+                continue
+            node_from, node_to = node_name(wpts[i-1]), node_name(wpt)
+            if node_from != node_to:
+                move_name = node_from + '-' + node_to
+                if move_name in stock_move.keys():
+                    stock_move[move_name][2] += qty
+                else:
+                    stock_move[move_name] = [node_from, node_to, qty]
+    
+    df.apply(assign_move, axis=1)
+    return stock_move
+
+
+def measure(func, row_wise_func, items: pd.DataFrame) -> list:
+    """Seconds of row_wise_func and func, from items and from an ItemTable,
+    and whether outputs are identical."""
+    start = perf_counter()
+    expected = row_wise_func(items)
+    row_wise = perf_counter() - start
+
+    start = perf_counter()
+    result = func(items)
+    columnar = perf_counter() - start
+
+    table = ItemTable.from_frame(items)
+    start = perf_counter()
+    func(table)
+    from_table = perf_counter() - start
+
+    if isinstance(expected, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(result, expected)
+            identical = True
+        except AssertionError:
+            identical = False
+    else:
+        identical = (
+            result == expected and list(result) == list(expected)
+        )
+    return [row_wise, columnar, from_table, identical]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, nargs='+',
+                        default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'sheet':>8} {'items':>10} {'row-wise':>10} {'columnar':>10} "
+          f"{'from table':>10}  identical")
+    for n_items in args.items:
+        items = make_items(n_items)
+        for sheet, func, row_wise_func in [
+            ('summary', make_standard_report, row_wise_standard_report),
+            ('details', make_exportable_hist, row_wise_exportable_hist),
+            (
+                'moves',
+                functools.partial(collect_stock_move, node_level='company'),
+                functools.partial(
+                    row_wise_collect_stock_move, node_level='company'
+                )
+            ),
+        ]:
+            row_wise, columnar, from_table, identical = measure(
+                func, row_wise_func, items
+            )
+            print(f'{sheet:>8} {n_items:>10} {row_wise:>9.2f}s '
+                  f'{columnar:>9.2f}s {from_table:>9.2f}s  {identical}')
+
+
+if __name__ == '__main__':
+    main()
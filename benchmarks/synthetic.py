@@ -0,0 +1,360 @@
+""" synthetic.py
+Synthetic movement extracts for benchmarks:
+- make_movements, make_route_movements: shaped like the output of the
+  default profile's import_movements (random rows, one long route)
+- make_raw_extract: raw extract, as read by import_movements, made of
+  products journeys through the supply chain: consignment returns (entry
+  points 632/932/956), transfers (311), sold-to changes (956/955), batch
+  changes (702/701), POs in two parts (641 then 101, sometimes missing),
+  consignment fill-ups (631), consumption, sales and scrapping (633, 601,
+  551), plus unrelated receipts and sales. SKU sizes are skewed: a few SKUs
+  get most journeys, as in real extracts.
+- make_items: tracked items, shaped like the items database, for
+  postprocessing benchmarks
+
+Functions:
+    make_movements
+    make_route_movements
+    make_raw_extract
+    write_raw_extract
+    make_items
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def make_movements(
+    n_skus: int, mvts_per_sku: int = 20, seed: int = 0
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_rows = n_skus * mvts_per_sku
+
+    def categorical(prefix, n_values, size=n_rows):
+        return from_codes(prefix, rng.integers(0, n_values, size), n_values)
+
+    def from_codes(prefix, codes, n_values):
+        categories = [f'{prefix}{i:04d}' for i in range(n_values)]
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    # Country depends on company, brand and category on SKU, as in extracts
+    company_codes = rng.integers(0, 20, n_rows)
+    sku_codes = rng.integers(0, n_skus, n_rows)
+    mvts = pd.DataFrame({
+        'Posting Date': (
+            pd.Timestamp('2023-01-02')
+            + pd.to_timedelta(rng.integers(0, 90, n_rows), unit='D')
+        ),
+        'Company': from_codes('C', company_codes, 20),
+        'Country': from_codes('K', company_codes % 15, 15),
+        'Document': rng.integers(0, n_rows, n_rows).astype(str).astype(object),
+        'PO': pd.Categorical(['-2'] * n_rows),
+        'Special Stock Ind Code': categorical('S', 3),
+        'Mvt Code': categorical('M', 40),
+        'SLOC': categorical('L', 50),
+        'Sold to': categorical('T', 1000),
+        'Brand': from_codes('B', sku_codes % 5, 5),
+        'Category': from_codes('G', sku_codes % 100, 100),
+        'SKU': pd.Categorical.from_codes(
+            sku_codes, categories=[f'SKU{i:07d}' for i in range(n_skus)]
+        ),
+        'Batch': rng.integers(0, 500, n_rows).astype(str).astype(object),
+        'QTY': rng.choice([-3, -2, -1, 1, 2, 3], n_rows),
+        'Unit_Value': rng.random(n_rows).astype('float32') * 100,
+    })
+    return mvts.sort_values(
+        by=['Posting Date', 'QTY'], ascending=[True, False]
+    )
+
+
+def make_route_movements(n_hops: int, qty: int = 2) -> pd.DataFrame:
+    """Prepared movements (as given to ForwardTracker) moving a product
+    through n_hops storage locations with 311 transfers. Halfway, the
+    product lands with two increments, so that two items share the first
+    half of the route."""
+    rows = []
+    for hop in range(n_hops):
+        date = pd.Timestamp('2023-01-02') + pd.Timedelta(days=hop // 10)
+        base = [date, '1000', f'DOC{hop:05d}', '-2', '311']
+        rows.append(base + [f'S{hop:05d}', '', 'SKU', 'B1', -qty])
+        incr_qties = [qty // 2, qty - qty // 2] if hop == n_hops // 2 else [qty]
+        for incr_qty in incr_qties:
+            rows.append(base + [f'S{hop + 1:05d}', '', 'SKU', 'B1', incr_qty])
+    mvts = pd.DataFrame(rows, columns=[
+        'Posting Date', 'Company', 'Document', 'PO', 'Mvt Code', 'SLOC',
+        'Sold to', 'SKU', 'Batch', 'QTY'
+    ])
+    return mvts.assign(
+        Company_SLOC_Batch=(
+            mvts['Company'] + '-' + mvts['SLOC'] + '-' + mvts['Batch']
+        )
+    )
+
+
+RAW_COLUMNS = [
+    'Posting Date', 'Company', 'Country ISO Code', 'Material Document Number',
+    'Purchase Order Document Number', 'Special Stock Ind Code',
+    'Movement Type Code', 'Storage Location Code', 'Sold to Customer',
+    'Material Type Code', 'Brand', 'Category', 'Material', 'Batch No', 'QTY',
+    'Standard Price'
+]
+NO_SOLDTO = 0  # Sold to of internal movements: '0000000000'
+CONSIGNMENT = -1  # SLOC code of consignment stock (empty in extracts)
+
+
+def make_raw_extract(
+    n_rows: int,
+    n_skus: int | None = None,
+    n_companies: int = 8,
+    n_slocs: int = 20,
+    n_customers: int = 2000,
+    seed: int = 0
+) -> pd.DataFrame:
+    """About n_rows movements (exactly n_rows, unless journeys alone need
+    more), 100 per SKU on average by default."""
+    rng = np.random.default_rng(seed)
+    n_skus = n_skus or max(1, n_rows // 100)
+    n_journeys = max(1, int(0.8 * n_rows / 7))
+    rows = _Rows()
+
+    sku_weights = 1 / np.arange(1, n_skus + 1) ** 0.8
+    sku = rng.choice(n_skus, n_journeys, p=sku_weights / sku_weights.sum())
+    batch = np.arange(n_journeys)
+    next_batch = n_journeys
+    company = rng.integers(0, n_companies, n_journeys)
+    sloc = np.full(n_journeys, CONSIGNMENT)
+    soldto = rng.integers(1, n_customers + 1, n_journeys)
+    qty = rng.integers(1, 4, n_journeys)
+    date = rng.integers(0, 300, n_journeys)
+
+    # Entry point: return from consignment, or change of sold-to
+    idx = np.arange(n_journeys)
+    sold_to_change = rng.random(n_journeys) < 0.15
+    ret = idx[~sold_to_change]
+    mvt = rng.choice([632, 932], len(ret), p=[0.8, 0.2])
+    doc = rows.docs(len(ret))
+    new_sloc = rng.integers(0, n_slocs, len(ret))
+    rows.add(date[ret], company[ret], doc, mvt, CONSIGNMENT, soldto[ret],
+             sku[ret], batch[ret], -qty[ret])
+    rows.add(date[ret], company[ret], doc, mvt, new_sloc, soldto[ret],
+             sku[ret], batch[ret], qty[ret])
+    sloc[ret] = new_sloc
+    chg = idx[sold_to_change]
+    new_soldto = rng.integers(1, n_customers + 1, len(chg))
+    rows.add(date[chg], company[chg], rows.docs(len(chg)), 956, CONSIGNMENT,
+             soldto[chg], sku[chg], batch[chg], -qty[chg])
+    rows.add(date[chg], company[chg], rows.docs(len(chg)), 955, CONSIGNMENT,
+             new_soldto, sku[chg], batch[chg], qty[chg])
+    soldto[chg] = new_soldto
+
+    # Hops, until the product is sold, consumed or scrapped
+    active = idx
+    while len(active) > 0:
+        date[active] += rng.integers(0, 10, len(active))
+        at_customer = sloc[active] == CONSIGNMENT
+        hop = np.where(
+            at_customer,
+            rng.choice(['return', 'consume', 'soldto'], len(active),
+                       p=[0.4, 0.45, 0.15]),
+            rng.choice(['transfer', 'batch', 'po', 'fillup', 'sale', 'scrap'],
+                       len(active), p=[0.3, 0.1, 0.15, 0.2, 0.2, 0.05])
+        )
+        ended = np.isin(hop, ['consume', 'sale', 'scrap'])
+
+        # [-] movement of every hop
+        out_mvt = pd.Series(hop).map({
+            'return': 632, 'consume': 633, 'soldto': 956, 'transfer': 311,
+            'batch': 702, 'po': 641, 'fillup': 631, 'sale': 601, 'scrap': 551
+        }).to_numpy()
+        doc = rows.docs(len(active))
+        po = np.where(hop == 'po', rows.docs(len(active)), -2)
+        a = active
+        rows.add(date[a], company[a], doc, out_mvt, sloc[a],
+                 np.where(at_customer | np.isin(hop, ['sale', 'fillup']), soldto[a],
+                          NO_SOLDTO),
+                 sku[a], batch[a], -qty[a], po)
+
+        # [+] movement, same document unless said otherwise
+        sel = np.isin(hop, ['return', 'transfer', 'fillup', 'batch'])
+        b = a[sel]
+        in_sloc = np.where(
+            hop[sel] == 'fillup', CONSIGNMENT,
+            np.where(hop[sel] == 'batch', sloc[b],
+                     rng.integers(0, n_slocs, len(b)))
+        )
+        in_batch = batch[b].copy()
+        new_batches = hop[sel] == 'batch'
+        in_batch[new_batches] = np.arange(
+            next_batch, next_batch + new_batches.sum()
+        )
+        next_batch += new_batches.sum()
+        in_soldto = np.where(
+            (hop[sel] == 'return') | (hop[sel] == 'fillup'),
+            soldto[b], NO_SOLDTO
+        )
+        rows.add(date[b], company[b], doc[sel],
+                 np.where(hop[sel] == 'batch', 701, out_mvt[sel]), in_sloc,
+                 in_soldto, sku[b], in_batch, qty[b])
+        sloc[b], batch[b] = in_sloc, in_batch
+
+        c = a[hop == 'soldto']
+        new_soldto = rng.integers(1, n_customers + 1, len(c))
+        rows.add(date[c], company[c], rows.docs(len(c)), 955, CONSIGNMENT,
+                 new_soldto, sku[c], batch[c], qty[c])
+        soldto[c] = new_soldto
+
+        # PO: received a few days later by another company, 10% never
+        is_po = hop == 'po'
+        received = is_po & (rng.random(len(active)) < 0.9)
+        d = a[received]
+        date[d] += rng.integers(1, 6, len(d))
+        company[d] = (company[d] + 1 + rng.integers(0, n_companies - 1, len(d))
+                      ) % n_companies if n_companies > 1 else company[d]
+        sloc[d] = rng.integers(0, n_slocs, len(d))
+        rows.add(date[d], company[d], rows.docs(len(d)), 101, sloc[d],
+                 NO_SOLDTO, sku[d], batch[d], qty[d], po[received])
+        ended |= is_po & ~received
+        active = active[~ended]
+
+    # Unrelated receipts and sales
+    n_noise = max(0, n_rows - rows.count)
+    noise_sku = rng.choice(n_skus, n_noise, p=sku_weights / sku_weights.sum())
+    noise_qty = rng.integers(1, 4, n_noise)
+    receipt = rng.random(n_noise) < 0.5
+    rows.add(rng.integers(0, 320, n_noise), rng.integers(0, n_companies, n_noise),
+             rows.docs(n_noise), np.where(receipt, 101, 601),
+             rng.integers(0, n_slocs, n_noise),
+             np.where(receipt, NO_SOLDTO,
+                      rng.integers(1, n_customers + 1, n_noise)),
+             noise_sku, next_batch + rng.integers(0, n_noise + 1, n_noise),
+             np.where(receipt, noise_qty, -noise_qty))
+    return rows.to_frame(n_skus, n_companies, seed)
+
+
+def write_raw_extract(extract: pd.DataFrame, fpath) -> None:
+    """As a .csv file readable by the default profile's import_movements."""
+    extract.to_csv(fpath, index=False, date_format='%d/%m/%Y')
+
+
+def make_items(
+    n_items: int, mean_steps: float = 4, seed: int = 0
+) -> pd.DataFrame:
+    """Items database: mean_steps waypoints per item on average (at least
+    2, the first one without date) through random companies and SLOCs,
+    some with a missing sold-to."""
+    rng = np.random.default_rng(seed)
+    lengths = 2 + rng.poisson(max(0, mean_steps - 2), n_items)
+    n_wpts = int(lengths.sum())
+    starts = np.cumsum(lengths) - lengths
+    first = np.zeros(n_wpts, dtype=bool)
+    first[starts] = True
+    dates = (
+        pd.Timestamp('2023-01-02')
+        + pd.to_timedelta(
+            np.cumsum(rng.integers(0, 10, n_wpts)) % 365, unit='D'
+        )
+    ).astype(object).to_numpy()
+    dates[first] = pd.NaT
+    soldto = _labels(rng.integers(0, 2000, n_wpts), 'T{:06d}').astype(object)
+    soldto[rng.random(n_wpts) < 0.3] = np.nan
+    fields = [
+        dates,
+        _labels(rng.integers(0, 8, n_wpts), '{:d}000').astype(object),
+        _labels(rng.integers(0, 20, n_wpts), 'L{:03d}').astype(object),
+        soldto,
+        rng.choice(['632', '311', '601', '631', '955'], n_wpts).astype(object),
+        _labels(rng.integers(0, 500, n_wpts), 'B{:03d}').astype(object),
+    ]
+    wpts = [list(wpt) for wpt in zip(*fields)]
+    bounds = np.append(starts, n_wpts).tolist()
+    return pd.DataFrame({
+        'ini_country': _labels(rng.integers(0, 8, n_items), 'K{:d}'),
+        'sku': _labels(rng.integers(0, n_items // 10 + 1, n_items), 'SKU{:07d}'),
+        'qty': rng.integers(1, 4, n_items),
+        'open': rng.choice(
+            np.array([True, False, np.nan], dtype=object), n_items
+        ),
+        'waypoints': [
+            wpts[start:end] for start, end in zip(bounds[:-1], bounds[1:])
+        ],
+        'unit_value': rng.random(n_items) * 100,
+        'brand': _labels(rng.integers(0, 5, n_items), 'B{:d}'),
+        'category': _labels(rng.integers(0, 100, n_items), 'G{:d}'),
+    }, index=pd.Index([f'_item{i:08d}' for i in range(n_items)], name='id'))
+
+
+class _Rows:
+    """Columns of the raw extract being generated, as integer codes."""
+    FIELDS = ['date', 'company', 'doc', 'mvt', 'sloc', 'soldto', 'sku',
+              'batch', 'qty', 'po']
+
+    def __init__(self) -> None:
+        self.parts = {field: [] for field in _Rows.FIELDS}
+        self.count = 0
+        self.next_doc = 0
+
+    def docs(self, n: int) -> np.ndarray:
+        self.next_doc += n
+        return np.arange(self.next_doc - n, self.next_doc)
+
+    def add(self, date, company, doc, mvt, sloc, soldto, sku, batch, qty,
+            po=-2) -> None:
+        n = len(date)
+        for field, values in zip(
+            _Rows.FIELDS,
+            [date, company, doc, mvt, sloc, soldto, sku, batch, qty, po]
+        ):
+            self.parts[field].append(np.broadcast_to(values, n))
+        self.count += n
+
+    def to_frame(self, n_skus: int, n_companies: int, seed: int) -> pd.DataFrame:
+        col = {
+            field: np.concatenate(parts) for field, parts in self.parts.items()
+        }
+        consignment = col['sloc'] == CONSIGNMENT
+        sku_codes = col['sku']
+        companies = [str(1000 + 100 * i) for i in range(n_companies)]
+        countries = ['DE', 'FR', 'GB', 'ES', 'IT', 'NL', 'BE', 'PL']
+        prices = np.random.default_rng(seed).integers(10, 600, n_skus) / 2
+        extract = pd.DataFrame({
+            'Posting Date': (
+                pd.Timestamp('2023-01-02')
+                + pd.to_timedelta(col['date'], unit='D')
+            ),
+            'Company': pd.Categorical.from_codes(
+                col['company'], categories=companies
+            ),
+            'Country ISO Code': pd.Categorical.from_codes(
+                col['company'] % len(countries), categories=countries
+            ),
+            'Material Document Number': _labels(col['doc'], '81{:08d}'),
+            'Purchase Order Document Number': _labels(col['po'], '90{:08d}'),
+            'Special Stock Ind Code': np.where(consignment, 'K', None),
+            'Movement Type Code': _labels(col['mvt'], '{}'),
+            'Storage Location Code': np.where(
+                consignment, None, _labels(np.maximum(col['sloc'], 0), '{:05d}')
+            ),
+            'Sold to Customer': _labels(col['soldto'], '{:010d}'),
+            'Material Type Code': 'FERT',
+            'Brand': pd.Categorical.from_codes(
+                sku_codes % 5, categories=['Alpha', 'Bravo', 'Charlie',
+                                           'Delta', 'Echo']
+            ),
+            'Category': _labels(sku_codes % 30, 'Category {}'),
+            'Material': _labels(sku_codes, 'M{:07d}'),
+            'Batch No': _labels(col['batch'], 'B{:09d}'),
+            'QTY': col['qty'],
+            'Standard Price': prices[sku_codes],
+        })
+        return extract.sort_values('Posting Date', kind='stable')[RAW_COLUMNS]
+
+
+def _labels(codes: np.ndarray, fmt: str) -> np.ndarray:
+    """Text of integer codes, formatted once per distinct code. Code -2:
+    '-2' (no PO)."""
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    text = np.array(
+        ['-2' if code == -2 else fmt.format(code) for code in uniques.tolist()],
+        dtype=object
+    )
+    return text[inverse]
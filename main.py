@@ -4,8 +4,12 @@ Called upon starting program.
 """
 
 import argparse
+import cProfile
+from datetime import datetime
+
 from product_trailer.scheduler import Scheduler
 from product_trailer.profile import Profile
+from product_trailer.instrumentation import RunTimer, save_hot_paths
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -18,6 +22,13 @@ def main() -> None:
     parser.add_argument('-p', '--raw-prefix', default='Extract log')
     parser.add_argument('-ne', '--no-excel-report',
                         default=False, action='store_true')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-b', '--batch', type=int, default=1)
+    parser.add_argument('--resume', default=False, action='store_true')
+    parser.add_argument('--profile-hot-paths',
+                        default=False, action='store_true')
+    parser.add_argument('--migrate-storage',
+                        default=False, action='store_true')
     args = parser.parse_args()
 
 
@@ -27,33 +38,99 @@ def main() -> None:
               'Characters allowed (max 30): a-z, A-Z, 0-9, -_.,()')
     else:
         profile = Profile(args.profile_name)
+        if args.workers is not None:
+            profile.scheduler_config['workers'] = args.workers
+        if args.migrate_storage:
+            migrated = profile.migrate_storage()
+            print(f'Converted {len(migrated)} pickle file(s) to storage',
+                  f"'{profile.db_config.get('storage', 'pickle')}'.",
+                  'Originals moved to', profile.data_path / 'pickle_backup')
+            print('\n' + ' Program finished '.center(80, '#'), end='\n\n\n')
+            return
+        timer = RunTimer()
+        profiler = cProfile.Profile() if args.profile_hot_paths else None
+        if profiler is not None:
+            profiler.enable()
         unprocessed_raw_files = profile.find_unread(
             args.raw_dir,
             args.raw_prefix
         )
         print(f'Detected {len(unprocessed_raw_files)} file(s) not processed.')
-        for fpath in unprocessed_raw_files:
+        if len(set(profile.interrupted_batch()) & set(unprocessed_raw_files)):
+            print('Resuming the interrupted batch first.')
+        for batch in make_batches(
+            unprocessed_raw_files, profile.interrupted_batch(), args.batch
+        ):
+            profile.start_batch(batch)
             profile.incr_run_count()
-            print(f'File: {fpath}', end='')
-            new_raw_mvt = profile.import_movements(fpath)
-            scheduler = Scheduler(profile)
-            scheduler.prepare(new_raw_mvt)
-            all_items, mvts_done = scheduler.run()
-            print('Saved %s items' % all_items.shape[0])
-            profile.save_items(all_items)
-            profile.add_read(fpath)
-            profile.save_movements(mvts_done)
+            print(f"File{'s' if len(batch) > 1 else ''}: {', '.join(batch)}",
+                  end='')
+            with timer.stage('import'):
+                new_raw_mvt = profile.import_batch(batch)
+            if 'ingest' in new_raw_mvt.attrs:
+                stats = new_raw_mvt.attrs['ingest']
+                print(' (%s rows, %.0f rows/s%s)' % (
+                    stats['rows'],
+                    stats['rows_per_s'],
+                    ', cached' if stats['cached'] else ''
+                ), end='')
+            for reason, num in new_raw_mvt.attrs.get('rejected_rows', {}).items():
+                if num > 0:
+                    print(f' ({num} rows rejected: {reason})', end='')
+            scheduler = Scheduler(profile, timer)
+            report = scheduler.prepare(new_raw_mvt)
+            if 'incremental' in report:
+                print('\n' + report['incremental'], end='')
+            all_items, mvts_done = scheduler.run(resume=args.resume)
+            if scheduler.num_resumed > 0:
+                print('%s SKU(s) resumed from checkpoint. ' % scheduler.num_resumed,
+                      end='')
+            if profile.item_store is not None:  # Closed items not re-read
+                print('Saved %s open/updated items' % len(all_items))
+            else:
+                print('Saved %s items' % len(all_items))
+            with timer.stage('save'):
+                profile.save_items(all_items)
+                profile.save_movements(mvts_done)
+            profile.end_batch()
         
         # Post-processing
         if not args.no_excel_report:
             print('\nPost-processing... ', end='')
-            tracked_items = profile.fetch_items()
-            profile.postprocess(tracked_items)
+            with timer.stage('postprocess'):
+                tracked_items = profile.fetch_items()
+                profile.postprocess(tracked_items)
             print('Finished.')
+
+        # Timing report
+        dt_now = datetime.today().strftime("%Y-%m-%d %Hh%M")
+        saved = timer.save(
+            profile.output_path, f'Timing report -- Saved {dt_now}'
+        )
+        if profiler is not None:
+            profiler.disable()
+            saved += save_hot_paths(
+                profiler, profile.output_path, f'Hot paths -- Saved {dt_now}'
+            )
+        print('Timing: %.1fs.' % sum(timer.stages.values()),
+              'Reports saved:', ', '.join(fpath.name for fpath in saved))
     
     # End of program
     print('\n' + ' Program finished '.center(80, '#'), end='\n\n\n')
 
 
+def make_batches(
+    files: list[str], interrupted: list[str], size: int
+) -> list[list[str]]:
+    """Groups files by scheduling pass: size files per pass, all of them
+    if size is 0. The files of an interrupted batch are processed first,
+    together again."""
+    interrupted = [fpath for fpath in interrupted if fpath in files]
+    files = [fpath for fpath in files if fpath not in interrupted]
+    size = size if size > 0 else max(1, len(files))
+    batches = [files[start:start + size] for start in range(0, len(files), size)]
+    return ([interrupted] if len(interrupted) > 0 else []) + batches
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+""" allocation_ledger.py
+Defines class AllocationLedger: Allocation state of the movements of a
+task while products are tracked through them.
+
+Movements are referred to by position in the task's movements table.
+Quantities left to allocate are kept in a NumPy array, and the movements
+each item was allocated to in a per-item set, so that updates are O(1) and
+filtering candidates doesn't go through every row of the table.
+
+Class AllocationLedger - methods:
+    .__init__
+    .allocate
+    .available
+    .materialise
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class AllocationLedger:
+    def __init__(self, mvts: pd.DataFrame) -> None:
+        if 'QTY_Unallocated' in mvts.columns:
+            self.unallocated = mvts['QTY_Unallocated'].to_numpy(copy=True)
+        else:
+            self.unallocated = np.abs(mvts['QTY'].to_numpy())
+        self.allocations = {}  # item id -> positions of movements
+        if 'Items_Allocated' in mvts.columns:
+            for pos, item_ids in enumerate(mvts['Items_Allocated']):
+                for item_id in item_ids:
+                    self.allocations.setdefault(item_id, set()).add(pos)
+
+
+    def allocate(self, pos: int, item_id: str, qty: int) -> None:
+        self.unallocated[pos] -= qty
+        self.allocations.setdefault(item_id, set()).add(pos)
+
+    def available(
+        self, positions: np.ndarray, item_id: str | None = None
+    ) -> np.ndarray:
+        """Keeps positions with quantity left to allocate and, if item_id is
+        given, not allocated to this item yet."""
+        positions = positions[self.unallocated[positions] >= 1]
+        if item_id is None or item_id not in self.allocations:
+            return positions
+        allocated = self.allocations[item_id]
+        if len(positions) < len(allocated):  # Long routes: few candidates
+            return positions[np.fromiter(
+                (pos not in allocated for pos in positions.tolist()),
+                dtype=bool, count=len(positions)
+            )]
+        return positions[~np.isin(
+            positions, np.fromiter(allocated, dtype=np.int64)
+        )]
+
+    def materialise(self, mvts: pd.DataFrame) -> pd.DataFrame:
+        """Writes the allocation state back as columns QTY_Unallocated and
+        Items_Allocated of the movements table."""
+        items_allocated = [set() for _ in range(len(mvts))]
+        for item_id, positions in self.allocations.items():
+            for pos in positions:
+                items_allocated[pos].add(item_id)
+        mvts = mvts.assign(QTY_Unallocated=self.unallocated)
+        if 'Items_Allocated' in mvts.columns:
+            mvts['Items_Allocated'] = items_allocated
+        else:
+            mvts.insert(
+                mvts.columns.get_loc('QTY_Unallocated') + 1,
+                'Items_Allocated',
+                items_allocated
+            )
+        return mvts
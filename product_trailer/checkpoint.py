@@ -0,0 +1,86 @@
+""" checkpoint.py
+Defines class TaskCheckpoint: Results of completed scheduler tasks saved
+to disk while Scheduler.run goes, so that a run interrupted (crash, out
+of memory) can resume without tracking these tasks again.
+
+Results are appended to part files written every `interval` seconds. A
+checkpoint is only valid for the same key (files of the batch processed,
+digest of the task plan): a checkpoint of another key is deleted, by load
+or before the first part is written.
+
+Class TaskCheckpoint - methods:
+    .__init__
+    .load
+    .add
+    .flush
+    .clear
+    ._stored_key
+"""
+
+import json
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+
+class TaskCheckpoint:
+    def __init__(self, dirpath: Path, key: list, interval: float) -> None:
+        """interval: seconds between two writes. 0: nothing written."""
+        self.path = Path(dirpath)
+        self.key = list(key)
+        self.interval = interval
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+
+    def load(self) -> dict:
+        """Task -> result of the tasks completed in a previous run."""
+        if self._stored_key() != self.key:
+            self.clear()
+            return {}
+        results = {}
+        for part_path in sorted(self.path.glob('part-*.pkl')):
+            with open(part_path, 'rb') as read_file:
+                results.update(pickle.load(read_file))
+        return results
+
+    def add(self, task, result) -> None:
+        if self.interval <= 0:
+            return
+        self.pending[task] = result
+        if time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.last_flush = time.monotonic()
+        if len(self.pending) == 0:
+            return
+        if self._stored_key() != self.key:  # New or stale: start over
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path.mkdir(parents=True)
+            with open(self.path / 'meta.json', 'w') as write_file:
+                json.dump({'key': self.key}, write_file, indent=4)
+        part_no = len(list(self.path.glob('part-*.pkl')))
+        part_path = self.path / f'part-{part_no:06d}.pkl'
+        tmp_path = part_path.with_name(part_path.name + '.tmp')
+        with open(tmp_path, 'wb') as write_file:
+            pickle.dump(self.pending, write_file, pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(part_path)
+        self.pending = {}
+
+    def clear(self) -> None:
+        self.pending = {}
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+    #
+    # NON-USER INTERFACE METHODS
+    #
+
+    def _stored_key(self) -> list | None:
+        meta_path = self.path / 'meta.json'
+        if not meta_path.is_file():
+            return None
+        with open(meta_path, 'r') as read_file:
+            return json.load(read_file).get('key')
@@ -0,0 +1,42 @@
+""" cleaning.py
+Vectorised cleaning steps for raw movements, to be used in profiles'
+import_movements.
+
+Rows dropped by a step are counted in DataFrame.attrs['rejected_rows']
+(reason -> number of rows).
+
+Functions:
+    keep_integer_qty
+    fill_categorical_na
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def keep_integer_qty(df: pd.DataFrame, column: str = 'QTY') -> pd.DataFrame:
+    """Drops rows whose quantity is missing or isn't an integer. The
+    column is returned as int64."""
+    qty = df[column].to_numpy(dtype='float64')
+    valid = np.isfinite(qty)
+    valid[valid] = qty[valid] == np.floor(qty[valid])
+    cleaned = df.loc[valid].assign(**{column: qty[valid].astype('int64')})
+    cleaned.attrs['rejected_rows'] = {
+        **df.attrs.get('rejected_rows', {}),
+        f'{column} not integer': int((~valid).sum()),
+    }
+    return cleaned
+
+
+def fill_categorical_na(
+    df: pd.DataFrame, columns: list[str], value: str = 'NA'
+) -> pd.DataFrame:
+    """Fills missing values of categorical columns, adding the category if
+    needed."""
+    filled = {}
+    for col in columns:
+        values = df[col]
+        if value not in values.cat.categories:
+            values = values.cat.add_categories(value)
+        filled[col] = values.fillna(value)
+    return df.assign(**filled)
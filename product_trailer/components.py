@@ -0,0 +1,207 @@
+""" components.py
+Connected components of the movement graph: movements are linked when
+tracking can take an item from one to the other. Movements and items of
+different components never interact, so that each component can be
+tracked on its own, and movements of components without items don't need
+to be tracked at all.
+
+Movements are linked (each link within one SKU):
+- same Company, SLOC and Batch: an item at a waypoint can take any [-]
+  movement of its Company_SLOC_Batch
+- documents: [-] (not 956, 702 or PO) and [+] with the same Posting Date,
+  Company, Sold to, Mvt Code and Document (the [+] is looked for with the
+  same Batch first, then without)
+- POs: [-] on a PO and [+] with the same Batch and PO
+- changes of sold-to: [-] 956 and [+] 955 with the same Posting Date,
+  Company and Batch
+- changes of batch: [-] 702 and [+] 701 with the same Posting Date,
+  Company, SLOC and Sold to
+These links are looser than ForwardTracker's lookups (no date ranges,
+no quantities): components may be larger than needed, never smaller.
+
+Items belong to the component of their last waypoint: its Company_SLOC_
+Batch, or the [+] movements of their PO for items on a PO. Components of
+items of the same entry point (deduplicated by id in their task) are
+merged.
+
+Functions:
+    movement_components
+    attach_items
+    _lookup
+    _key_edges
+    _label_components
+"""
+
+import numpy as np
+import pandas as pd
+
+from product_trailer.item import Item
+from product_trailer.key_codec import KeyCodec, MISSING
+
+
+CSB_KEY = ['SKU', 'Company', 'SLOC', 'Batch']
+PO_KEY = ['SKU', 'Batch', 'PO']
+LINKS = {
+    # name: (key, [-] movements linked to [+] movements)
+    'document': (
+        ['SKU', 'Posting Date', 'Company', 'Sold to', 'Mvt Code', 'Document'],
+        'standard'
+    ),
+    'po': (PO_KEY, 'po'),
+    'soldto_change': (
+        ['SKU', 'Posting Date', 'Company', 'Batch'], 'soldto_change'
+    ),
+    'batch_change': (
+        ['SKU', 'Posting Date', 'Company', 'SLOC', 'Sold to'], 'batch_change'
+    ),
+}
+
+
+def movement_components(mvts: pd.DataFrame, codec: KeyCodec) -> np.ndarray:
+    """Component of each movement, numbered from 0. mvts: movements of
+    one or several SKUs, key columns encoded with codec."""
+    code = lambda value: codec.codes.get(value, MISSING)
+    qty = mvts['QTY'].to_numpy()
+    mvt_code = mvts['Mvt Code'].to_numpy()
+    decr, incr = qty <= -1, qty >= 1
+    special = np.isin(mvt_code, [code('956'), code('702')])
+    no_po = mvts['PO'].to_numpy() == code('-2')
+    decrements = {
+        'standard': decr & ~special & no_po,
+        'po': decr & ~special & ~no_po,
+        'soldto_change': decr & (mvt_code == code('956')),
+        'batch_change': decr & (mvt_code == code('702')),
+    }
+    increments = {
+        'standard': incr,
+        'po': incr,
+        'soldto_change': incr & (mvt_code == code('955')),
+        'batch_change': incr & (mvt_code == code('701')),
+    }
+
+    nodes = np.arange(len(mvts))
+    edges = [_key_edges(mvts, CSB_KEY, nodes)]
+    for key, kind in LINKS.values():
+        rows = decrements[kind] | increments[kind]
+        edges.append(_key_edges(
+            mvts.loc[rows], key, nodes[rows], incr[rows]
+        ))
+    labels = _label_components(len(mvts), np.concatenate(edges, axis=1))
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def attach_items(
+    items: list[Item],
+    roots: np.ndarray,
+    mvts: pd.DataFrame,
+    mvt_comps: np.ndarray,
+    codec: KeyCodec
+) -> (np.ndarray, np.ndarray):
+    """Components of the movements, merged for items of the same entry
+    point (same root id), and component of each item: -1 if no movement
+    can reach it."""
+    code = lambda value: codec.codes.get(value, MISSING)
+    last_wpts = [item.waypoints[-1] for item in items]
+    on_po = np.array([item.open != item.open for item in items], dtype=bool)
+    wpts = pd.DataFrame({
+        'SKU': [item.sku for item in items],
+        'Company': [code(wpt[1]) for wpt in last_wpts],
+        'SLOC': [code(wpt[2]) for wpt in last_wpts],
+        'PO': [code(wpt[4]) for wpt in last_wpts],
+        'Batch': [code(wpt[5]) for wpt in last_wpts],
+    }, columns=['SKU', 'Company', 'SLOC', 'PO', 'Batch'])
+
+    key_comps = mvts[list(dict.fromkeys(CSB_KEY + PO_KEY))].assign(
+        SKU=mvts['SKU'].astype(object), comp=mvt_comps
+    )
+    incr = mvts['QTY'].to_numpy() >= 1
+    item_comps = np.where(
+        on_po,
+        _lookup(wpts, key_comps.loc[incr], PO_KEY),
+        _lookup(wpts, key_comps, CSB_KEY)
+    )
+
+    # Items of the same entry point: components merged
+    reachable = item_comps >= 0
+    edges = _key_edges(
+        pd.DataFrame({'root': roots[reachable]}), ['root'],
+        item_comps[reachable]
+    )
+    labels = np.unique(
+        _label_components(mvt_comps.max(initial=-1) + 1, edges),
+        return_inverse=True
+    )[1]
+    item_comps[reachable] = labels[item_comps[reachable]]
+    if len(items) > 0:
+        item_comps = (
+            pd.Series(item_comps).groupby(roots).transform('max').to_numpy()
+        )
+    return labels[mvt_comps], item_comps
+
+
+#
+# NON-USER INTERFACE FUNCTIONS
+#
+
+def _lookup(
+    wpts: pd.DataFrame, key_comps: pd.DataFrame, key: list[str]
+) -> np.ndarray:
+    """Component of the movements with the key of each waypoint, -1 if
+    none."""
+    comps = (
+        wpts[key].astype(object)
+        .merge(
+            key_comps[key + ['comp']].astype({col: object for col in key})
+            .drop_duplicates(key),
+            how='left', on=key
+        )['comp']
+    )
+    return comps.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _key_edges(
+    rows: pd.DataFrame,
+    key: list[str],
+    nodes: np.ndarray,
+    incr: np.ndarray | None = None
+) -> np.ndarray:
+    """Edges (2 x n) linking the node of each row to the node of the first
+    row with the same key. Rows with a missing key component match nothing,
+    as in MovementIndex. incr: whether rows are [+]; if given, only keys
+    with [-] and [+] rows are linked."""
+    valid = np.ones(len(rows), dtype=bool)
+    key_codes = np.zeros(len(rows), dtype=np.int64)
+    for col in key:
+        values = rows[col].to_numpy()
+        if values.dtype.kind in 'iu':
+            valid &= values >= 0
+        codes, uniques = pd.factorize(values)
+        valid &= codes >= 0
+        key_codes, _ = pd.factorize(key_codes * (len(uniques) + 1) + codes + 1)
+    if incr is not None:
+        valid &= (
+            np.isin(key_codes, key_codes[incr])
+            & np.isin(key_codes, key_codes[~incr])
+        )
+    key_codes, nodes = key_codes[valid], nodes[valid]
+    _, first, inverse = np.unique(
+        key_codes, return_index=True, return_inverse=True
+    )
+    return np.stack([nodes, nodes[first][inverse]])
+
+
+def _label_components(num_nodes: int, edges: np.ndarray) -> np.ndarray:
+    """Smallest node of the component of each node: minimum label
+    propagation along edges, with pointer jumping."""
+    labels = np.arange(num_nodes)
+    while True:
+        previous = labels
+        lowest = np.minimum(labels[edges[0]], labels[edges[1]])
+        labels = labels.copy()
+        np.minimum.at(labels, edges[0], lowest)
+        np.minimum.at(labels, edges[1], lowest)
+        np.minimum.at(labels, previous, labels)
+        while not np.array_equal(labels[labels], labels):
+            labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
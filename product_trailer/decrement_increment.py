@@ -1,6 +1,13 @@
 """ decrement_increment.py
-Defines classes Decrement and Incrment: Representation of a physical
-product leaving a place (decrement) and landing in another.
+Defines class Decrement: Representation of a physical product leaving a
+place (decrement), to land in another (increment).
+
+Key fields (company, document, po, mvt_code, sloc, soldto, batch) hold
+the integer codes of the KeyCodec of the task, as the movements they are
+read from (MISSING: no value).
+
+Functions:
+    _join
 """
 
 from dataclasses import dataclass
@@ -10,22 +17,26 @@ from datetime import datetime
 class Decrement:
     mvt_index: int
     date: datetime
-    company: str
-    document: str
-    po: str
-    mvt_code: str
-    sloc: str
-    soldto: str
+    company: int
+    document: int
+    po: int
+    mvt_code: int
+    sloc: int
+    soldto: int
     sku: str
-    batch: str
+    batch: int
     qty: int
+    mvt_pos: int | None = None  # Row position in the task movements
 
-    def to_waypoint(self, mode='standard'):
+    def to_waypoint(self, mode='standard', codec=None):
+        """Fields of the waypoint as integer codes of codec. Without a
+        codec, fields are expected to hold values."""
+        join = _join if codec is None else codec.join
         if mode == 'burnt':
             return [
                 self.date,
                 self.company,
-                'BURNT ' + self.sloc,
+                join('BURNT {}', self.sloc),
                 self.soldto,
                 self.mvt_code,
                 self.batch
@@ -34,7 +45,7 @@ class Decrement:
             return [
                 self.date,
                 self.company,
-                'PO FROM ' + self.sloc + ', mvt ' + self.mvt_code,
+                join('PO FROM {}, mvt {}', self.sloc, self.mvt_code),
                 self.soldto,
                 self.po,
                 self.batch
@@ -47,4 +58,7 @@ class Decrement:
             self.mvt_code,
             self.batch
             ]
-    
+
+
+def _join(template: str, *values: str) -> str:
+    return template.format(*values)
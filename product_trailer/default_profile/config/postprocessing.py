@@ -13,19 +13,20 @@ import numpy as np
 import pandas as pd
 
 import product_trailer.postprocessing_tk as pp_tk
+from product_trailer.item_table import ItemTable
 
 
 def postprocess(self, tracked_items: pd.DataFrame) -> bool:
+    # Waypoints flattened once for all outputs
+    item_table = ItemTable.from_frame(tracked_items)
+
     # Make the standard report
-    std_report = pp_tk.make_standard_report(tracked_items)
+    std_report = pp_tk.make_standard_report(item_table)
     std_report = customize_std_report(std_report)  # Customization by user
-    detailed_view = pp_tk.make_exportable_hist(tracked_items)
+    detailed_view = pp_tk.iter_exportable_hist(item_table)  # By chunks
 
-    stock_move = pp_tk.collect_stock_move(
-        tracked_items[['qty', 'waypoints']],
-        'company'
-        )
-    fig = pp_tk.generate_stock_move_diagram(stock_move)
+    # Node levels: 'company', 'company_sloc', 'country', 'soldto'
+    stock_move = pp_tk.collect_stock_move(item_table, 'company')
 
 
     # Saving
@@ -34,12 +35,30 @@ def postprocess(self, tracked_items: pd.DataFrame) -> bool:
     dt_now = datetime.today().strftime("%Y-%m-%d %Hh%M")
     fsuffix = f'-- Saved {dt_now} -- Range {date_range}'
 
-    self.save_excel(
+    self.save_report(
         {'summary': std_report, 'details': detailed_view},
         f'Tracked products' + fsuffix
         )
     
-    self.save_figure(fig, f'Network diagram' + fsuffix)
+    diagram = self.output_config.get('diagram', 'png')
+    min_qty = self.output_config.get('diagram_min_qty', 0)
+    top_edges = self.output_config.get('diagram_top_edges', 0) or None
+    if diagram == 'png':
+        fig = pp_tk.generate_stock_move_diagram(
+            stock_move,
+            min_qty=min_qty,
+            top_edges=top_edges,
+            layout=self.output_config.get('diagram_layout', 'spring'),
+            layout_cache=self.data_path / 'diagram_layouts.json'
+        )
+        self.save_figure(fig, f'Network diagram' + fsuffix)
+    elif diagram in ('graphml', 'csv'):
+        pp_tk.export_stock_move_graph(
+            stock_move,
+            self.output_path / (f'Network graph' + fsuffix + '.' + diagram),
+            min_qty=min_qty,
+            top_edges=top_edges
+        )
 
 
 def customize_std_report(tracked_Items: pd.DataFrame) -> pd.DataFrame:
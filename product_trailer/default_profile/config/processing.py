@@ -7,19 +7,22 @@ Functions:
 """
 
 from pathlib import Path
-from xlsx2csv import Xlsx2csv
-from io import StringIO
-import numpy as np
 import pandas as pd
 
+from product_trailer import ingest, cleaning
 
-def import_movements(filepath: str) -> pd.DataFrame:
+
+def import_movements(
+    filepath: str, cache_dir: str | Path | None = None
+) -> pd.DataFrame:
     """import_movements - Steps 1, 2, and 3 should be customised
     to align to user's data:
     1. Reads a movement file, dtypes according to inputcols_dtypes
     2. Renames columns according to algorithm expectation
     3. Performs filtering
     4. Performs sorting - user may change at their own risk
+    cache_dir: directory where the parsed file is cached (given by the
+    profile). None: not cached.
     """
     
     inputcols_dtypes = {
@@ -57,19 +60,19 @@ def import_movements(filepath: str) -> pd.DataFrame:
     fp = Path(filepath)
     match fp.suffix.lower():
         case '.xlsx' | '.xls':
-            fdata = StringIO()
-            Xlsx2csv(filepath).convert(fdata)
-            fdata.seek(0)
-            raw_mvt = pd.read_csv(
-                fdata,
+            raw_mvt = ingest.read_xlsx(
+                fp,
+                cache=cache_dir is not None,
+                cache_dir=cache_dir,
                 low_memory=False,
                 dtype=inputcols_dtypes,
                 parse_dates=['Posting Date'],
             )
         case '.csv':
-            fdata = fp
-            raw_mvt = pd.read_csv(
-                fdata,
+            raw_mvt = ingest.read_csv(
+                fp,
+                cache=cache_dir is not None,
+                cache_dir=cache_dir,
                 low_memory=False,
                 dtype=inputcols_dtypes,
                 parse_dates=['Posting Date'],
@@ -78,25 +81,15 @@ def import_movements(filepath: str) -> pd.DataFrame:
         case _:
             raise Exception('File type not supported')
 
-    def nonint_naner(val):
-        conv = int(val)
-        if conv == val:
-            return conv
-        return np.nan
-
     raw_mvt = (
         raw_mvt
         .rename(columns=renaming_dict)
         .pipe(lambda df: df.loc[df['Material Type Code'] == 'FERT'])
         .sort_values(by=['Posting Date', 'QTY'], ascending=[True, False])
-        .assign(QTY = lambda df: df['QTY'].apply(nonint_naner))
-        .dropna(subset='QTY')
+        .pipe(cleaning.keep_integer_qty, 'QTY')
+        .pipe(cleaning.fill_categorical_na, ['Special Stock Ind Code', 'SLOC'])
     )
 
-    for col_name in ['Special Stock Ind Code', 'SLOC']:
-        raw_mvt[col_name] = raw_mvt[col_name].cat.add_categories('NA')
-        raw_mvt[col_name].fillna('NA', inplace=True)
-
     return raw_mvt[output_cols]
 
 
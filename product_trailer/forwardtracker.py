@@ -1,6 +1,10 @@
 """ forwardtracker.py
 Forward tracking mechanism
 
+Key columns of the movements and fields of the waypoints are handled as
+integer codes of a KeyCodec while tracking. Waypoints are decoded when the
+route of an item is complete, movements when they are returned.
+
 Class ForwardTracker - methods:
     .__init__
     .do_task
@@ -12,13 +16,17 @@ Class ForwardTracker - methods:
     ._find_incr
 """
 
-from copy import deepcopy
+from dataclasses import replace
 
 import numpy as np
 import pandas as pd
 
-from product_trailer.item import Item
+from product_trailer.item import Item, WaypointChain
+from product_trailer.item_table import ItemTable
 from product_trailer.decrement_increment import Decrement
+from product_trailer.movement_index import MovementIndex
+from product_trailer.allocation_ledger import AllocationLedger
+from product_trailer.key_codec import KeyCodec, MISSING
 
 
 class ForwardTracker():
@@ -26,60 +34,100 @@ class ForwardTracker():
         self,
         defwpt: list[str],
         task_mvts: pd.DataFrame,
-        save_mvts: bool
+        save_mvts: bool = False,
+        codec: KeyCodec | None = None
     ) -> None:
+        """codec: KeyCodec task_mvts were encoded with. If None, task_mvts
+        hold values and are encoded here."""
+        if codec is None:
+            codec = KeyCodec.from_movements(task_mvts)
+            task_mvts = codec.encode_movements(task_mvts)
+        self.codec = codec
         self.mvts = task_mvts
+        self.index = MovementIndex(task_mvts, codec)
+        self.ledger = AllocationLedger(task_mvts)
+        self.decr_rows = None
+        self.incr_rows = None
         self.defwpt = defwpt
         self.save_mvts = save_mvts
+        self.stats = dict.fromkeys(
+            ['hops', 'decr_lookups', 'incr_lookups', 'splits', 'burns'], 0
+        )
+        self.origins = []  # Position in task_items of each item computed
+        # Codes of the values tracking rules refer to
+        self.NA = codec.encode('NA')
+        self.PO = codec.encode('PO')
+        self.NO_PO = codec.encode('-2')
+        self.EMPTY = codec.encode('')
+        self.SOLDTO_CHANGE = codec.encode('956')
+        self.BATCH_CHANGE = codec.encode('702')
     
     
-    def do_task(self, task_items: list[Item]) -> (list[Item], pd.DataFrame):
+    def do_task(
+        self, task_items: list[Item] | ItemTable
+    ) -> (list[Item], pd.DataFrame):
+        if isinstance(task_items, ItemTable):
+            task_items = task_items.to_items()
+        self.origins = list(range(len(task_items)))
         if len(self.mvts) == 0:  # No mvt => Skip this
-            return task_items, self.mvts
+            return task_items, self.codec.decode_movements(self.mvts)
         
         items_computed = []
-        for item in task_items:
-            items_computed.extend(self._make_route(item))
+        self.origins = []
+        for pos, item in enumerate(task_items):
+            route = self._make_route(item)
+            items_computed.extend(route)
+            self.origins.extend([pos] * len(route))
         if self.save_mvts:
-            return items_computed, self.mvts
+            return items_computed, self.codec.decode_movements(
+                self.ledger.materialise(self.mvts)
+            )
         return items_computed, None
 
     
     def _make_route(self, item: Item) -> list[Item]:
-        new_items = self._make_hop(item)
-        if len(new_items) == 0:
-            return []
-        elif len(new_items) == 1:
-            if item == new_items[0]:  # Product didn't travel further
-                return [item]
-        return [
-            an_item
-            for new_item in new_items
-            for an_item in self._make_route(new_item)
-        ]
+        # Depth-first expansion with an explicit stack: routes can be
+        # thousands of hops long. While being tracked, items carry their
+        # waypoints as a WaypointChain shared with the items split from them.
+        route = []
+        stack = [replace(item, waypoints=WaypointChain.from_list(
+            [self.codec.encode_waypoint(wpt) for wpt in item.waypoints]
+        ))]
+        while stack:
+            current = stack.pop()
+            new_items = self._make_hop(current)
+            if len(new_items) == 1 and new_items[0] is current:
+                # Product didn't travel further
+                route.append(replace(current, waypoints=[
+                    self.codec.decode_waypoint(wpt)
+                    for wpt in current.waypoints.to_list()
+                ]))
+            else:
+                stack.extend(reversed(new_items))
+        return route
     
     
     def _make_hop(self, item: Item) -> list:
+        self.stats['hops'] += 1
         first_step = len(item.waypoints) == 1
 
+        last_wpt = item.waypoints.last
+
         if not np.isnan(item.open):
-            decrements = self._find_decr(
-                first_step, item.waypoints[-1],
-                item.id
-                )
+            decrements = self._find_decr(first_step, last_wpt, item.id)
         else:
             decrements = [
                 Decrement(
                     mvt_index=None,
-                    date=item.waypoints[-1][0],
-                    company=item.waypoints[-1][1],
+                    date=last_wpt[0],
+                    company=last_wpt[1],
                     document=None,
-                    po=item.waypoints[-1][4],
-                    mvt_code='PO',
-                    sloc=item.waypoints[-1][2],
-                    soldto=item.waypoints[-1][3],
+                    po=last_wpt[4],
+                    mvt_code=self.PO,
+                    sloc=last_wpt[2],
+                    soldto=last_wpt[3],
                     sku=None,
-                    batch=item.waypoints[-1][5],
+                    batch=last_wpt[5],
                     qty=-item.qty
                 )
             ]
@@ -125,9 +173,12 @@ class ForwardTracker():
                 )
                 new_items.append(new_item)
             
-            if decrement.mvt_code != 'PO':
-                self.mvts.loc[decrement.mvt_index, 'QTY_Unallocated'] -= hop_minus_QTY
-                self.mvts.loc[decrement.mvt_index, 'Items_Allocated'].add(item.id)
+            if decrement.mvt_code != self.PO:
+                self.ledger.allocate(
+                    decrement.mvt_pos,
+                    item.id,
+                    hop_minus_QTY
+                )
             
             QTY_covered += hop_minus_QTY
             if QTY_covered == item.qty:
@@ -146,49 +197,56 @@ class ForwardTracker():
                     sub_ID=str(sub_ID_lv1)
                 )
             )
+        if len(new_items) > 1:
+            self.stats['splits'] += len(new_items) - 1
         return new_items
 
     
     def _build_item(
         self, item: Item, instruction: str, data: dict, sub_ID: bool | str
     ) -> Item:
-        new_item = deepcopy(item)
-
         if instruction == 'LastMinusNeeds_subID':
-            new_item.qty = data['qty']
-            new_item.id += '.' + sub_ID
-            return new_item
+            return replace(item, qty=data['qty'], id=item.id + '.' + sub_ID)
         
+        waypoints = item.waypoints
         if isinstance(data['plus_mvt'], str):  # instruction == 'standard'
             if data['plus_mvt'] == 'BURNT':
-                new_item.open = False
-                new_wpt = data['decrement'].to_waypoint(mode='burnt')
+                self.stats['burns'] += 1
+                new_open = False
+                new_wpt = data['decrement'].to_waypoint('burnt', self.codec)
             elif data['plus_mvt'] == 'PO2ndPartMissing':
-                if data['decrement'].sloc.startswith('PO FROM'):
+                sloc = self.codec.decode(data['decrement'].sloc)
+                if sloc.startswith('PO FROM'):
                     # Don't add a waypoint if we haven't found 2nd part of 
                     # the PO for 2+ times in a row
-                    return new_item
-                new_item.open = np.nan
-                new_wpt = data['decrement'].to_waypoint(mode='PO part 1')
+                    return item
+                new_open = np.nan
+                new_wpt = data['decrement'].to_waypoint('PO part 1', self.codec)
             else:
                 raise Exception('Unexpected [+] mvt resolution type')
         else:
-            if len(new_item.waypoints) == 1:
-                new_item.waypoints[0][0] = pd.NaT
-                new_item.waypoints[0][4] = ''
+            if len(waypoints) == 1:
+                first_wpt = list(waypoints.last)
+                first_wpt[0] = pd.NaT
+                first_wpt[4] = self.EMPTY
+                waypoints = WaypointChain(first_wpt)
             
-            new_item.open = True
-            new_wpt = list(data['plus_mvt'].loc[self.defwpt])
-            if new_wpt[2] != 'NA': # Remove SoldTo if SLOC isn't a Consignment
-                new_wpt[3] = np.nan
+            new_open = True
+            new_wpt = list(self.incr_rows[data['plus_mvt']][1:])
+            if new_wpt[2] != self.NA: # Remove SoldTo if SLOC isn't a Consignment
+                new_wpt[3] = MISSING
             if data['decrement'].mvt_code != new_wpt[4]: # Combination
-                new_wpt[4] = data['decrement'].mvt_code + '/' + new_wpt[4]
+                new_wpt[4] = self.codec.join(
+                    '{}/{}', data['decrement'].mvt_code, new_wpt[4]
+                )
 
-        new_item.waypoints.append(new_wpt)
-        new_item.qty = data['qty']
-        if sub_ID:
-            new_item.id = new_item.id + '.' + sub_ID
-        return new_item
+        return replace(
+            item,
+            open=new_open,
+            waypoints=waypoints.append(new_wpt),
+            qty=data['qty'],
+            id=item.id + '.' + sub_ID if sub_ID else item.id
+        )
 
     
     def _compute_incr(
@@ -205,7 +263,7 @@ class ForwardTracker():
 
         if len(plus_mvts) == 0:  # No 1st-pass result for a +1: we widen the search
             # Except if we were looking for 2nd half of PO
-            if decrement.po != '-2':
+            if decrement.po != self.NO_PO:
                 return [{'qty': desired_QTY, 'plus_mvt': 'PO2ndPartMissing'}]
             # Last chance to find a [+]: we remove the filter on batch#
             plus_mvts = self._find_incr(decrement, True) 
@@ -214,11 +272,12 @@ class ForwardTracker():
         
         QTY_covered = 0
         plus_resolved = []
-        for plus_idx, plus_mvt in plus_mvts.iterrows():
-            addnl_cover_QTY = min(plus_mvt.QTY, desired_QTY-QTY_covered)
-            plus_resolved.append({'qty': addnl_cover_QTY, 'plus_mvt': plus_mvt})
-            self.mvts.loc[plus_idx, 'QTY_Unallocated'] -= addnl_cover_QTY
-            self.mvts.loc[plus_idx, 'Items_Allocated'].add(id)
+        for plus_pos in plus_mvts.tolist():
+            addnl_cover_QTY = min(
+                self.incr_rows[plus_pos][0], desired_QTY-QTY_covered
+            )
+            plus_resolved.append({'qty': addnl_cover_QTY, 'plus_mvt': plus_pos})
+            self.ledger.allocate(plus_pos, id, addnl_cover_QTY)
             QTY_covered += addnl_cover_QTY
             if QTY_covered >= desired_QTY:
                 break
@@ -235,98 +294,69 @@ class ForwardTracker():
     def _find_decr(
         self, first_step: bool, wpt: list, ID: str
     ) -> pd.DataFrame:
+        self.stats['decr_lookups'] += 1
+        csb = (wpt[1], wpt[2], wpt[5])
         if not first_step:
-            if wpt[2] == 'NA':  # Add filter on SoldTo if SKU in consignment
-                decrements_df = self.mvts.loc[
-                    (self.mvts['Posting Date'].values >= wpt[0])
-                    & (self.mvts['Company_SLOC_Batch'].values == (
-                        wpt[1] + '-' + wpt[2] + '-' + wpt[5]
-                    ))
-                    & (self.mvts['Sold to'].values == wpt[3])
-                    & (self.mvts['Items_Allocated'].apply(
-                        lambda Item_Allocated: ID not in Item_Allocated
-                        ))
-                    & (self.mvts['QTY'].values <= -1)
-                    & (self.mvts['QTY_Unallocated'].values >= 1)
-                ]
+            if wpt[2] == self.NA:  # Add filter on SoldTo if SKU in consignment
+                candidates = self.index.lookup(
+                    'decr_soldto', (*csb, wpt[3]), from_date=wpt[0]
+                )
             else:
-                decrements_df = self.mvts.loc[
-                    (self.mvts['Posting Date'].values >= wpt[0])
-                    & (self.mvts['Company_SLOC_Batch'].values == (
-                        wpt[1] + '-' + wpt[2] + '-' + wpt[5]
-                    ))
-                    & (self.mvts['Items_Allocated'].apply(
-                        lambda Item_Allocated: ID not in Item_Allocated
-                        ))
-                    & (self.mvts['QTY'].values <= -1)
-                    & (self.mvts['QTY_Unallocated'].values >= 1)
-                ]
+                candidates = self.index.lookup(
+                    'decr', csb, from_date=wpt[0]
+                )
+            candidates = self.ledger.available(candidates, ID)
         else:  # We're looking for the 1st movement of the tracked product
-            decrements_df = self.mvts.loc[
-                (self.mvts['Posting Date'].values == wpt[0])
-                & (self.mvts['Company_SLOC_Batch'].values == (
-                    wpt[1] + '-' + wpt[2] + '-' + wpt[5]
-                    ))
-                & (self.mvts['Sold to'].values == wpt[3])
-                & (self.mvts['Mvt Code'].values == wpt[4])
-                & (self.mvts['QTY'].values <= -1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
+            candidates = self.ledger.available(
+                self.index.lookup(
+                    'decr_first', (wpt[0], *csb, wpt[3], wpt[4])
+                )
+            )
+        if self.decr_rows is None:
+            self.decr_rows = self.mvts.reset_index().iloc[:, :11].to_numpy()
         return [
-            Decrement(*line)
-            for line in decrements_df.reset_index().to_numpy()[:, :11]
-            ]
+            Decrement(*self.decr_rows[pos], mvt_pos=pos) for pos in candidates
+        ]
     
     
     def _find_incr(
         self, decrement: Decrement, nobatch: bool = False
-    ) -> pd.DataFrame:
+    ) -> np.ndarray:
+        """Positions of the [+] movements available for decrement."""
+        self.stats['incr_lookups'] += 1
         # Exceptions on top, general case is down
-        if decrement.mvt_code == '956':  # Change of SoldTo
-            return self.mvts.loc[
-                (self.mvts['Posting Date'].values == decrement.date)
-                & (self.mvts['Company'].values == decrement.company)
-                & (self.mvts['Mvt Code'].values == '955')
-                & (self.mvts['Batch'].values == decrement.batch)
-                & (self.mvts['QTY'].values >= 1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
-        elif decrement.mvt_code == '702':  # Change of batch number
-            return self.mvts.loc[
-                (self.mvts['Posting Date'].values == decrement.date)
-                & (self.mvts['Company'].values == decrement.company)
-                & (self.mvts['SLOC'].values == decrement.sloc)
-                & (self.mvts['Sold to'].values == decrement.soldto)
-                & (self.mvts['Mvt Code'].values == '701')
-                & (self.mvts['QTY'].values >= 1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
-        elif decrement.po != '-2':  # PO: PO number checked but not mvt code
-            return self.mvts.loc[
-                (self.mvts['Posting Date'].values >= decrement.date)
-                & (self.mvts['Batch'].values == decrement.batch)
-                & (self.mvts['PO'].values == decrement.po)
-                & (self.mvts['QTY'].values >= 1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
+        if decrement.mvt_code == self.SOLDTO_CHANGE:  # Change of SoldTo
+            candidates = self.index.lookup(
+                'incr_soldto_change',
+                (decrement.date, decrement.company, decrement.batch)
+            )
+        elif decrement.mvt_code == self.BATCH_CHANGE:  # Change of batch number
+            candidates = self.index.lookup(
+                'incr_batch_change',
+                (decrement.date, decrement.company, decrement.sloc,
+                 decrement.soldto)
+            )
+        elif decrement.po != self.NO_PO:  # PO: PO number checked but not mvt code
+            candidates = self.index.lookup(
+                'incr_po',
+                (decrement.batch, decrement.po),
+                from_date=decrement.date
+            )
         elif nobatch:  # Loosen search if can't find [+] mvt
-            return self.mvts.loc[
-                (self.mvts['Posting Date'].values == decrement.date)
-                & (self.mvts['Company'].values == decrement.company)
-                & (self.mvts['Sold to'].values == decrement.soldto)
-                & (self.mvts['Mvt Code'].values == decrement.mvt_code)
-                & (self.mvts['Document'].values == decrement.document)
-                & (self.mvts['QTY'].values >= 1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
+            candidates = self.index.lookup(
+                'incr_nobatch',
+                (decrement.date, decrement.company, decrement.soldto,
+                 decrement.mvt_code, decrement.document)
+            )
         else:  # Standard mvt
-            return self.mvts.loc[
-                (self.mvts['Posting Date'].values == decrement.date)
-                & (self.mvts['Company'].values == decrement.company)
-                & (self.mvts['Sold to'].values == decrement.soldto)
-                & (self.mvts['Batch'].values == decrement.batch)
-                & (self.mvts['Mvt Code'].values == decrement.mvt_code)
-                & (self.mvts['Document'].values == decrement.document)
-                & (self.mvts['QTY'].values >= 1)
-                & (self.mvts['QTY_Unallocated'].values >= 1)
-            ]
+            candidates = self.index.lookup(
+                'incr',
+                (decrement.date, decrement.company, decrement.soldto,
+                 decrement.batch, decrement.mvt_code, decrement.document)
+            )
+        if self.incr_rows is None:  # QTY and waypoint fields, by position
+            self.incr_rows = list(zip(*[
+                self.mvts[col].astype(object).tolist()
+                for col in ['QTY', *self.defwpt]
+            ]))
+        return self.ledger.available(candidates)
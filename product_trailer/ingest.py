@@ -0,0 +1,258 @@
+""" ingest.py
+Reading of raw movements files into typed DataFrames.
+
+Files are parsed by chunks of rows: Excel rows streamed out of Xlsx2csv
+are parsed every `chunksize` rows, so that the text of the whole file is
+never held in memory. Categorical columns of the chunks are combined at
+the end. Columns without a dtype are read as text, and their dtype is
+inferred once on the whole column: inferring it chunk by chunk could
+give different dtypes (e.g. '00209' read as 209.0 in a chunk and kept
+as text in another).
+
+The result of a conversion is cached in a binary sidecar file, in
+cache_dir (by default a .ingest_cache directory next to the raw file).
+The cache is used as long as the raw file (path, size, modification
+time) and the parsing options are the same.
+
+Ingestion figures (rows, seconds, rows per second, cache use) are given
+in DataFrame.attrs['ingest'].
+
+Class ChunkedCsvSink - methods:
+    .__init__
+    .write
+    .flush_chunk
+    .result
+
+Functions:
+    read_xlsx
+    read_csv
+    concat_chunks
+    infer_text_columns
+"""
+
+import csv
+import hashlib
+import time
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from xlsx2csv import Xlsx2csv
+
+
+CACHE_DIRNAME = '.ingest_cache'
+CACHE_VERSION = 1
+DEFAULT_CHUNKSIZE = 100_000
+BOOL_VALUES = {
+    'True': True, 'TRUE': True, 'true': True,
+    'False': False, 'FALSE': False, 'false': False,
+}
+
+
+class ChunkedCsvSink:
+    """File-like object receiving CSV rows, one row per write() call (as
+    written by csv.writer), parsed with pd.read_csv every chunksize rows."""
+
+    def __init__(self, chunksize: int, **read_csv_kwargs) -> None:
+        self.chunksize = chunksize
+        self.read_csv_kwargs = read_csv_kwargs
+        self.header = None
+        self.rows = []
+        self.chunks = []
+
+    def write(self, row: str) -> None:
+        if self.header is None:
+            self.header = row
+            self.read_csv_kwargs, self.text_columns = _defer_inference(
+                next(csv.reader([row])), self.read_csv_kwargs
+            )
+            return
+        self.rows.append(row)
+        if len(self.rows) >= self.chunksize:
+            self.flush_chunk()
+
+    def flush_chunk(self) -> None:
+        if len(self.rows) == 0 and len(self.chunks) > 0:
+            return
+        text = StringIO(self.header + ''.join(self.rows))
+        self.rows = []
+        self.chunks.append(pd.read_csv(text, **self.read_csv_kwargs))
+
+    def result(self) -> pd.DataFrame:
+        if self.header is None:  # Empty sheet
+            return pd.DataFrame()
+        self.flush_chunk()
+        return infer_text_columns(
+            concat_chunks(self.chunks), self.text_columns
+        )
+
+
+def read_xlsx(
+    filepath: str | Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cache: bool = True,
+    cache_dir: str | Path | None = None,
+    **read_csv_kwargs
+) -> pd.DataFrame:
+    """read_csv_kwargs: passed to pd.read_csv for each chunk. cache_dir:
+    directory of the cache files, if not next to the raw file."""
+    def convert():
+        sink = ChunkedCsvSink(chunksize, **read_csv_kwargs)
+        Xlsx2csv(str(filepath)).convert(sink)
+        return sink.result()
+    return _cached(
+        filepath, convert, cache, cache_dir, chunksize, read_csv_kwargs
+    )
+
+
+def read_csv(
+    filepath: str | Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cache: bool = True,
+    cache_dir: str | Path | None = None,
+    **read_csv_kwargs
+) -> pd.DataFrame:
+    def convert():
+        chunk_kwargs, text_columns = _defer_inference(
+            pd.read_csv(filepath, nrows=0).columns, read_csv_kwargs
+        )
+        with pd.read_csv(
+            filepath, chunksize=chunksize, **chunk_kwargs
+        ) as reader:
+            return infer_text_columns(concat_chunks(list(reader)), text_columns)
+    return _cached(
+        filepath, convert, cache, cache_dir, chunksize, read_csv_kwargs
+    )
+
+
+def concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Like pd.concat, but categorical columns stay categorical when
+    chunks have different categories."""
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(
+                union_categoricals(parts, sort_categories=True)
+            )
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def infer_text_columns(
+    df: pd.DataFrame, columns: list[str]
+) -> pd.DataFrame:
+    """Converts columns read as text the way pd.read_csv would have
+    inferred them: numbers, booleans, otherwise text."""
+    for col in columns:
+        values = df[col]
+        try:
+            df[col] = pd.to_numeric(values)
+            continue
+        except (ValueError, TypeError):
+            pass
+        uniques = set(values.dropna().unique())
+        if len(uniques) > 0 and uniques <= BOOL_VALUES.keys():
+            df[col] = values.map(BOOL_VALUES)
+            if not values.isna().any():
+                df[col] = df[col].astype(bool)
+    return df
+
+
+#
+# NON-USER INTERFACE FUNCTIONS
+#
+
+def _defer_inference(
+    columns: list[str], read_csv_kwargs: dict
+) -> (dict, list[str]):
+    """Columns without dtype or date parsing are read as text."""
+    dtype = read_csv_kwargs.get('dtype', {})
+    if not isinstance(dtype, dict):
+        return read_csv_kwargs, []
+    parse_dates = read_csv_kwargs.get('parse_dates') or []
+    if not isinstance(parse_dates, list):
+        parse_dates = []
+    text_columns = [
+        col for col in columns
+        if col not in dtype and col not in parse_dates
+    ]
+    return (
+        {
+            **read_csv_kwargs,
+            'dtype': {**dtype, **{col: str for col in text_columns}}
+        },
+        text_columns
+    )
+
+
+def _cached(
+    filepath: str | Path,
+    convert,
+    cache: bool,
+    cache_dir: str | Path | None,
+    chunksize: int,
+    read_csv_kwargs: dict
+) -> pd.DataFrame:
+    start = time.perf_counter()
+    fpath = Path(filepath)
+    cache_path = None
+    if cache:
+        cache_path = _cache_path(
+            fpath,
+            fpath.parent / CACHE_DIRNAME if cache_dir is None
+            else Path(cache_dir),
+            read_csv_kwargs
+        )
+    if cache_path is not None and cache_path.is_file():
+        df = pd.read_pickle(cache_path)
+        cached = True
+    else:
+        df = convert()
+        cached = False
+        if cache_path is not None:
+            try:
+                _write_cache(df, cache_path)
+            except OSError:  # Read-only location: no cache
+                pass
+    seconds = time.perf_counter() - start
+    df.attrs['ingest'] = {
+        'rows': len(df),
+        'seconds': seconds,
+        'rows_per_s': len(df) / seconds if seconds > 0 else float('inf'),
+        'cached': cached,
+        'chunksize': chunksize,
+    }
+    return df
+
+
+def _cache_path(
+    fpath: Path, cache_dir: Path, read_csv_kwargs: dict
+) -> Path:
+    """<name>.<digest of path>.<digest of file state, options>.pkl: raw
+    files of the same name in other directories have their own cache."""
+    stat = fpath.stat()
+    path_key = hashlib.sha1(str(fpath.resolve()).encode()).hexdigest()[:8]
+    key = hashlib.sha1(repr((
+        CACHE_VERSION,
+        stat.st_size,
+        stat.st_mtime_ns,
+        sorted(read_csv_kwargs.items()),
+    )).encode()).hexdigest()[:16]
+    return cache_dir / f'{fpath.name}.{path_key}.{key}.pkl'
+
+
+def _write_cache(df: pd.DataFrame, cache_path: Path) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Previous conversions of the same file are out of date
+    for old_path in cache_path.parent.glob(
+        cache_path.name.rsplit('.', 2)[0] + '.*.pkl'
+    ):
+        old_path.unlink()
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    df.to_pickle(tmp_path)
+    tmp_path.replace(cache_path)
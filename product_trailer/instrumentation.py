@@ -0,0 +1,96 @@
+""" instrumentation.py
+Timing of the stages of a run (import, preparation, tracking, save,
+postprocessing) and of the tracking of each SKU, saved as a timing report:
+- JSON: seconds per stage, tracking totals and the slowest SKUs
+- CSV: one row per SKU tracked (seconds, items, movements, hops, lookups,
+  splits, burns)
+
+Stages measured by RunTimer don't overlap: their sum is the time of the
+run. With several workers, SKU seconds add up to more than the tracking
+stage.
+
+Class RunTimer - methods:
+    .__init__
+    .stage
+    .add_task
+    .to_dict
+    .save
+
+Functions:
+    save_hot_paths
+"""
+
+import cProfile
+import json
+import pstats
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+
+SLOWEST_SKUS = 20
+
+
+class RunTimer:
+    def __init__(self) -> None:
+        self.stages = {}  # name -> seconds
+        self.tasks = []  # one dict per SKU tracked
+
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (
+                self.stages.get(name, 0.0) + perf_counter() - start
+            )
+
+    def add_task(self, task, stats: dict) -> None:
+        self.tasks.append({'sku': str(task), **stats})
+
+    def to_dict(self) -> dict:
+        tasks = pd.DataFrame(self.tasks)
+        totals = {}
+        if len(tasks) > 0:
+            totals = {
+                col: tasks[col].sum().item()
+                for col in tasks.columns if col != 'sku'
+            }
+            totals['skus'] = len(tasks)
+            tasks = tasks.nlargest(SLOWEST_SKUS, 'seconds')
+        return {
+            'stages': self.stages,
+            'total_seconds': sum(self.stages.values()),
+            'tracking': totals,
+            'slowest_skus': tasks.to_dict('records'),
+        }
+
+    def save(self, dirpath: Path, fname: str) -> list[Path]:
+        """Writes fname.json and, if SKUs were tracked, fname.csv."""
+        json_path = Path(dirpath) / (fname + '.json')
+        with open(json_path, 'w') as write_file:
+            json.dump(self.to_dict(), write_file, indent=4)
+        if len(self.tasks) == 0:
+            return [json_path]
+        csv_path = Path(dirpath) / (fname + '.csv')
+        pd.DataFrame(self.tasks).to_csv(csv_path, index=False)
+        return [json_path, csv_path]
+
+
+def save_hot_paths(
+    profiler: cProfile.Profile, dirpath: Path, fname: str, lines: int = 50
+) -> list[Path]:
+    """Writes the cProfile stats (fname.prof, for pstats or snakeviz) and
+    the functions with the most cumulative time (fname.txt)."""
+    prof_path = Path(dirpath) / (fname + '.prof')
+    txt_path = Path(dirpath) / (fname + '.txt')
+    profiler.dump_stats(prof_path)
+    with open(txt_path, 'w') as write_file:
+        pstats.Stats(profiler, stream=write_file).sort_stats(
+            'cumulative'
+        ).print_stats(lines)
+    return [prof_path, txt_path]
@@ -1,8 +1,18 @@
 """ item.py
 Defines class Item: Representation of a physical product with its
 history of movements.
+Defines class WaypointChain: Persistent history of waypoints, shared
+between the items split from a same product while it is being tracked.
 
 Class Item - methods:
+    .to_tuple
+
+Class WaypointChain - methods:
+    .__init__
+    .from_list
+    .append
+    .to_list
+    .last
 """
 
 from dataclasses import dataclass
@@ -29,4 +39,44 @@ class Item:
             self.unit_value,
             self.brand,
             self.category
-        )
\ No newline at end of file
+        )
+
+
+class WaypointChain:
+    """Linked list of waypoints, from the last one back to the first one.
+    Chains are never modified: appending returns a new chain pointing to
+    the previous one, so that the items split from a product share their
+    common history instead of copying it."""
+    __slots__ = ('parent', 'waypoint', 'length')
+
+    def __init__(
+        self, waypoint: list, parent: 'WaypointChain | None' = None
+    ) -> None:
+        self.parent = parent
+        self.waypoint = waypoint
+        self.length = 1 if parent is None else parent.length + 1
+
+    def __len__(self) -> int:
+        return self.length
+
+    @classmethod
+    def from_list(cls, waypoints: list) -> 'WaypointChain':
+        chain = None
+        for wpt in waypoints:
+            chain = cls(list(wpt), chain)
+        return chain
+
+    def append(self, waypoint: list) -> 'WaypointChain':
+        return WaypointChain(waypoint, self)
+
+    def to_list(self) -> list:
+        waypoints = []
+        chain = self
+        while chain is not None:
+            waypoints.append(list(chain.waypoint))
+            chain = chain.parent
+        return waypoints[::-1]
+
+    @property
+    def last(self) -> list:
+        return self.waypoint
@@ -0,0 +1,137 @@
+""" item_store.py
+Defines class PartitionedItemStore: Items database split by item status.
+
+Closed items can't move anymore: they are appended once to a partition
+of their own and are never read again while tracking. Open items (incl.
+items waiting for the 2nd part of a PO) are kept in a single partition,
+rewritten at every run. Each partition holds the two tables of an
+ItemTable, written with the storage backend of the profile.
+
+Layout:
+    <path>/closed/part-<run>.items<suffix>, part-<run>.waypoints<suffix>
+    <path>/open.items<suffix>, open.waypoints<suffix>
+
+Class PartitionedItemStore - methods:
+    .__init__
+    .fetch
+    .save
+
+Functions:
+    read_item_table
+    write_item_table
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from product_trailer.item_table import ItemTable
+from product_trailer.storage import PickleBackend, ParquetBackend
+
+
+class PartitionedItemStore:
+    def __init__(
+        self, dirpath: Path, backend: PickleBackend | ParquetBackend
+    ) -> None:
+        self.path = dirpath
+        self.backend = backend
+        self.closed_path = self.path / 'closed'
+        if not self.closed_path.is_dir():
+            self.closed_path.mkdir(parents=True)
+
+
+    def fetch(
+        self,
+        status: str = 'all',
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None
+    ) -> ItemTable | None:
+        """status: 'all', 'open' or 'closed'."""
+        stems = []
+        if status in ['all', 'closed']:
+            pattern = 'part-*.items' + self.backend.SUFFIX
+            stems.extend(sorted(
+                self.closed_path / fpath.name.split('.')[0]
+                for fpath in self.closed_path.glob(pattern)
+            ))
+        if status in ['all', 'open']:
+            stems.append(self.path / 'open')
+        tables = [
+            table for stem in stems
+            if (
+                table := read_item_table(self.backend, stem, columns, filters)
+            ) is not None
+        ]
+        if len(tables) == 0:
+            return None
+        return ItemTable.concat(tables)
+
+    def save(self, items: ItemTable, run_count: int) -> None:
+        closed = np.asarray(
+            items.items['open'].fillna(True) == False, dtype=bool
+        )
+        if closed.any():
+            stem = self.closed_path / f'part-{run_count:06d}'
+            num = 1
+            while _table_path(self.backend, stem, 'items').is_file():
+                stem = self.closed_path / f'part-{run_count:06d}-{num}'
+                num += 1
+            write_item_table(self.backend, items.select(closed), stem)
+        write_item_table(self.backend, items.select(~closed), self.path / 'open')
+
+
+def read_item_table(
+    backend: PickleBackend | ParquetBackend,
+    stem: Path,
+    columns: list[str] | None = None,
+    filters: list[tuple] | None = None
+) -> ItemTable | None:
+    """Waypoints are only read if columns is None or contains 'waypoints'.
+    Filters apply to item features."""
+    items_path = _table_path(backend, stem, 'items')
+    if not items_path.is_file():
+        return None
+    item_columns = None
+    if columns is not None:
+        item_columns = [col for col in columns if col != 'waypoints']
+        item_columns.append('item_no')
+    items = backend.read(items_path, item_columns, filters)
+    positions = items.pop('item_no').to_numpy()
+
+    if columns is not None and 'waypoints' not in columns:
+        waypoints = ItemTable._flatten([])
+    else:
+        waypoints = backend.read(
+            _table_path(backend, stem, 'waypoints'),
+            filters=[('item_no', 'in', positions.tolist())] if filters else None
+        )
+        waypoints['item_no'] = np.searchsorted(
+            positions, waypoints['item_no'].to_numpy()
+        )
+    return ItemTable(items, waypoints)
+
+
+def write_item_table(
+    backend: PickleBackend | ParquetBackend, items: ItemTable, stem: Path
+) -> None:
+    # Item positions are stored with the items, so that the waypoints of
+    # filtered items can be read back without reading all items.
+    # Written to temporary files first: an interrupted run can't leave
+    # a partition with only one of its tables updated.
+    paths = {}
+    for name, df in [
+        ('items', items.items.assign(item_no=np.arange(len(items)))),
+        ('waypoints', items.waypoints)
+    ]:
+        fpath = _table_path(backend, stem, name)
+        tmp_path = fpath.with_name(fpath.name + '.tmp')
+        backend.write(df, tmp_path)
+        paths[tmp_path] = fpath
+    for tmp_path, fpath in paths.items():
+        tmp_path.replace(fpath)
+
+
+def _table_path(
+    backend: PickleBackend | ParquetBackend, stem: Path, name: str
+) -> Path:
+    return stem.with_name(f'{stem.name}.{name}{backend.SUFFIX}')
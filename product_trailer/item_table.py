@@ -0,0 +1,205 @@
+""" item_table.py
+Defines class ItemTable: Columnar representation of tracked items.
+
+Items are stored in two tables instead of Item objects holding lists of
+waypoint lists:
+- items: one row per item, indexed by item id (same columns as the items
+  database, without waypoints)
+- waypoints: one row per waypoint, sorted by item_no then seq. item_no is
+  the position of the item in the items table. Waypoint features are
+  stored as a datetime column and categoricals.
+
+Class ItemTable - methods:
+    .__init__
+    .__len__
+    .from_items
+    .from_frame
+    .concat
+    .to_frame
+    .to_items
+    .select
+    .reorder
+    .waypoint_lists
+    ._flatten
+    ._union_categoricals
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from product_trailer.item import Item
+
+
+ITEM_COLS = list(Item.__slots__[1:])
+WPT_COLS = ['date', 'company', 'sloc', 'soldto', 'mvt_code', 'batch']
+
+
+@dataclass
+class ItemTable:
+    items: pd.DataFrame
+    waypoints: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+    @classmethod
+    def from_items(
+        cls, items: list[Item], infer_dtypes: bool = True
+    ) -> 'ItemTable':
+        """infer_dtypes=False keeps item features as object columns, for
+        tables concatenated before inferring dtypes on the whole set."""
+        items_df = pd.DataFrame(
+            [
+                [
+                    val for col, val in zip(ITEM_COLS, item.to_tuple())
+                    if col != 'waypoints'
+                ]
+                for item in items
+            ],
+            index=[item.id for item in items],
+            columns=[col for col in ITEM_COLS if col != 'waypoints'],
+            dtype=object
+        )
+        if infer_dtypes:
+            items_df = items_df.infer_objects()
+        return cls(
+            items_df, cls._flatten([item.waypoints for item in items])
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'ItemTable':
+        """From a DataFrame with one waypoints column, as in the items
+        database."""
+        return cls(
+            df.drop(columns=['waypoints']),
+            cls._flatten(df['waypoints'].to_list())
+        )
+
+    @classmethod
+    def concat(cls, tables: list['ItemTable']) -> 'ItemTable':
+        tables = [table for table in tables if len(table) > 0]
+        if len(tables) == 0:
+            return cls.from_items([])
+        offsets = np.cumsum([0] + [len(table) for table in tables[:-1]])
+        waypoints = pd.DataFrame({
+            'item_no': np.concatenate([
+                table.waypoints['item_no'].to_numpy() + offset
+                for table, offset in zip(tables, offsets)
+            ]),
+            'seq': np.concatenate([
+                table.waypoints['seq'].to_numpy() for table in tables
+            ]),
+            'date': pd.concat(
+                [table.waypoints['date'] for table in tables],
+                ignore_index=True
+            ),
+            **{
+                col: cls._union_categoricals(
+                    [table.waypoints[col] for table in tables]
+                )
+                for col in WPT_COLS[1:]
+            }
+        })
+        return cls(
+            pd.concat([table.items for table in tables], axis=0),
+            waypoints
+        )
+
+
+    def to_frame(self, waypoints: list | None = None) -> pd.DataFrame:
+        """To a DataFrame with one waypoints column, as in the items
+        database. waypoints: values of this column instead of the lists of
+        waypoints (e.g. waypoints formatted as text)."""
+        df = self.items.copy()
+        position = sum(
+            col in df.columns
+            for col in ITEM_COLS[:ITEM_COLS.index('waypoints')]
+        )
+        df.insert(
+            position,
+            'waypoints',
+            self.waypoint_lists() if waypoints is None else waypoints
+        )
+        return df
+
+    def to_items(self) -> list[Item]:
+        return [
+            Item(item_id, *row[:4], wpts, *row[4:])
+            for item_id, row, wpts in zip(
+                self.items.index,
+                self.items.itertuples(index=False),
+                self.waypoint_lists()
+            )
+        ]
+
+    def select(self, mask: np.ndarray | pd.Series) -> 'ItemTable':
+        mask = np.asarray(mask, dtype=bool)
+        new_item_no = np.cumsum(mask) - 1
+        wpt_mask = mask[self.waypoints['item_no'].to_numpy()]
+        waypoints = self.waypoints.loc[wpt_mask].reset_index(drop=True)
+        waypoints['item_no'] = new_item_no[waypoints['item_no'].to_numpy()]
+        return ItemTable(self.items.loc[mask], waypoints)
+
+    def reorder(self, order: np.ndarray) -> 'ItemTable':
+        """Items at positions order (a permutation), in this order."""
+        order = np.asarray(order, dtype=np.int64)
+        new_item_no = np.empty(len(order), dtype=np.int64)
+        new_item_no[order] = np.arange(len(order))
+        waypoints = self.waypoints.assign(
+            item_no=new_item_no[self.waypoints['item_no'].to_numpy()]
+        )
+        waypoints = waypoints.iloc[np.argsort(
+            waypoints['item_no'].to_numpy(), kind='stable'
+        )].reset_index(drop=True)
+        return ItemTable(self.items.iloc[order], waypoints)
+
+    def waypoint_lists(self) -> list[list]:
+        fields = [
+            self.waypoints[col].astype(object).to_numpy()
+            for col in WPT_COLS
+        ]
+        wpts = [list(wpt) for wpt in zip(*fields)]
+        bounds = np.searchsorted(
+            self.waypoints['item_no'].to_numpy(), np.arange(len(self) + 1)
+        ).tolist()
+        return [
+            wpts[start:end] for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+
+    #
+    # NON-USER INTERFACE METHODS
+    #
+
+    @staticmethod
+    def _flatten(waypoint_lists: list[list]) -> pd.DataFrame:
+        lengths = np.fromiter(
+            map(len, waypoint_lists), dtype=np.int64, count=len(waypoint_lists)
+        )
+        fields = list(zip(*chain.from_iterable(waypoint_lists)))
+        if len(fields) == 0:
+            fields = [[] for _ in WPT_COLS]
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return pd.DataFrame({
+            'item_no': np.repeat(np.arange(len(lengths)), lengths),
+            'seq': (np.arange(lengths.sum()) - starts).astype('int32'),
+            'date': pd.to_datetime(pd.Series(fields[0], dtype=object)),
+            **{
+                col: pd.Categorical(pd.Series(values, dtype=object))
+                for col, values in zip(WPT_COLS[1:], fields[1:])
+            }
+        })
+
+    @staticmethod
+    def _union_categoricals(columns: list[pd.Series]) -> pd.Categorical:
+        try:
+            return union_categoricals(columns, ignore_order=True)
+        except TypeError:  # Categories of different dtypes
+            return pd.Categorical(pd.concat(
+                [col.astype(object) for col in columns], ignore_index=True
+            ))
@@ -0,0 +1,147 @@
+""" key_codec.py
+Defines class KeyCodec: Dictionary encoding of the key columns of the
+movements (Company, SLOC, Sold to, Mvt Code, Batch, Document, PO) into
+dense integer codes, so that ForwardTracker compares and hashes integers
+instead of strings.
+
+All columns share one vocabulary: a value has the same code whichever
+column it comes from (e.g. a PO number stored in the Mvt Code field of a
+waypoint). Missing values are encoded as MISSING (-1). Values which aren't
+in the movements (labels built while tracking, values from items of
+previous runs) are added to the vocabulary when encoded.
+
+Class KeyCodec - methods:
+    .__init__
+    .from_movements
+    .encode
+    .decode
+    .join
+    .encode_waypoint
+    .decode_waypoint
+    .encode_movements
+    .decode_movements
+    ._category_codes
+"""
+
+import numpy as np
+import pandas as pd
+
+
+MISSING = -1
+
+
+class KeyCodec:
+    COLUMNS = ['Company', 'Document', 'PO', 'Mvt Code', 'SLOC', 'Sold to',
+               'Batch']
+
+    def __init__(self, values: list, dtypes: dict | None = None) -> None:
+        """values: vocabulary, code -> value. dtypes: dtypes of the encoded
+        columns, restored by decode_movements."""
+        self.values = list(values)
+        self.codes = {val: code for code, val in enumerate(self.values)}
+        self.dtypes = dtypes or {}
+        self.joined = {}
+        self.decoders = {}
+
+
+    @classmethod
+    def from_movements(
+        cls, mvts: pd.DataFrame, columns: list[str] | None = None
+    ) -> 'KeyCodec':
+        columns = [
+            col for col in (columns or KeyCodec.COLUMNS) if col in mvts.columns
+        ]
+        values = {}
+        for col in columns:
+            if isinstance(mvts[col].dtype, pd.CategoricalDtype):
+                uniques = mvts[col].cat.categories
+            else:
+                uniques = pd.unique(mvts[col].dropna())
+            values.update(dict.fromkeys(uniques.tolist()))
+        return cls(values, {col: mvts[col].dtype for col in columns})
+
+    def encode(self, value) -> int:
+        code = self.codes.get(value)
+        if code is not None:
+            return code
+        # None, pd.NA (nullable dtypes), NaN or NaT
+        if value is None or value is pd.NA or value != value:
+            return MISSING
+        code = self.codes[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+    def decode(self, code: int):
+        return self.values[code] if code >= 0 else np.nan
+
+    def join(self, template: str, *codes: int) -> int:
+        """Code of template formatted with the decoded values, e.g.
+        join('BURNT {}', sloc)."""
+        key = (template, *codes)
+        code = self.joined.get(key)
+        if code is None:
+            code = self.joined[key] = self.encode(
+                template.format(*map(self.decode, codes))
+            )
+        return code
+
+    def encode_waypoint(self, wpt: list) -> list:
+        """The date stays as is, other fields are encoded."""
+        return [wpt[0], *map(self.encode, wpt[1:])]
+
+    def decode_waypoint(self, wpt: list) -> list:
+        return [wpt[0], *map(self.decode, wpt[1:])]
+
+    def encode_movements(self, mvts: pd.DataFrame) -> pd.DataFrame:
+        """Key columns are replaced by int32 codes, in place in the column
+        order."""
+        encoded = {}
+        for col in self.dtypes:
+            if isinstance(mvts[col].dtype, pd.CategoricalDtype):
+                codes = mvts[col].cat.codes.to_numpy()
+                uniques = mvts[col].cat.categories
+            else:
+                codes, uniques = pd.factorize(mvts[col])
+            lookup = np.array(
+                [self.encode(val) for val in uniques.tolist()] + [MISSING],
+                dtype=np.int32
+            )
+            encoded[col] = lookup[codes]  # code -1 (missing) -> MISSING
+        return mvts.assign(**encoded)
+
+    def decode_movements(self, mvts: pd.DataFrame) -> pd.DataFrame:
+        """Key columns get back the values and dtypes they had before
+        encode_movements."""
+        decoded = {}
+        for col, dtype in self.dtypes.items():
+            codes = mvts[col].to_numpy()
+            if isinstance(dtype, pd.CategoricalDtype):
+                decoded[col] = pd.Categorical.from_codes(
+                    self._category_codes(col)[codes], dtype=dtype
+                )
+            else:
+                if None not in self.decoders:
+                    self.decoders[None] = np.array(
+                        self.values + [np.nan], dtype=object
+                    )
+                decoded[col] = pd.Series(
+                    self.decoders[None][codes], index=mvts.index
+                ).astype(dtype)
+        return mvts.assign(**decoded)
+
+
+    #
+    # NON-USER INTERFACE METHODS
+    #
+
+    def _category_codes(self, col: str) -> np.ndarray:
+        """Shared code -> code in the categories of col. The last slot maps
+        MISSING to -1."""
+        if col not in self.decoders:
+            categories = self.dtypes[col].categories.tolist()
+            lookup = np.full(len(self.codes) + 1, -1, dtype=np.int32)
+            lookup[[self.codes[val] for val in categories]] = np.arange(
+                len(categories), dtype=np.int32
+            )
+            self.decoders[col] = lookup
+        return self.decoders[col]
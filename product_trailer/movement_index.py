@@ -0,0 +1,164 @@
+""" movement_index.py
+Defines class MovementIndex: Hash-bucket index over the movements of a
+task, so that ForwardTracker can find candidate [-] and [+] movements
+without scanning every movement of the SKU at each hop.
+
+Buckets hold row positions in the order of the movements table, so a
+lookup returns candidates in the same order as a boolean-mask scan would.
+Only static predicates are indexed (keys, sign of QTY, dates): allocation
+state changes during tracking and is filtered by the tracker.
+
+Key columns may hold values or integer codes of a KeyCodec (negative code:
+missing value). With a codec, fixed values of the specs are encoded too.
+
+Class MovementIndex - methods:
+    .__init__
+    .lookup
+    ._build
+    ._column
+    ._date_key
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class MovementIndex:
+    DATE = 'Posting Date'
+    # name: (sign of QTY, fixed column values, key columns, ranged on date)
+    # A ranged index answers "Posting Date >= date" instead of equality.
+    SPECS = {
+        'decr': (
+            -1, {}, ('Company', 'SLOC', 'Batch'), True
+        ),
+        'decr_soldto': (
+            -1, {}, ('Company', 'SLOC', 'Batch', 'Sold to'), True
+        ),
+        'decr_first': (
+            -1, {},
+            ('Posting Date', 'Company', 'SLOC', 'Batch', 'Sold to',
+             'Mvt Code'),
+            False
+        ),
+        'incr_soldto_change': (
+            1, {'Mvt Code': '955'}, ('Posting Date', 'Company', 'Batch'), False
+        ),
+        'incr_batch_change': (
+            1, {'Mvt Code': '701'},
+            ('Posting Date', 'Company', 'SLOC', 'Sold to'),
+            False
+        ),
+        'incr_po': (
+            1, {}, ('Batch', 'PO'), True
+        ),
+        'incr_nobatch': (
+            1, {},
+            ('Posting Date', 'Company', 'Sold to', 'Mvt Code', 'Document'),
+            False
+        ),
+        'incr': (
+            1, {},
+            ('Posting Date', 'Company', 'Sold to', 'Batch', 'Mvt Code',
+             'Document'),
+            False
+        ),
+    }
+    EMPTY = np.empty(0, dtype=np.int64)
+
+    def __init__(self, mvts: pd.DataFrame, codec=None) -> None:
+        self.mvts = mvts
+        self.codec = codec
+        self.dates = (
+            mvts[MovementIndex.DATE].values.astype('datetime64[ns]').view('i8')
+        )
+        self.buckets = {}
+        self.columns = {}
+
+
+    def lookup(
+        self, name: str, key: tuple, from_date: pd.Timestamp | None = None
+    ) -> np.ndarray:
+        """Returns positions of the movements matching key, in table order.
+        from_date is required by ranged indexes only."""
+        if name not in self.buckets:
+            self.buckets[name] = self._build(name)
+        _, _, key_cols, ranged = MovementIndex.SPECS[name]
+
+        key = tuple(
+            self._date_key(val) if col == MovementIndex.DATE else val
+            for col, val in zip(key_cols, key)
+        )
+        if None in key:
+            return MovementIndex.EMPTY
+        try:
+            bucket = self.buckets[name].get(key)
+        except TypeError:  # Unhashable key can't match any movement
+            return MovementIndex.EMPTY
+        if bucket is None:
+            return MovementIndex.EMPTY
+
+        if not ranged:
+            return bucket
+        from_date = self._date_key(from_date)
+        if from_date is None:
+            return MovementIndex.EMPTY
+        sorted_dates, positions = bucket
+        start = np.searchsorted(sorted_dates, from_date, side='left')
+        return np.sort(positions[start:])
+
+
+    #
+    # NON-USER INTERFACE METHODS
+    #
+
+    def _build(self, name: str) -> dict:
+        sign, fixed, key_cols, ranged = MovementIndex.SPECS[name]
+        qty = self.mvts['QTY'].values
+        selected = (qty <= -1) if sign < 0 else (qty >= 1)
+        for col, val in fixed.items():
+            if self.codec is not None:
+                val = self.codec.encode(val)
+            selected &= self._column(col) == val
+        for col in key_cols:
+            if col != MovementIndex.DATE:
+                values = self._column(col)
+                if np.issubdtype(values.dtype, np.integer):
+                    selected &= values >= 0
+                else:
+                    selected &= pd.notna(values)
+        if ranged or MovementIndex.DATE in key_cols:
+            selected &= self.mvts[MovementIndex.DATE].notna().values
+        positions = np.flatnonzero(selected)
+
+        key_values = [
+            self.dates[positions].tolist() if col == MovementIndex.DATE
+            else self._column(col)[positions].tolist()
+            for col in key_cols
+        ]
+        buckets = {}
+        for pos, key in zip(positions.tolist(), zip(*key_values)):
+            buckets.setdefault(key, []).append(pos)
+
+        if not ranged:
+            return {
+                key: np.array(bucket, dtype=np.int64)
+                for key, bucket in buckets.items()
+            }
+        sorted_buckets = {}
+        for key, bucket in buckets.items():
+            bucket = np.array(bucket, dtype=np.int64)
+            bucket_dates = self.dates[bucket]
+            order = np.argsort(bucket_dates, kind='stable')
+            sorted_buckets[key] = (bucket_dates[order], bucket[order])
+        return sorted_buckets
+
+    def _column(self, col: str) -> np.ndarray:
+        if col not in self.columns:
+            self.columns[col] = self.mvts[col].to_numpy()
+        return self.columns[col]
+
+    @staticmethod
+    def _date_key(date) -> int | None:
+        if pd.isna(date):
+            return None
+        return pd.Timestamp(date).value
@@ -4,127 +4,212 @@ Ready-made postprocessing functions.
 Functions:
     make_standard_report
     make_exportable_hist
+    iter_exportable_hist
     collect_stock_move
+    stock_move_edges
     generate_stock_move_diagram
+    stock_move_graph
+    export_stock_move_graph
+    _as_table
+    _item_bounds
+    _category_text
+    _category_names
+    _hist_frame
+    _node_codes
+    _company_countries
+    _layout
+    _date_text
+    _join_by_item
 """
 
 
-from itertools import groupby
-import functools
+import hashlib
+import json
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import networkx as nx
 import matplotlib
 import matplotlib.pyplot as plt
 
+from product_trailer.item_table import ItemTable, WPT_COLS
 
 
-def make_standard_report(tracked_items: pd.DataFrame) -> pd.DataFrame:
-    def make_features(item):
-        wpts = item['waypoints']
-        list_companies = [i[0] for i in groupby(np.array(wpts)[:,1])]
-        return {
-            'Route': ' > '.join(list(map('.'.join, np.array(wpts)[:, 1:3]))),
-            'DCs': list_companies,
-            'Return_Date': wpts[1][0],
-            'Return_Month': wpts[1][0].strftime('%Y/%m'),
-            'Company(first)': wpts[0][1],
-            'SLOC(first)': wpts[0][2],
-            'SoldTo(first)': wpts[0][3],
-            'Company(last)': wpts[-1][1],
-            'SLOC(last)': wpts[-1][2],
-            'SoldTo(last)': wpts[-1][3],
-            'Num_Steps': len(wpts),
-            'Num_Companies': len(list_companies)
-        }
-    new_cols = tracked_items[['waypoints']].apply(make_features,
-                                                  axis=1, result_type='expand')
-    ti = pd.concat([tracked_items, new_cols], axis='columns')
-
-    item_max_date = max(ti['waypoints'].apply(lambda wpts: np.array(wpts)[-1,0]))
-    ti['Num_Days_Open'] = np.where(
-        ti['open'].fillna(False),
-        item_max_date - ti['Return_Date'],
-        ti['waypoints'].apply(lambda wpts: wpts[-1][0]) - ti['Return_Date']
+NODE_LEVELS = ['company', 'company_sloc', 'country', 'soldto']
+LAYOUTS = {
+    'spring': lambda G: nx.spring_layout(G, k=3, seed=42),
+    'spectral': nx.spectral_layout,
+    'circular': nx.circular_layout,
+}
+LAYOUT_CACHE_SIZE = 20
+# From this number of nodes, spring_layout requires scipy and gets slow:
+# 'spring' falls back to 'spectral'
+SPRING_MAX_NODES = 500
+
+
+def make_standard_report(
+    tracked_items: pd.DataFrame | ItemTable
+) -> pd.DataFrame:
+    """Summary sheet: one row per item, with its route and the features of
+    its first and last waypoints. Computed on the flat waypoint table of
+    the items: values are formatted once per distinct value, then
+    gathered by item."""
+    table = _as_table(tracked_items)
+    wpts = table.waypoints
+    bounds = _item_bounds(table)
+    starts, ends = bounds[:-1], bounds[1:]
+    lengths = ends - starts
+    text = {col: _category_text(wpts[col]) for col in WPT_COLS[1:]}
+    values = {
+        col: wpts[col].astype(object).to_numpy() for col in WPT_COLS[1:]
+    }
+    dates = wpts['date'].to_numpy()
+    nat = np.datetime64('NaT', 'ns')
+    return_dates = np.where(
+        lengths >= 2, dates[np.minimum(starts + 1, len(dates) - 1)], nat
+    ) if len(dates) > 0 else np.full(len(table), nat)
+    last_dates = dates[ends - 1] if len(dates) > 0 else return_dates
+
+    # Companies visited: consecutive waypoints in the same company count once
+    codes = wpts['company'].cat.codes.to_numpy()
+    new_company = np.ones(len(codes), dtype=bool)
+    new_company[1:] = codes[1:] != codes[:-1]
+    new_company[starts[lengths > 0]] = True
+    new_company |= codes == -1
+    company_bounds = np.searchsorted(
+        wpts['item_no'].to_numpy()[new_company], np.arange(len(table) + 1)
     )
 
-    # Formating
-    ti['Return_Date'] = ti['Return_Date'].dt.strftime('%Y-%m-%d')
-    ti['DCs'] = ti['DCs'].apply(lambda DCs: ' > '.join(DCs))
-    def decorate_wpts(wpts):
-        return '  >>>  '.join(
-            [', '.join(map(str, ['-', *wpts[0][1:]]))]
-            + list(map(
-                lambda x: ', '.join(map(str, [x[0].strftime('%Y-%m-%d'), *x[1:]])),
-                wpts[1:]
-                ))
-            )
-    ti['waypoints'] = ti['waypoints'].apply(lambda wpts: decorate_wpts(wpts))
-    return ti.reset_index()
-
-
-def make_exportable_hist(tracked_Items: pd.DataFrame) -> pd.DataFrame:
-    tobe_rtn = (
-        tracked_Items
-        .explode('waypoints')
-        .reset_index(names='id')
-        .assign(WaypointNo = lambda df_: 1+df_.groupby('id').cumcount(),
-                Landing_Date = lambda df_: df_['waypoints'].apply(lambda row: row[0]),
-                Landing_Code = lambda df_: df_['waypoints'].apply(lambda row: row[3]),
-                SLOC = lambda df_: df_['waypoints'].apply(lambda row: row[1]),
-                Soldto = lambda df_: df_['waypoints'].apply(lambda row: row[2]),
-                Batch_ = lambda df_: df_['waypoints'].apply(lambda row: row[4]),
-                Depart_Date = lambda df_: df_.groupby('id')['Landing_Date'].shift(-1))
-        .drop(columns=['waypoints'])
+    new_cols = pd.DataFrame({
+        'Route': _join_by_item(text['company'] + '.' + text['sloc'], bounds, ' > '),
+        'DCs': _join_by_item(text['company'][new_company], company_bounds, ' > '),
+        'Return_Date': _date_text(return_dates, '%Y-%m-%d'),
+        'Return_Month': _date_text(return_dates, '%Y/%m'),
+        'Company(first)': values['company'][starts],
+        'SLOC(first)': values['sloc'][starts],
+        'SoldTo(first)': values['soldto'][starts],
+        'Company(last)': values['company'][ends - 1],
+        'SLOC(last)': values['sloc'][ends - 1],
+        'SoldTo(last)': values['soldto'][ends - 1],
+        'Num_Steps': lengths,
+        'Num_Companies': np.diff(company_bounds),
+    })
+    open_until = np.where(
+        table.items['open'].fillna(False).to_numpy(dtype=bool),
+        last_dates.max() if len(last_dates) > 0 else nat,
+        last_dates
     )
-    tobe_rtn['Landing_Date'] = tobe_rtn.apply(
-        lambda row: np.nan if row['WaypointNo']==1 else row['Landing_Date'],
-        axis=1
+    new_cols['Num_Days_Open'] = open_until - return_dates
+
+    # Waypoints as text, first waypoint without its date
+    date_text = _date_text(dates, '%Y-%m-%d', missing='NaT')
+    date_text[starts[lengths > 0]] = '-'
+    wpt_text = date_text
+    for col in WPT_COLS[1:]:
+        wpt_text = wpt_text + ', ' + text[col]
+    decorated = _join_by_item(wpt_text, bounds, '  >>>  ')
+
+    if isinstance(tracked_items, ItemTable):
+        ti = table.to_frame(decorated)
+    else:
+        ti = tracked_items.copy()
+        ti['waypoints'] = decorated
+    new_cols.index = ti.index
+    return pd.concat([ti, new_cols], axis='columns').reset_index()
+
+
+def make_exportable_hist(
+    tracked_Items: pd.DataFrame | ItemTable
+) -> pd.DataFrame:
+    """Details sheet: one row per waypoint, with the features of its
+    item."""
+    table = _as_table(tracked_Items)
+    return _hist_frame(table, _item_bounds(table), 0, len(table))
+
+
+def iter_exportable_hist(
+    tracked_items: pd.DataFrame | ItemTable, chunk_items: int = 100_000
+):
+    """make_exportable_hist by chunks of chunk_items items, so that the
+    whole details sheet is never held in memory. The chunks concatenated
+    are the details sheet. No items: one empty chunk, for the header."""
+    table = _as_table(tracked_items)
+    bounds = _item_bounds(table)
+    for start in range(0, max(1, len(table)), max(1, chunk_items)):
+        yield _hist_frame(
+            table, bounds, start, min(start + chunk_items, len(table))
         )
-    tobe_rtn['Landing_Code'] = tobe_rtn.apply(
-        lambda row: np.nan if row['WaypointNo']==1 else row['Landing_Code'],
-        axis=1
+
+
+def collect_stock_move(
+    df: pd.DataFrame | ItemTable,
+    node_level: str,
+    company_country: dict | None = None
+) -> dict:
+    """Quantities moved between nodes: {'from-to': [from, to, qty]}, in
+    order of first move. See stock_move_edges."""
+    edges = stock_move_edges(df, node_level, company_country)
+    return {
+        node_from + '-' + node_to: [node_from, node_to, qty]
+        for node_from, node_to, qty in zip(
+            edges['from'].tolist(), edges['to'].tolist(), edges['qty'].tolist()
         )
-    
-    return tobe_rtn
-
-
-def collect_stock_move(df: pd.DataFrame, node_level: str) -> dict:
-    stock_move = dict()
-    def node_name(wpt, node_level):
-            if node_level == 'company':
-                return wpt[1]
-    node_name = functools.partial(node_name, node_level=node_level)
-
-    def assign_move(series):
-        qty = series['qty']
-        wpts = series['waypoints']
-        
-        for i, wpt in enumerate(wpts):
-            if i == 0:
-                continue
-            node_from, node_to = node_name(wpts[i-1]), node_name(wpt)
-            if node_from != node_to:
-                move_name = node_from + '-' + node_to
-                if move_name in stock_move.keys():
-                    stock_move[move_name][2] += qty
-                else:
-                    stock_move[move_name] = [node_from, node_to, qty]
-    
-    df.apply(assign_move, axis=1)
-    return stock_move
+    }
 
 
-def generate_stock_move_diagram(stock_move: dict,
-                            max_edge_width: int=4) -> plt.figure:
-    G = nx.DiGraph()
-    edges =  [item for item in stock_move.values()]
-    G.add_weighted_edges_from(edges)
-    
+def stock_move_edges(
+    tracked_items: pd.DataFrame | ItemTable,
+    node_level: str,
+    company_country: dict | None = None
+) -> pd.DataFrame:
+    """Quantities moved between nodes (columns from, to, qty), one row per
+    pair of nodes in order of first move: quantities of items summed over
+    consecutive waypoints in different nodes. Nodes (node_level):
+    - 'company'
+    - 'company_sloc': company.SLOC
+    - 'country': country of the company, from company_country or else from
+      the entry points of the items (ini_country of their first company);
+      companies of unknown country are kept as they are
+    - 'soldto': sold-to, or company for waypoints without sold-to (stock)
+    """
+    table = _as_table(tracked_items)
+    wpts = table.waypoints
+    nodes, names = _node_codes(table, node_level, company_country)
+    item_no = wpts['item_no'].to_numpy()
+    moves = (item_no[1:] == item_no[:-1]) & (nodes[1:] != nodes[:-1])
+    node_from, node_to = nodes[:-1][moves], nodes[1:][moves]
+    qty = table.items['qty'].to_numpy()[item_no[1:][moves]]
+    edge_codes, edges = pd.factorize(node_from * len(names) + node_to)
+    return pd.DataFrame({
+        'from': names[edges // max(1, len(names))],
+        'to': names[edges % max(1, len(names))],
+        'qty': pd.Series(qty).groupby(edge_codes).sum().to_numpy(),
+    })
+
+
+def generate_stock_move_diagram(
+    stock_move: dict,
+    max_edge_width: int = 4,
+    min_qty: float = 0,
+    top_edges: int | None = None,
+    layout: str = 'spring',
+    layout_cache: str | Path | None = None,
+    max_curved_edges: int = 200
+) -> plt.figure:
+    """Network diagram of the stock moves (see stock_move_graph for
+    min_qty, top_edges). layout: one of LAYOUTS ('spectral' and 'circular'
+    are faster on large graphs; 'spring' falls back to 'spectral' from
+    SPRING_MAX_NODES nodes); positions are reused from the json file
+    layout_cache when the same nodes were laid out before. Graphs with more
+    than max_curved_edges edges are drawn with straight lines, much faster
+    to render."""
+    G = stock_move_graph(stock_move, min_qty, top_edges)
+    edges = [(node_from, node_to) for node_from, node_to in G.edges]
+
     # Edges width normalization
-    edges_widths = [item[2] for item in edges]
-    edges_widths = [max(1, int(max_edge_width*item/max(edges_widths)))
-                    for item in edges_widths]
+    weights = [weight for _, _, weight in G.edges(data='weight')]
+    edges_widths = [max(1, int(max_edge_width*weight/max(weights)))
+                    for weight in weights]
 
     # Colours to nodes
     colourmap = matplotlib.colormaps['tab20']
@@ -136,19 +221,251 @@ def generate_stock_move_diagram(stock_move: dict,
     ax.set_title(f'Network diagram with {len(G.nodes)} nodes')
     fig.tight_layout()
     
-    pos = nx.spring_layout(G, k=3, seed=42)
+    pos = _layout(G, layout, layout_cache)
     # circular_layout for networks with nodes of similar importance
     
-    nx.draw_networkx_edges(G, pos, arrows=True, alpha=1,
-                           edge_color="lightgrey",
-                           connectionstyle="arc3,rad=0.2",
-                           width=edges_widths,
-                           arrowsize=20, node_size=1000)
+    if len(edges) <= max_curved_edges:
+        nx.draw_networkx_edges(G, pos, edgelist=edges, arrows=True, alpha=1,
+                               edge_color="lightgrey",
+                               connectionstyle="arc3,rad=0.2",
+                               width=edges_widths,
+                               arrowsize=20, node_size=1000, ax=ax)
+    else:
+        nx.draw_networkx_edges(G, pos, edgelist=edges, arrows=False,
+                               alpha=1, edge_color="lightgrey",
+                               width=edges_widths, ax=ax)
     nx.draw_networkx_nodes(G, pos, alpha=1, node_size=1000,
-                           node_color=nodes_colours)
+                           node_color=nodes_colours, ax=ax)
     nx.draw_networkx_labels(G, pos, font_size=8,
                             bbox={"fc": "white", "alpha": 0.5, 'pad': 3,
                                   'boxstyle': 'Round, pad=0.2',
-                                  'edgecolor':'none'})
+                                  'edgecolor':'none'}, ax=ax)
     return fig
 
+
+def stock_move_graph(
+    stock_move: dict, min_qty: float = 0, top_edges: int | None = None
+) -> nx.DiGraph:
+    """Graph of the stock moves, quantities as edge weights: only the moves
+    of at least min_qty, and the top_edges largest ones if given."""
+    edges = [
+        edge for edge in stock_move.values() if edge[2] >= min_qty
+    ]
+    if top_edges is not None and len(edges) > top_edges:
+        largest = sorted(
+            range(len(edges)), key=lambda i: edges[i][2], reverse=True
+        )[:top_edges]
+        edges = [edges[i] for i in sorted(largest)]
+    G = nx.DiGraph()
+    G.add_weighted_edges_from(edges)
+    return G
+
+
+def export_stock_move_graph(
+    stock_move: dict,
+    fpath: str | Path,
+    min_qty: float = 0,
+    top_edges: int | None = None
+) -> None:
+    """Graph of the stock moves to a .graphml file, or to a .csv edge list
+    (columns from, to, qty), e.g. to draw large graphs with other tools."""
+    fpath = Path(fpath)
+    G = stock_move_graph(stock_move, min_qty, top_edges)
+    if fpath.suffix == '.graphml':
+        nx.write_graphml(G, fpath)
+    elif fpath.suffix == '.csv':
+        pd.DataFrame(
+            list(G.edges(data='weight')), columns=['from', 'to', 'qty']
+        ).to_csv(fpath, index=False)
+    else:
+        raise ValueError(
+            f"Unknown graph file type '{fpath.suffix}': .graphml or .csv"
+        )
+
+
+def _as_table(tracked_items: pd.DataFrame | ItemTable) -> ItemTable:
+    if isinstance(tracked_items, ItemTable):
+        return tracked_items
+    return ItemTable.from_frame(tracked_items)
+
+
+def _item_bounds(table: ItemTable) -> np.ndarray:
+    """Waypoints of item i: rows bounds[i] to bounds[i+1] of the waypoint
+    table."""
+    return np.searchsorted(
+        table.waypoints['item_no'].to_numpy(), np.arange(len(table) + 1)
+    )
+
+
+def _category_text(values: pd.Series) -> np.ndarray:
+    """str() of each value of a categorical, computed once per category.
+    Missing values: 'nan'."""
+    return _category_names(values)[values.cat.codes.to_numpy()]
+
+
+def _category_names(values: pd.Series) -> np.ndarray:
+    """str() of the categories of a categorical, then 'nan'."""
+    return np.array(
+        [str(val) for val in values.cat.categories] + ['nan'], dtype=object
+    )
+
+
+def _hist_frame(
+    table: ItemTable, bounds: np.ndarray, start: int, end: int
+) -> pd.DataFrame:
+    """Details of items start to end-1: their waypoints with the features of
+    the items repeated. Rows are numbered as in the whole sheet."""
+    wpts = table.waypoints.iloc[bounds[start]:bounds[end]]
+    item_no = wpts['item_no'].to_numpy()
+    first = wpts['seq'].to_numpy() == 0
+    values = {
+        col: wpts[col].astype(object).to_numpy() for col in WPT_COLS[1:]
+    }
+    dates = wpts['date'].to_numpy()
+    nat = np.datetime64('NaT', 'ns')
+    depart_dates = np.full(len(dates), nat)
+    depart_dates[:-1] = np.where(
+        item_no[1:] == item_no[:-1], dates[1:], nat
+    )
+    hist = (
+        table.items.iloc[item_no]
+        .reset_index(names='id')
+        # Column names as in the former report: the value of Landing_Code is
+        # the sold-to, SLOC the company, Soldto the SLOC, Batch_ the mvt code
+        .assign(
+            WaypointNo=wpts['seq'].to_numpy().astype(np.int64) + 1,
+            Landing_Date=np.where(first, nat, dates),
+            Landing_Code=np.where(first, np.nan, values['soldto']),
+            SLOC=values['company'],
+            Soldto=values['sloc'],
+            Batch_=values['mvt_code'],
+            Depart_Date=depart_dates,
+        )
+    )
+    hist.index = pd.RangeIndex(bounds[start], bounds[end])
+    return hist
+
+
+def _node_codes(
+    table: ItemTable, node_level: str, company_country: dict | None
+) -> (np.ndarray, np.ndarray):
+    """Node of each waypoint as a code, and name of each code (codes of the
+    same name merged)."""
+    def codes_of(col):
+        codes = table.waypoints[col].cat.codes.to_numpy().astype(np.int64)
+        text = _category_names(table.waypoints[col])
+        return np.where(codes < 0, len(text) - 1, codes), text
+
+    companies, company_names = codes_of('company')
+    if node_level == 'company':
+        nodes, names = companies, company_names
+    elif node_level == 'company_sloc':
+        slocs, sloc_names = codes_of('sloc')
+        nodes, pairs = pd.factorize(companies * len(sloc_names) + slocs)
+        names = (
+            company_names[pairs // len(sloc_names)] + '.'
+            + sloc_names[pairs % len(sloc_names)]
+        )
+    elif node_level == 'country':
+        if company_country is None:
+            company_country = _company_countries(table)
+        nodes = companies
+        names = np.array(
+            [company_country.get(company, company)
+             for company in company_names.tolist()],
+            dtype=object
+        )
+    elif node_level == 'soldto':
+        soldtos, soldto_names = codes_of('soldto')
+        stock = soldtos == len(soldto_names) - 1
+        nodes = np.where(stock, len(soldto_names) + companies, soldtos)
+        names = np.concatenate([soldto_names, company_names])
+    else:
+        raise ValueError(
+            f'Unknown node level {node_level!r}: one of {NODE_LEVELS}'
+        )
+    canonical, names = pd.factorize(names)
+    return canonical[nodes], np.asarray(names, dtype=object)
+
+
+def _company_countries(table: ItemTable) -> dict:
+    """Country of each company at the first waypoint of items: their
+    ini_country (most frequent one)."""
+    if 'ini_country' not in table.items.columns:
+        raise ValueError(
+            "Node level 'country' needs company_country or the ini_country "
+            "of items"
+        )
+    first = table.waypoints['seq'].to_numpy() == 0
+    return dict(
+        pd.DataFrame({
+            'company': table.waypoints['company'].to_numpy()[first],
+            'country': table.items['ini_country'].to_numpy()[
+                table.waypoints['item_no'].to_numpy()[first]
+            ],
+        })
+        .astype(object)
+        .value_counts()
+        .reset_index()
+        .drop_duplicates('company', keep='first')
+        [['company', 'country']]
+        .itertuples(index=False)
+    )
+
+
+def _layout(
+    G: nx.DiGraph, layout: str, layout_cache: str | Path | None
+) -> dict:
+    """Positions of the nodes, from layout_cache if the same nodes were laid
+    out with the same layout before. The cache keeps the last
+    LAYOUT_CACHE_SIZE layouts."""
+    if layout not in LAYOUTS:
+        raise ValueError(
+            f"Unknown layout '{layout}'. Options: {', '.join(LAYOUTS)}"
+        )
+    if layout == 'spring' and G.number_of_nodes() >= SPRING_MAX_NODES:
+        layout = 'spectral'
+    if layout_cache is None:
+        return LAYOUTS[layout](G)
+
+    layout_cache = Path(layout_cache)
+    key = layout + ':' + hashlib.sha1(
+        '\n'.join(sorted(map(str, G.nodes))).encode()
+    ).hexdigest()
+    cache = {}
+    if layout_cache.is_file():
+        with open(layout_cache) as read_file:
+            cache = json.load(read_file)
+    if key in cache:
+        return {node: np.array(cache[key][str(node)]) for node in G.nodes}
+
+    pos = LAYOUTS[layout](G)
+    cache[key] = {
+        str(node): [float(x) for x in xy] for node, xy in pos.items()
+    }
+    cache = dict(list(cache.items())[-LAYOUT_CACHE_SIZE:])
+    with open(layout_cache, 'w') as write_file:
+        json.dump(cache, write_file)
+    return pos
+
+
+def _date_text(
+    dates: np.ndarray, fmt: str, missing: str | float = np.nan
+) -> np.ndarray:
+    """strftime of each date, computed once per distinct date."""
+    codes, uniques = pd.factorize(dates)
+    text = np.append(
+        pd.DatetimeIndex(uniques).strftime(fmt).to_numpy(dtype=object),
+        np.array([missing], dtype=object)
+    )
+    return text[codes]
+
+
+def _join_by_item(
+    values: np.ndarray, bounds: np.ndarray, sep: str
+) -> list[str]:
+    values = values.tolist()
+    return [
+        sep.join(values[start:end])
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+    ]
@@ -9,21 +9,41 @@ Class Profile - methods:
     .postprocess
     .find_unread
     .add_read
+    .import_batch
+    .start_batch
+    .end_batch
+    .interrupted_batch
     .fetch_items
+    .fetch_items_to_track
     .save_items
     .save_movements
+    .migrate_storage
+    .save_report
     .save_excel
     .save_figure
+    ._find_db
+    ._itemdb_stem
+    ._items_frame
 """
 
+import shutil
 import string
 import tomllib
 import importlib
+import inspect
+from functools import partial
 from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from product_trailer import ingest
+from product_trailer.report_writer import write_report
 from product_trailer.user_data import UserData
+from product_trailer.item_table import ItemTable
+from product_trailer.item_store import (
+    PartitionedItemStore, read_item_table, write_item_table
+)
+from product_trailer.storage import get_backend, PickleBackend, ParquetBackend
 
 
 class Profile():
@@ -32,6 +52,8 @@ class Profile():
         self.name = profile_name
         self.path = Path('profiles') / self.name
         self.data_path = self.path / 'data'
+        self.checkpoint_path = self.data_path / 'checkpoint'
+        self.ingest_cache_path = self.data_path / 'ingest_cache'
         if not self.data_path.is_dir():
             self.data_path.mkdir(parents=True)
         
@@ -47,8 +69,16 @@ class Profile():
         with open(self.config_path / 'config.toml', mode="rb") as fp:
             cfg = tomllib.load(fp)
         self.db_config = cfg['data']
+        self.scheduler_config = cfg.get('scheduler', {})
+        self.storage = get_backend(self.db_config.get('storage', 'pickle'))
+        self.item_store = None
+        if self.db_config.get('item_store', 'single') == 'partitioned':
+            self.item_store = PartitionedItemStore(
+                self.data_path / 'items', self.storage
+            )
 
         # Report path setup
+        self.output_config = cfg['output']
         self.output_path = self.path/cfg['output']['path']
         if not self.output_path.is_dir():
             self.output_path.mkdir(parents=True, exist_ok=True)
@@ -61,6 +91,15 @@ class Profile():
             self.custom_modules + '.processing'
             )
         self.import_movements = processing.import_movements
+        # Parsed raw files cached in the profile (if the profile's
+        # import_movements takes a cache_dir)
+        if 'cache_dir' in inspect.signature(
+            processing.import_movements
+        ).parameters:
+            self.import_movements = partial(
+                processing.import_movements,
+                cache_dir=self.ingest_cache_path
+            )
         self.is_entry_point = processing.is_entry_point
     
 
@@ -99,27 +138,118 @@ class Profile():
         filesread = set(self.user_data.fetch('read', []))
         filesread.add(str(filename))
         self.user_data.set({'read': list(filesread)})
+
+    def import_batch(self, filepaths: list[str]) -> pd.DataFrame:
+        """Movements of several files as one table, in date order. Rows of
+        the same date keep the order of the files."""
+        if len(filepaths) == 1:
+            return self.import_movements(filepaths[0])
+        parts = [self.import_movements(fpath) for fpath in filepaths]
+        mvts = (
+            ingest.concat_chunks(parts)
+            .sort_values('Posting Date', kind='stable')
+        )
+        stats = [part.attrs['ingest'] for part in parts if 'ingest' in part.attrs]
+        if len(stats) > 0:
+            rows = sum(stat['rows'] for stat in stats)
+            seconds = sum(stat['seconds'] for stat in stats)
+            mvts.attrs['ingest'] = {
+                'rows': rows,
+                'seconds': seconds,
+                'rows_per_s': rows / seconds if seconds > 0 else float('inf'),
+                'cached': all(stat['cached'] for stat in stats),
+                'chunksize': stats[0]['chunksize'],
+            }
+        rejected = {}
+        for part in parts:
+            for reason, num in part.attrs.get('rejected_rows', {}).items():
+                rejected[reason] = rejected.get(reason, 0) + num
+        if len(rejected) > 0:
+            mvts.attrs['rejected_rows'] = rejected
+        return mvts
+
+    def start_batch(self, filepaths: list[str]) -> None:
+        """Checkpoint: files processed in the current scheduling pass."""
+        self.user_data.set({'batch': list(map(str, filepaths))})
+
+    def end_batch(self) -> None:
+        """Marks the files of the current batch as read, once its items
+        and movements are saved. The scheduler's checkpoint is removed."""
+        for fpath in self.interrupted_batch():
+            self.add_read(fpath)
+        self.user_data.set({'batch': []})
+        shutil.rmtree(self.checkpoint_path, ignore_errors=True)
+
+    def interrupted_batch(self) -> list[str]:
+        """Files of a batch started but not ended, e.g. after a crash."""
+        return self.user_data.fetch('batch', [])
     
 
-    def fetch_items(self) -> None | pd.DataFrame:
-        possible_db = list(
-            self.data_path.glob(self.db_config['fname_items']+'*')
-            )
+    def fetch_items(
+        self,
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None
+    ) -> None | pd.DataFrame:
+        """columns, filters: see storage.py. With the Parquet backend,
+        only the columns and rows requested are read."""
+        if self.item_store is not None:
+            items = self.item_store.fetch('all', columns, filters)
+            return self._items_frame(items, columns)
+
+        possible_db = self._find_db(self.db_config['fname_items'])
         if len(possible_db) == 0:
             self.last_itemdb_path = ''
             return None
         
         else:
             self.last_itemdb_path = sorted(possible_db)[-1]
-            return pd.read_pickle(self.last_itemdb_path)
+            if isinstance(self.storage, PickleBackend):
+                return self.storage.read(
+                    self.last_itemdb_path, columns, filters
+                )
+            items = read_item_table(
+                self.storage,
+                self._itemdb_stem(self.last_itemdb_path),
+                columns,
+                filters
+            )
+            return self._items_frame(items, columns)
+
+    def fetch_items_to_track(self) -> None | pd.DataFrame:
+        """Items the scheduler has to go through: in a partitioned store,
+        closed items stay where they are and only open ones are loaded."""
+        if self.item_store is not None:
+            return self._items_frame(self.item_store.fetch('open'))
+        return self.fetch_items()
         
-    def save_items(self, items: pd.DataFrame) -> None:
-        filename = f"{self.db_config['fname_items']}{self.run_count}.pkl"
-        new_itemdb_path = self.data_path / filename
-        items.to_pickle(new_itemdb_path)
+    def save_items(self, items: pd.DataFrame | ItemTable) -> None:
+        if self.item_store is not None:
+            if isinstance(items, pd.DataFrame):
+                items = ItemTable.from_frame(items)
+            self.item_store.save(items, self.run_count)
+            return
+
+        filename = f"{self.db_config['fname_items']}{self.run_count}"
+        if isinstance(self.storage, PickleBackend):
+            if isinstance(items, ItemTable):
+                items = items.to_frame()
+            new_itemdb_path = self.data_path / (filename+self.storage.SUFFIX)
+            self.storage.write(items, new_itemdb_path)
+        else:
+            if isinstance(items, pd.DataFrame):
+                items = ItemTable.from_frame(items)
+            write_item_table(self.storage, items, self.data_path / filename)
+            new_itemdb_path = self.data_path / (
+                filename + '.items' + self.storage.SUFFIX
+            )
         
         if self.db_config['no_history']:
             if self.last_itemdb_path != '':
+                if not isinstance(self.storage, PickleBackend):
+                    stem = self._itemdb_stem(self.last_itemdb_path)
+                    stem.with_name(
+                        stem.name + '.waypoints' + self.storage.SUFFIX
+                    ).unlink()
                 self.last_itemdb_path.unlink()
         self.last_itemdb_path = new_itemdb_path
     
@@ -127,21 +257,22 @@ class Profile():
     def save_movements(self, list_computed_mvts: pd.DataFrame) -> None:
         if self.db_config['save_movements']:
             mvts = pd.concat(list_computed_mvts, axis=0)
-            all_mvt_db = list(
-                self.data_path.glob(self.db_config['fname_movements']+'*')
-            )
+            all_mvt_db = self._find_db(self.db_config['fname_movements'])
             if len(all_mvt_db) == 0:
                 new_mvts = mvts
                 last_mvtdb_path = ''
             else:
                 last_mvtdb_path = sorted(all_mvt_db)[-1]
                 new_mvts = pd.concat([
-                    pd.read_pickle(last_mvtdb_path), mvts
+                    self.storage.read(last_mvtdb_path), mvts
                     ], axis=0)
             
-            fname = f"{self.db_config['fname_movements']}{self.run_count}.pkl"
+            fname = (
+                f"{self.db_config['fname_movements']}{self.run_count}"
+                + self.storage.SUFFIX
+            )
             new_mvtdb_path = self.data_path / fname
-            new_mvts.to_pickle(new_mvtdb_path)
+            self.storage.write(new_mvts, new_mvtdb_path)
             
             if self.db_config['no_history']:
                 if last_mvtdb_path != '':
@@ -151,19 +282,120 @@ class Profile():
             new_mvtdb_path = '(Movements not saved)'
     
 
-    def save_excel(self, data: pd.DataFrame, fname: str) -> None:
-        fpath = self.output_path / (fname+'.xlsx')
+    def migrate_storage(self) -> list[Path]:
+        """Converts the pickle databases of the profile to the storage and
+        item store set in config. Converted files are moved to
+        data/pickle_backup/. Returns the paths of files converted."""
+        pickle = PickleBackend()
+        backup_path = self.data_path / 'pickle_backup'
+        self.run_count = self.user_data.fetch('run_count', 0)
+        migrated = []
 
-        if isinstance(data, pd.DataFrame):
-            data.to_excel(fpath, index=False, freeze_panes=(1,0))
-        
-        if isinstance(data, dict):
-            with pd.ExcelWriter(fpath) as writer:
-                for sheetname, df in data.items():
-                    df.to_excel(writer, sheet_name=sheetname,
-                                index=False, freeze_panes=(1,0))
+        # Partitions of a pickle item store
+        if self.item_store is not None and isinstance(self.storage, ParquetBackend):
+            for fpath in sorted(self.item_store.path.rglob('*.pkl')):
+                self.storage.write(
+                    pickle.read(fpath), fpath.with_suffix(self.storage.SUFFIX)
+                )
+                migrated.append(fpath)
+
+        # Items database of the 'single' pickle store
+        if self.item_store is not None or isinstance(self.storage, ParquetBackend):
+            legacy_db = sorted(
+                fpath for fpath in self.data_path.glob(
+                    self.db_config['fname_items'] + '*'
+                )
+                if fpath.is_file()
+                and not fpath.name.endswith(ParquetBackend.SUFFIX)
+            )
+            if len(legacy_db) > 0:
+                items = ItemTable.from_frame(pickle.read(legacy_db[-1]))
+                if self.item_store is not None:
+                    self.item_store.save(items, self.run_count)
+                else:
+                    write_item_table(
+                        self.storage,
+                        items,
+                        self.data_path / legacy_db[-1].name.split('.')[0]
+                    )
+                migrated.extend(legacy_db)
+
+        # Movements database
+        if isinstance(self.storage, ParquetBackend):
+            legacy_db = sorted(
+                fpath for fpath in self.data_path.glob(
+                    self.db_config['fname_movements'] + '*'
+                )
+                if fpath.is_file()
+                and not fpath.name.endswith(ParquetBackend.SUFFIX)
+            )
+            if len(legacy_db) > 0:
+                self.storage.write(
+                    pickle.read(legacy_db[-1]),
+                    self.data_path / (
+                        legacy_db[-1].name.split('.')[0] + self.storage.SUFFIX
+                    )
+                )
+                migrated.extend(legacy_db)
+
+        for fpath in migrated:
+            backup_fpath = backup_path / fpath.relative_to(self.data_path)
+            backup_fpath.parent.mkdir(parents=True, exist_ok=True)
+            fpath.replace(backup_fpath)
+        return migrated
+
+
+    def save_report(self, data: pd.DataFrame | dict, fname: str) -> list[Path]:
+        """data: a table or {sheet name: table}, tables being DataFrames or
+        iterables of DataFrame chunks. Saved in the [output] format."""
+        return write_report(
+            data,
+            self.output_path / fname,
+            self.output_config.get('format', 'xlsx'),
+            self.output_config.get('excel_writer', 'streaming')
+        )
+
+
+    def save_excel(self, data: pd.DataFrame | dict, fname: str) -> None:
+        write_report(
+            data,
+            self.output_path / fname,
+            'xlsx',
+            self.output_config.get('excel_writer', 'streaming')
+        )
 
 
     def save_figure(self, figure: plt.figure, fname: str) -> None:
         fpath = self.output_path / (fname+'.png')
         figure.savefig(fpath, format='png')
+
+
+    #
+    # NON-USER INTERFACE METHODS
+    #
+
+    def _find_db(self, prefix: str) -> list[Path]:
+        pattern = prefix + self.storage.GLOB
+        if (
+            prefix == self.db_config['fname_items']
+            and not isinstance(self.storage, PickleBackend)
+        ):  # Items and waypoints tables: the items one is looked up
+            pattern = prefix + '*.items' + self.storage.SUFFIX
+        return list(self.data_path.glob(pattern))
+
+    def _itemdb_stem(self, path: Path) -> Path:
+        return path.with_name(
+            path.name.removesuffix('.items' + self.storage.SUFFIX)
+        )
+
+    @staticmethod
+    def _items_frame(
+        items: ItemTable | None, columns: list[str] | None = None
+    ) -> None | pd.DataFrame:
+        if items is None:
+            return None
+        if columns is None:
+            return items.to_frame()
+        if 'waypoints' in columns:
+            return items.to_frame()[columns]
+        return items.items[columns]
@@ -0,0 +1,254 @@
+""" report_writer.py
+Writers of the reports saved by Profile.save_report, selected with
+[output] format in config.toml:
+- 'xlsx': one workbook, one sheet per table. With excel_writer =
+  'streaming', rows are appended to a write-only workbook chunk by chunk,
+  and tables longer than an Excel sheet continue on new sheets (details
+  becomes details_1, details_2...). With 'pandas': DataFrame.to_excel.
+- 'csv', 'parquet' (requires pyarrow): one file per table.
+
+Tables are DataFrames, or iterables of DataFrames: chunks of one table
+with the same columns (e.g. postprocessing_tk.iter_exportable_hist), never
+held in memory all at once by the streaming writers.
+
+Functions:
+    write_report
+    write_excel
+    write_csv
+    write_parquet
+    _chunks
+    _write_header
+    _write_sheet_rows
+    _column_cells
+    _number_cell
+    _cell_value
+"""
+
+import datetime
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+
+EXCEL_MAX_ROWS = 1_048_576
+FORMATS = {'xlsx': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}
+EXCEL_WRITERS = ['streaming', 'pandas']
+SINGLE_SHEET = 'Sheet1'  # Name of the sheet of a table saved alone
+# Number formats of DataFrame.to_excel
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+DATE_FORMAT = 'YYYY-MM-DD'
+
+
+def write_report(
+    tables: pd.DataFrame | dict,
+    fpath: Path,
+    fmt: str = 'xlsx',
+    excel_writer: str = 'streaming'
+) -> list[Path]:
+    """Tables (one table, or {name: table}) saved to fpath + suffix of fmt:
+    as the sheets of a workbook, or one file per table named fpath - name.
+    Returns the paths written."""
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"Unknown output format '{fmt}'. Options: {', '.join(FORMATS)}"
+        )
+    single = not isinstance(tables, dict)
+    if single:
+        tables = {SINGLE_SHEET: tables}
+    fpath = Path(fpath)
+
+    if fmt == 'xlsx':
+        path = fpath.with_name(fpath.name + FORMATS[fmt])
+        write_excel(tables, path, excel_writer)
+        return [path]
+
+    paths = []
+    for name, table in tables.items():
+        stem = fpath.name if single else f'{fpath.name} - {name}'
+        path = fpath.with_name(stem + FORMATS[fmt])
+        if fmt == 'csv':
+            write_csv(table, path)
+        else:
+            write_parquet(table, path)
+        paths.append(path)
+    return paths
+
+
+def write_excel(
+    tables: dict,
+    fpath: Path,
+    excel_writer: str = 'streaming',
+    max_rows: int = EXCEL_MAX_ROWS
+) -> None:
+    """Cell values and formats as with DataFrame.to_excel(index=False,
+    freeze_panes=(1, 0)). max_rows: rows per sheet, header included. An
+    iterable table without any chunk gives an empty sheet, without header,
+    with either writer."""
+    if excel_writer not in EXCEL_WRITERS:
+        raise ValueError(
+            f"Unknown excel_writer '{excel_writer}'. "
+            f"Options: {', '.join(EXCEL_WRITERS)}"
+        )
+    if excel_writer == 'pandas':
+        with pd.ExcelWriter(fpath) as writer:
+            for name, table in tables.items():
+                chunks = list(_chunks(table))
+                df = pd.concat(chunks) if chunks else pd.DataFrame()
+                df.to_excel(writer, sheet_name=name,
+                            index=False, freeze_panes=(1, 0))
+        return
+
+    workbook = Workbook(write_only=True)
+    for name, table in tables.items():
+        sheets = [workbook.create_sheet(name)]
+        sheets[0].freeze_panes = 'A2'
+        sheet_rows = 0
+        for chunk in _chunks(table):
+            if sheet_rows == 0:
+                sheet_rows = _write_header(sheets[-1], chunk.columns)
+            while len(chunk) > 0:
+                if sheet_rows == max_rows:  # Sheet full: next page
+                    sheets[0].title = f'{name}_1'
+                    sheets.append(
+                        workbook.create_sheet(f'{name}_{len(sheets) + 1}')
+                    )
+                    sheets[-1].freeze_panes = 'A2'
+                    sheet_rows = _write_header(sheets[-1], chunk.columns)
+                page = chunk.iloc[:max_rows - sheet_rows]
+                _write_sheet_rows(sheets[-1], page)
+                sheet_rows += len(page)
+                chunk = chunk.iloc[len(page):]
+    workbook.save(fpath)
+
+
+def write_csv(table: pd.DataFrame | Iterable, fpath: Path) -> None:
+    with open(fpath, 'w', newline='') as write_file:
+        for chunk_no, chunk in enumerate(_chunks(table)):
+            chunk.to_csv(write_file, index=False, header=chunk_no == 0)
+
+
+def write_parquet(table: pd.DataFrame | Iterable, fpath: Path) -> None:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "format = 'parquet' requires pyarrow: pip install pyarrow"
+        ) from None
+    writer = None
+    try:
+        for chunk in _chunks(table):
+            if writer is None:
+                arrow_table = pyarrow.Table.from_pandas(
+                    chunk, preserve_index=False
+                )
+                writer = pyarrow.parquet.ParquetWriter(
+                    fpath, arrow_table.schema
+                )
+            else:
+                arrow_table = pyarrow.Table.from_pandas(
+                    chunk, schema=writer.schema, preserve_index=False
+                )
+            writer.write_table(arrow_table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+#
+# NON-USER INTERFACE FUNCTIONS
+#
+
+def _chunks(table: pd.DataFrame | Iterable) -> Iterable[pd.DataFrame]:
+    if isinstance(table, pd.DataFrame):
+        return [table]
+    return table
+
+
+def _write_header(sheet, columns: pd.Index) -> int:
+    """Header row, styled as by DataFrame.to_excel. Returns rows written."""
+    thin = Side(style='thin')
+    cells = []
+    for col in columns:
+        cell = WriteOnlyCell(sheet, value=str(col))
+        cell.font = Font(bold=True)
+        cell.border = Border(top=thin, right=thin, bottom=thin, left=thin)
+        cell.alignment = Alignment(horizontal='center', vertical='top')
+        cells.append(cell)
+    sheet.append(cells)
+    return 1
+
+
+def _write_sheet_rows(sheet, df: pd.DataFrame) -> None:
+    columns = [_column_cells(sheet, df[col]) for col in df.columns]
+    for row in zip(*columns):
+        sheet.append(row)
+
+
+def _column_cells(sheet, values: pd.Series) -> list:
+    """Values of a column as written by DataFrame.to_excel: Python types,
+    None for missing values, dates and timedeltas (as days) with their
+    number format."""
+    kind = values.dtype.kind
+    missing = values.isna().to_numpy()
+    if kind == 'M':
+        cells = np.empty(len(values), dtype=object)
+        cells[:] = [
+            _number_cell(sheet, val, DATETIME_FORMAT)
+            for val in values.astype(object).tolist()
+        ]
+    elif kind == 'm':
+        cells = np.empty(len(values), dtype=object)
+        cells[:] = [
+            _number_cell(sheet, day, '0')
+            for day in (values.dt.total_seconds() / 86400).tolist()
+        ]
+    elif kind in 'iub':
+        return values.tolist()
+    elif kind == 'f':
+        cells = np.array(values.tolist(), dtype=object)
+        infinite = np.isinf(values.to_numpy())
+        cells[infinite] = np.where(values.to_numpy()[infinite] > 0,
+                                   'inf', '-inf')
+    elif pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        cells = values.to_numpy(dtype=object).copy()
+    else:
+        cells = np.array(
+            [_cell_value(sheet, val) for val in values.tolist()],
+            dtype=object
+        )
+    cells[missing] = None
+    return cells.tolist()
+
+
+def _number_cell(sheet, value: float, number_format: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.number_format = number_format
+    return cell
+
+
+def _cell_value(sheet, val):
+    if val is None or (pd.api.types.is_scalar(val) and pd.isna(val)):
+        return None
+    if isinstance(val, (bool, np.bool_)):
+        return bool(val)
+    if isinstance(val, (int, np.integer)):
+        return int(val)
+    if isinstance(val, (float, np.floating)):
+        if np.isinf(val):
+            return 'inf' if val > 0 else '-inf'
+        return float(val)
+    if isinstance(val, pd.Timestamp):
+        return _number_cell(sheet, val.to_pydatetime(), DATETIME_FORMAT)
+    if isinstance(val, datetime.datetime):
+        return _number_cell(sheet, val, DATETIME_FORMAT)
+    if isinstance(val, datetime.date):
+        return _number_cell(sheet, val, DATE_FORMAT)
+    if isinstance(val, datetime.timedelta):
+        return _number_cell(sheet, val.total_seconds() / 86400, '0')
+    return str(val)
@@ -5,34 +5,97 @@ Class Scheduler - methods:
     .__init__
     .prepare
     .run
+    ._run_serial
+    ._run_parallel
+    ._num_workers
+    ._checkpoint_key
     ._prep_item
+    ._may_move
     ._prep_mvt
+    ._partition_mvts
+    ._plan_tasks
+    ._part_task
+    ._task_mvts
+    ._task_items
+    ._task_label
+    ._merge_items
+    ._merge_mvts
     ._extract_items
+
+Functions:
+    track_task
+    _init_worker
+    _latest_dates
+    _entry_ids
+    _build_IDs
+    _format_values
+    _build_first_waypoints
+    _composite_key
 """
 
 
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+from time import perf_counter
+
+import numpy as np
 import pandas as pd
 import tqdm
 
+from product_trailer.allocation_ledger import AllocationLedger
+from product_trailer.checkpoint import TaskCheckpoint
+from product_trailer.components import attach_items, movement_components
 from product_trailer.forwardtracker import ForwardTracker
+from product_trailer.instrumentation import RunTimer
 from product_trailer.item import Item
+from product_trailer.item_table import ItemTable
+from product_trailer.key_codec import KeyCodec
+from product_trailer.workload import task_cost, split_task
+
+
+_worker_codec = None  # KeyCodec of the run, set once per worker process
 
 
 class Scheduler:
     DEF_WPT = ['Posting Date','Company','SLOC','Sold to','Mvt Code','Batch']
     
-    def __init__(self, profile):
+    def __init__(self, profile, timer: RunTimer | None = None):
         self.profile = profile
+        self.timer = timer if timer is not None else RunTimer()
     
     def prepare(self, new_raw_data):
         items, num_retrieved = self._prep_item(new_raw_data)
         self.items_todo = items.loc[items['open'].fillna(True)].copy()
         self.items_done = [items.loc[~items['open'].fillna(True)].copy()]
-        
-        self._make_todo_dict()
-        self.tasklist = list(self.todo_dict.keys())
 
-        self.mvts = self._prep_mvt(new_raw_data)
+        # Incremental mode: open items no movement can apply to are
+        # carried through untouched
+        incremental = self.profile.scheduler_config.get('incremental', False)
+        skipped = self.items_todo.iloc[:0]
+        with self.timer.stage('schedule'):
+            if incremental:
+                movable = self._may_move(self.items_todo, new_raw_data)
+                skipped = self.items_todo.loc[~movable]
+                self.items_todo = self.items_todo.loc[movable]
+                self.items_done.append(skipped)
+            
+            self._make_todo_dict()
+            if self.profile.db_config['save_movements']:
+                # Movements of SKUs whose items were all skipped are saved too
+                for sku in skipped['sku'].unique():
+                    self.todo_dict.setdefault(sku, [])
+            self.tasklist = list(self.todo_dict.keys())
+
+        with self.timer.stage('prep_mvt'):
+            self.mvts = self._prep_mvt(new_raw_data)
+        with self.timer.stage('schedule'):
+            self._partition_mvts()
+            # Key columns are encoded once for the run, decoded by the tracker
+            self.codec = KeyCodec.from_movements(self.mvts)
+            self.mvts = self.codec.encode_movements(self.mvts)
+            self._plan_tasks()
         self.mvts_done = []
 
         return {
@@ -42,54 +105,191 @@ class Scheduler:
                     len(items),
                     num_retrieved,
                     len(self.items_todo),
-                    len(self.items_done)
+                    sum(map(len, self.items_done)) - len(skipped)
                 )
             ),
            'mvts': (
                'total %s mvts utilized of total %s'
                 % (self.mvts.shape[0], new_raw_data.shape[0])
             ),
+           **({
+               'incremental': (
+                   '%s open items re-tracked, %s skipped (no new movement).'
+                    % (len(self.items_todo), len(skipped))
+               )
+            } if incremental else {}),
         }
 
     
-    def run(self):
-        items_computed = []
-        for task in (pbar := tqdm.tqdm(self.tasklist, desc='Crunching...')):
-            pbar.set_postfix({'Object': task}, refresh=False)
-            add_items, add_mvts = (
-                ForwardTracker(
-                    Scheduler.DEF_WPT,
-                    self.mvts.loc[(self.mvts['SKU'] == task)],
-                    self.profile.db_config['save_movements']
+    def run(self, resume: bool = False):
+        """resume: tasks completed in an interrupted run of the same batch
+        are taken from its checkpoint instead of being tracked again."""
+        checkpoint = TaskCheckpoint(
+            self.profile.checkpoint_path,
+            self._checkpoint_key(),
+            self.profile.scheduler_config.get('checkpoint_interval', 600)
+        )
+        results = checkpoint.load() if resume else {}
+        if not resume:
+            checkpoint.clear()
+        self.num_resumed = sum(task in results for task in self.tasks)
+        tasks = [task for task in self.tasks if task not in results]
+
+        with self.timer.stage('track'):
+            workers = self._num_workers(len(tasks))
+            if workers > 1:
+                computed = self._run_parallel(tasks, workers)
+            else:
+                computed = self._run_serial(tasks)
+            for task, result in zip(tasks, computed):
+                results[task] = result
+                self.timer.add_task(
+                    self._task_label(task),
+                    {'cost': self.costs[task], **result[2]}
                 )
-                .do_task(self.todo_dict[task])
-            )
-            items_computed.extend(add_items)
+                checkpoint.add(task, result)
+            checkpoint.flush()
+
+        with self.timer.stage('assemble'):
+            computed_items = [
+                self._merge_items(task, results) if task in self.parts
+                else results[task][0]
+                for task in self.tasklist
+            ]
             if self.profile.db_config['save_movements']:
-                self.mvts_done.append(add_mvts)
-        
-        df_computed_items = pd.DataFrame.from_dict(
-            {item.id: item.to_tuple() for item in items_computed},
-            orient='index',
-            columns=Item.__slots__[1:]
-        )
+                # Keys are saved as text, as in the movements database
+                self.mvts_done.append(self._merge_mvts(results).astype(
+                    {'Company_SLOC_Batch': object}
+                ))
 
-        all_items = pd.concat(self.items_done + [df_computed_items], axis=0)
+            computed_items = ItemTable.concat(computed_items)
+            computed_items.items = computed_items.items.infer_objects()
+            all_items = ItemTable.concat(
+                [ItemTable.from_frame(items) for items in self.items_done]
+                + [computed_items]
+            )
         return all_items, self.mvts_done
     
 
-    #
-    # NON-USER INTERFACE METHODS
-    #
+    def _run_serial(self, tasks: list):
+        for task in (pbar := tqdm.tqdm(tasks, desc='Crunching...')):
+            pbar.set_postfix({'Object': self._task_label(task)}, refresh=False)
+            yield track_task(
+                Scheduler.DEF_WPT,
+                self._task_mvts(task),
+                self.profile.db_config['save_movements'],
+                self._task_items(task),
+                self.codec
+            )
+
+    def _run_parallel(self, tasks: list, workers: int):
+        # Each worker receives only the movements and items of its task.
+        # Executor.map yields results in task order: output is identical
+        # to a serial run. The codec is sent once per worker, not per task.
+        # Tasks come largest first: heavy ones are sent one at a time so
+        # that they spread over the workers, light ones by chunks.
+        total_cost = sum(self.costs[task] for task in tasks)
+        num_heavy = sum(
+            self.costs[task] * workers * 8 > total_cost for task in tasks
+        )
+        chunksize = max(1, (len(tasks) - num_heavy) // (workers * 8))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.codec,)
+        ) as executor:
+            results = [
+                executor.map(
+                    track_task,
+                    repeat(Scheduler.DEF_WPT),
+                    (self._task_mvts(task) for task in some_tasks),
+                    repeat(self.profile.db_config['save_movements']),
+                    (self._task_items(task) for task in some_tasks),
+                    chunksize=some_chunksize
+                )
+                for some_tasks, some_chunksize in [
+                    (tasks[:num_heavy], 1), (tasks[num_heavy:], chunksize)
+                ]
+            ]
+            yield from tqdm.tqdm(
+                chain(*results),
+                total=len(tasks),
+                desc=f'Crunching ({workers} workers)...'
+            )
+
+    def _num_workers(self, num_tasks: int) -> int:
+        workers = self.profile.scheduler_config.get('workers', 1)
+        if workers == 0:  # 0: Use all cores available
+            workers = os.cpu_count() or 1
+        return min(workers, max(1, num_tasks))
+
+    def _checkpoint_key(self) -> list[str]:
+        """Files of the batch and a digest of what task results depend
+        on: the task plan, the scheduler settings and the items tracked."""
+        config = {
+            key: val for key, val in self.profile.scheduler_config.items()
+            if key not in ['workers', 'checkpoint_interval']
+        }
+        digest = hashlib.sha1(repr((
+            sorted(config.items()),
+            [(task, self.costs[task]) for task in self.tasks]
+        )).encode())
+        digest.update(pd.util.hash_pandas_object(
+            self.items_todo[['qty']].assign(
+                num_waypoints=self.items_todo['waypoints'].str.len()
+            )
+        ).to_numpy().tobytes())
+        return [*self.profile.interrupted_batch(), digest.hexdigest()]
 
     def _prep_item(self, new_raw_data: pd.DataFrame) -> pd.DataFrame:
-        new_tracked_items = self._extract_items(new_raw_data)
-        saved_items = self.profile.fetch_items()
+        with self.timer.stage('extract_items'):
+            new_tracked_items = self._extract_items(new_raw_data)
+        with self.timer.stage('fetch_items'):
+            saved_items = self.profile.fetch_items_to_track()
         if isinstance(saved_items, pd.DataFrame):
             tracked_items = pd.concat([saved_items, new_tracked_items])
             return tracked_items, saved_items.shape[0]
         return new_tracked_items, 0
     
+    def _may_move(
+        self, items: pd.DataFrame, raw_mvt: pd.DataFrame
+    ) -> np.ndarray:
+        """Whether tracking could change open items. Their last waypoint
+        must match a [-] movement (same Company, SLOC and Batch, posted on or
+        after the waypoint) or, for items on a PO, a [+] movement of the PO.
+        These conditions are looser than ForwardTracker's lookups. Items with
+        one waypoint (new items) are always tracked."""
+        last_wpts = pd.DataFrame(
+            [wpts[-1] for wpts in items['waypoints']],
+            columns=Scheduler.DEF_WPT,
+            dtype=object
+        ).rename(columns={'Mvt Code': 'PO'})  # PO number when on a PO
+        wpt_dates = pd.to_datetime(last_wpts['Posting Date']).to_numpy()
+        qty = raw_mvt['QTY'].to_numpy()
+        decr_dates = last_wpts.merge(
+            _latest_dates(raw_mvt.loc[qty <= -1], ['Company', 'SLOC', 'Batch']),
+            how='left', on=['Company', 'SLOC', 'Batch']
+        )['Posting Date_y'].to_numpy()
+        po_dates = last_wpts.merge(
+            _latest_dates(raw_mvt.loc[qty >= 1], ['Batch', 'PO']),
+            how='left', on=['Batch', 'PO']
+        )['Posting Date_y'].to_numpy()
+
+        on_po = items['open'].isna().to_numpy()
+        po_part1 = (
+            last_wpts['SLOC'].astype(str).str.startswith('PO FROM').to_numpy()
+            & (last_wpts['PO'] != '-2').to_numpy()
+        )
+        movable = (
+            (items['waypoints'].map(len).to_numpy() == 1)
+            | (~on_po & (decr_dates >= wpt_dates))
+            | (on_po & ((po_dates >= wpt_dates) | ~po_part1))
+        )
+        # Items of the same entry point are deduplicated by id in their
+        # task: they are tracked together
+        roots = _entry_ids(items.index)
+        return movable | np.isin(roots, roots[movable])
+
     def _make_todo_dict(self):
         self.todo_dict = {}
         self.items_todo.groupby('sku', observed=True).apply(self._todo_add)
@@ -99,28 +299,153 @@ class Scheduler:
         self.todo_dict[df.name] = items
     
     def _prep_mvt(self, new_raw_mvt: pd.DataFrame) -> pd.DataFrame:
-        return (
-            new_raw_mvt.loc[new_raw_mvt['SKU'].isin(self.tasklist)]
-            .copy()
-            .drop(
-                columns=[
-                    *self.profile.input['company_features'],
-                    *self.profile.input['sku_features'],
-                    'Special Stock Ind Code',
-                    'Unit_Value',
+        # Allocation state starts empty in ForwardTracker's ledger: no
+        # per-movement set is created here.
+        dropped = [
+            *self.profile.input['company_features'],
+            *self.profile.input['sku_features'],
+            'Special Stock Ind Code',
+            'Unit_Value',
+        ]
+        mvts = new_raw_mvt.loc[
+            new_raw_mvt['SKU'].isin(self.tasklist).to_numpy(),
+            [col for col in new_raw_mvt.columns if col not in dropped]
+        ]
+        mvts['QTY_Unallocated'] = np.abs(mvts['QTY'].to_numpy())
+        mvts['Company_SLOC_Batch'] = _composite_key(
+            mvts, ['Company', 'SLOC', 'Batch']
+        )
+        return mvts
+
+    def _partition_mvts(self) -> None:
+        # One stable sort by SKU, then each task gets a zero-copy slice of
+        # its own movements instead of scanning the whole table. Until
+        # _plan_tasks splits some, tasks are whole SKUs.
+        self.parts = {}
+        codes, skus = pd.factorize(self.mvts['SKU'])
+        order = np.argsort(codes, kind='stable')
+        self.mvts = self.mvts.iloc[order]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.diff(sorted_codes, prepend=-2))
+        ends = np.append(starts[1:], len(sorted_codes))
+        self.mvts_partitions = {
+            skus[sorted_codes[start]]: (start, end)
+            for start, end in zip(starts, ends)
+        }
+    
+    def _plan_tasks(self) -> None:
+        # Each SKU is only tracked against the movement components its items
+        # can reach. Tasks: SKUs, or parts (sku, part_no) of the SKUs costing
+        # more than split_cost, ordered by estimated cost, largest first.
+        split_cost = self.profile.scheduler_config.get('split_cost', 1_000_000)
+        items = [item for sku in self.tasklist for item in self.todo_dict[sku]]
+        mvt_comps, item_comps = attach_items(
+            items,
+            _entry_ids(pd.Index([item.id for item in items], dtype=object)),
+            self.mvts,
+            movement_components(self.mvts, self.codec),
+            self.codec
+        )
+        reached = np.isin(mvt_comps, item_comps)
+        self.parts = {}  # sku -> [(movement positions, item positions)]
+        self.untracked = {}  # sku -> positions of movements not tracked
+        self.costs = {}
+        items_start = 0
+        for sku in self.tasklist:
+            start, end = self.mvts_partitions.get(sku, (0, 0))
+            num_items = len(self.todo_dict[sku])
+            sku_item_comps = item_comps[items_start:items_start + num_items]
+            items_start += num_items
+            tracked = reached[start:end]
+            if num_items > 0 and not tracked.any():
+                tracked = np.ones(end - start, dtype=bool)
+            tracked_pos = np.flatnonzero(tracked)
+            parts = [(tracked_pos, np.arange(num_items))]
+            if 0 < split_cost < task_cost(len(tracked_pos), num_items):
+                parts = [
+                    (tracked_pos[mvt_pos], item_pos)
+                    for mvt_pos, item_pos in split_task(
+                        mvt_comps[start:end][tracked_pos], sku_item_comps,
+                        split_cost
+                    )
                 ]
-            )
-            .assign(
-                QTY_Unallocated=lambda df: df['QTY'].apply(abs),
-                Items_Allocated=lambda df: df.apply(
-                    lambda _: set(), result_type='reduce', axis=1
-                ),
-                Company_SLOC_Batch=lambda df: df[['Company', 'SLOC', 'Batch']].apply(
-                    lambda row: '-'.join(row), axis=1
-                ),
-            )
+            if len(tracked_pos) < end - start or len(parts) > 1:
+                self.parts[sku] = parts
+                self.untracked[sku] = np.flatnonzero(~tracked)
+            for part_no, (mvt_pos, item_pos) in enumerate(parts):
+                self.costs[self._part_task(sku, part_no)] = task_cost(
+                    len(mvt_pos), len(item_pos)
+                )
+        self.tasks = sorted(self.costs, key=self.costs.get, reverse=True)
+
+    def _part_task(self, sku, part_no: int):
+        if len(self.parts.get(sku, [])) > 1:
+            return (sku, part_no)
+        return sku
+
+    def _task_mvts(self, task) -> pd.DataFrame:
+        sku, part_no = task if isinstance(task, tuple) else (task, 0)
+        start, end = self.mvts_partitions.get(sku, (0, 0))
+        if sku in self.parts:
+            return self.mvts.iloc[start:end].iloc[self.parts[sku][part_no][0]]
+        return self.mvts.iloc[start:end]
+
+    def _task_items(self, task) -> list[Item]:
+        sku, part_no = task if isinstance(task, tuple) else (task, 0)
+        items = self.todo_dict[sku]
+        if sku in self.parts:
+            return [items[pos] for pos in self.parts[sku][part_no][1].tolist()]
+        return items
+
+    def _task_label(self, task) -> str:
+        if isinstance(task, tuple):
+            sku, part_no = task
+            return f'{sku} (part {part_no + 1}/{len(self.parts[sku])})'
+        return str(task)
+
+    def _merge_items(self, sku, results: dict) -> ItemTable:
+        """Items of a SKU tracked by parts, in the order tracking the whole
+        SKU would give: by position of the item they come from."""
+        tables, item_origins = [], []
+        for part_no, (_, item_pos) in enumerate(self.parts[sku]):
+            items, _, _, origins = results[self._part_task(sku, part_no)]
+            tables.append(items)
+            item_origins.append(item_pos[origins])
+        if len(tables) == 1:
+            return tables[0]
+        return ItemTable.concat(tables).reorder(
+            np.argsort(np.concatenate(item_origins), kind='stable')
         )
 
+    def _merge_mvts(self, results: dict) -> pd.DataFrame:
+        """Movements of all tasks, by SKU in tasklist order then by
+        position, as tracking whole SKUs would give. Movements not tracked
+        are added as they are, with nothing allocated."""
+        mvts, positions = [], []
+        untracked, untracked_positions = [], []
+        offset = 0
+        for sku in self.tasklist:
+            start, end = self.mvts_partitions.get(sku, (0, 0))
+            if sku in self.parts:
+                for part_no, (mvt_pos, _) in enumerate(self.parts[sku]):
+                    mvts.append(results[self._part_task(sku, part_no)][1])
+                    positions.append(offset + mvt_pos)
+                untracked.append(start + self.untracked[sku])
+                untracked_positions.append(offset + self.untracked[sku])
+            else:
+                mvts.append(results[sku][1])
+                positions.append(np.arange(offset, offset + end - start))
+            offset += end - start
+        if len(untracked) > 0:
+            untracked = self.mvts.iloc[np.concatenate(untracked)]
+            mvts.append(self.codec.decode_movements(
+                AllocationLedger(untracked).materialise(untracked)
+            ))
+            positions.extend(untracked_positions)
+        return pd.concat(mvts).iloc[
+            np.argsort(np.concatenate(positions), kind='stable')
+        ]
+
     def _extract_items(self, raw_mvt: pd.DataFrame) -> pd.DataFrame:
         ID_definition = [
            'Company',
@@ -133,16 +458,10 @@ class Scheduler:
         ]
         company_features = ['Company', *self.profile.input['company_features']]
         sku_features = ['SKU', *self.profile.input['sku_features']]
-        def build_ID(item):
-            return (
-                f"_{item['Company']}/{item['SLOC']}/{item['Sold to'][4:11]}_"
-                + f"{item['Mvt Code']}/{item['Posting Date']:%Y-%m-%d}_"
-                + f"{item['SKU']}:{item['Batch']}"
-            )
         
         trailed_products = (
-            raw_mvt.copy()
-            .pipe(lambda df: df.loc[self.profile.is_entry_point(df)])
+            raw_mvt
+            .loc[self.profile.is_entry_point(raw_mvt)]
             .pivot_table(
                 observed=True,
                 values=['Unit_Value', 'QTY'],
@@ -150,7 +469,6 @@ class Scheduler:
                 index=ID_definition
             )
             .reset_index()
-            .assign(ID = lambda df: df.apply(build_ID, axis=1))
             .merge(
                 raw_mvt
                 .value_counts(company_features)
@@ -161,14 +479,16 @@ class Scheduler:
                 .value_counts(sku_features)
                 .reset_index()[sku_features]
                 .drop_duplicates(keep='first'), on='SKU')
-            .set_index('ID')
+        )
+        trailed_products = (
+            trailed_products
+            .set_index(pd.Index(_build_IDs(trailed_products), name='ID'))
             .assign(
                 Open = True,
                 QTY = lambda df: -df['QTY'],
-                Waypoints = lambda df: df.apply(
-                    lambda row: [list(row.loc[Scheduler.DEF_WPT].values)],
-                    axis=1
-                    )
+                Waypoints = _build_first_waypoints(
+                    trailed_products, Scheduler.DEF_WPT
+                ),
             )
             .rename(columns={
                 'ID': 'id',
@@ -195,3 +515,115 @@ class Scheduler:
             ]
         )
         return trailed_products
+
+def track_task(
+    defwpt: list[str],
+    task_mvts: pd.DataFrame,
+    save_mvts: bool,
+    task_items: list[Item],
+    codec: KeyCodec | None = None
+) -> (ItemTable, pd.DataFrame, dict, np.ndarray):
+    """Runs the forward tracking of one task. Defined at module level so
+    that it can be sent to worker processes. codec: KeyCodec task_mvts were
+    encoded with, the worker's one if None. Returns the items, the
+    movements if saved, the figures of the task for the timing report, and
+    the position in task_items of the item each item comes from."""
+    if codec is None:
+        codec = _worker_codec
+    start = perf_counter()
+    tracker = ForwardTracker(defwpt, task_mvts, save_mvts, codec)
+    items, mvts = tracker.do_task(task_items)
+    # If an id comes up twice, keep the last item at the first position
+    kept = {}
+    for item, origin in zip(items, tracker.origins):
+        kept[item.id] = (item, kept.get(item.id, (None, origin))[1])
+    table = ItemTable.from_items(
+        [item for item, _ in kept.values()], infer_dtypes=False
+    )
+    stats = {
+        'seconds': perf_counter() - start,
+        'items_in': len(task_items),
+        'items_out': len(table),
+        'mvts': len(task_mvts),
+        **tracker.stats
+    }
+    origins = np.array([origin for _, origin in kept.values()], dtype=np.int64)
+    return table, mvts, stats, origins
+
+
+def _init_worker(codec: KeyCodec) -> None:
+    global _worker_codec
+    _worker_codec = codec
+
+
+def _latest_dates(mvts: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """Last Posting Date of the movements of each key, keys as objects."""
+    return (
+        mvts.groupby(keys, observed=True)['Posting Date'].max()
+        .reset_index()
+        .astype({key: object for key in keys})
+    )
+
+
+def _entry_ids(ids: pd.Index) -> np.ndarray:
+    """Item ids without the sub-ids added when items split (.0, .1.2)."""
+    return ids.str.replace(r'(\.\d+)+$', '', regex=True).to_numpy()
+
+
+def _build_IDs(items: pd.DataFrame) -> np.ndarray:
+    """Item IDs: _{Company}/{SLOC}/{Sold to[4:11]}_{Mvt Code}/{Posting Date}
+    _{SKU}:{Batch}. Each column is formatted once per distinct value, then
+    the strings are concatenated column-wise."""
+    parts = [
+        '_', _format_values(items['Company']),
+        '/', _format_values(items['SLOC']),
+        '/', _format_values(items['Sold to'], lambda val: f'{val[4:11]}'),
+        '_', _format_values(items['Mvt Code']),
+        '/', _format_values(items['Posting Date'], lambda val: f'{val:%Y-%m-%d}'),
+        '_', _format_values(items['SKU']),
+        ':', _format_values(items['Batch']),
+    ]
+    IDs = np.full(len(items), '', dtype=object)
+    for part in parts:
+        IDs = IDs + part
+    return IDs
+
+def _format_values(values: pd.Series, fmt=format) -> np.ndarray:
+    codes, uniques = pd.factorize(values)
+    formatted = np.array(
+        [fmt(val) for val in uniques.astype(object)] + ['nan'], dtype=object
+    )
+    return formatted[codes]  # code -1 (missing) -> 'nan'
+
+def _build_first_waypoints(items: pd.DataFrame, defwpt: list[str]) -> list:
+    columns = [items[col].astype(object).to_numpy() for col in defwpt]
+    return [[list(wpt)] for wpt in zip(*columns)]
+
+def _composite_key(
+    mvts: pd.DataFrame, columns: list[str], sep: str = '-'
+) -> pd.Categorical:
+    """Categorical of the values of columns joined with sep. Columns are
+    factorised and combined as integer codes: one string is built per
+    distinct key, not per movement. Missing component -> missing key."""
+    key_codes = np.zeros(len(mvts), dtype=np.int64)
+    missing = np.zeros(len(mvts), dtype=bool)
+    for col in columns:
+        codes, uniques = pd.factorize(mvts[col])
+        missing |= codes == -1
+        key_codes, _ = pd.factorize(key_codes * (len(uniques) + 1) + codes + 1)
+    _, first_pos = np.unique(key_codes, return_index=True)
+    labels = np.array(
+        [
+            None if is_missing else sep.join(values)
+            for is_missing, *values in zip(
+                missing[first_pos],
+                *[mvts[col].to_numpy()[first_pos] for col in columns]
+            )
+        ],
+        dtype=object
+    )
+    # Different keys could give the same label: labels are factorised too
+    label_codes, categories = pd.factorize(labels)
+    return pd.Categorical.from_codes(
+        label_codes[key_codes], categories=categories
+    )
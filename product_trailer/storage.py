@@ -0,0 +1,143 @@
+""" storage.py
+Storage backends of the databases (items, movements), selected with
+[data] storage in config.toml.
+
+Backends read and write flat DataFrames. They accept a column projection
+and filters, in the form [(column, op, value), ...] with op in ==, !=, <,
+<=, >, >=, in, not in (all conditions must hold).
+
+Class PickleBackend - methods:
+    .read
+    .write
+
+Class ParquetBackend - methods:
+    .__init__
+    .read
+    .write
+
+Functions:
+    get_backend
+    filter_mask
+"""
+
+import json
+import operator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class PickleBackend:
+    SUFFIX = '.pkl'
+    GLOB = '*'  # Databases written before backends existed may have no suffix
+
+    def read(
+        self,
+        path: Path,
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None
+    ) -> pd.DataFrame:
+        df = pd.read_pickle(path)
+        if filters:
+            df = df.loc[filter_mask(df, filters)]
+        if columns is not None:
+            df = df[columns]
+        return df
+
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        df.to_pickle(path)
+
+
+class ParquetBackend:
+    SUFFIX = '.parquet'
+    GLOB = '*.parquet'
+    SETS_KEY = b'product_trailer.set_columns'
+
+    def __init__(self) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "storage = 'parquet' requires pyarrow: pip install pyarrow"
+            ) from None
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+
+    def read(
+        self,
+        path: Path,
+        columns: list[str] | None = None,
+        filters: list[tuple] | None = None
+    ) -> pd.DataFrame:
+        table = self.pq.read_table(
+            path,
+            columns=columns,
+            filters=filters or None,
+            use_pandas_metadata=True
+        )
+        set_columns = json.loads(
+            (table.schema.metadata or {}).get(self.SETS_KEY, b'[]')
+        )
+        df = table.to_pandas()
+        for col in df.columns:
+            if col in set_columns:
+                df[col] = [set(values) for values in df[col]]
+            elif df[col].dtype == object and df[col].isna().any():
+                # Arrow nulls come back as None, the databases use NaN
+                df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        # Parquet has no set type: sets are stored as lists
+        set_columns = [
+            col for col in df.columns
+            if df[col].dtype == object and len(df) > 0
+            and isinstance(df[col].iat[0], set)
+        ]
+        df = df.assign(**{
+            col: [sorted(values) for values in df[col]] for col in set_columns
+        })
+        table = self.pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({
+            **table.schema.metadata,
+            self.SETS_KEY: json.dumps(set_columns).encode(),
+        })
+        self.pq.write_table(table, path)
+
+
+BACKENDS = {
+    'pickle': PickleBackend,
+    'parquet': ParquetBackend,
+}
+
+
+def get_backend(name: str) -> PickleBackend | ParquetBackend:
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown storage '{name}'. Options: {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name]()
+
+
+def filter_mask(df: pd.DataFrame, filters: list[tuple]) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        if op == 'in':
+            mask &= df[col].isin(value).to_numpy()
+        elif op == 'not in':
+            mask &= ~df[col].isin(value).to_numpy()
+        else:
+            mask &= np.asarray(OPERATORS[op](df[col], value), dtype=bool)
+    return mask
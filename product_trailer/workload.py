@@ -0,0 +1,67 @@
+""" workload.py
+Cost estimates of the scheduler tasks, and splitting of giant SKUs into
+parts tracked independently.
+
+The cost of tracking a SKU is estimated as movements x open items. A few
+fast-moving SKUs can account for most of the work: their movements and
+items are split by independent components of the movement graph (see
+components.py), so that the parts can be balanced across workers.
+Movements and items of a part never interact with those of another part:
+tracking parts one by one gives the same results as tracking the whole
+SKU.
+
+Functions:
+    task_cost
+    split_task
+    _pack
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+
+def task_cost(num_mvts: int, num_items: int) -> int:
+    return num_mvts * max(1, num_items)
+
+
+def split_task(
+    mvt_comps: np.ndarray, item_comps: np.ndarray, max_cost: int
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Parts of a task: (positions of movements, positions of items), one
+    per max_cost of the task, components balanced by cost among parts.
+    mvt_comps, item_comps: component of each movement and item, -1 for
+    items no movement can reach (put with the largest component). A single
+    part is returned if the task can't be split."""
+    comps, mvt_comps = np.unique(mvt_comps, return_inverse=True)
+    item_comps = pd.Index(comps).get_indexer(item_comps)  # -1: unreachable
+    comp_mvts = np.bincount(mvt_comps, minlength=len(comps))
+    comp_items = np.bincount(
+        item_comps[item_comps >= 0], minlength=len(comps)
+    )
+    num_parts = min(
+        len(comps),
+        -(-task_cost(len(mvt_comps), len(item_comps)) // max(1, max_cost))
+    )
+    if num_parts <= 1:
+        return [(np.arange(len(mvt_comps)), np.arange(len(item_comps)))]
+    comp_part = _pack(comp_mvts * np.maximum(1, comp_items), num_parts)
+    item_part = np.where(item_comps >= 0, comp_part[item_comps], 0)
+    mvt_part = comp_part[mvt_comps]
+    return [
+        (np.flatnonzero(mvt_part == part), np.flatnonzero(item_part == part))
+        for part in range(num_parts)
+    ]
+
+
+def _pack(costs: np.ndarray, num_parts: int) -> np.ndarray:
+    """Part of each component: largest first, to the least loaded part
+    (part 0 gets the largest)."""
+    parts = np.zeros(len(costs), dtype=np.int64)
+    loads = [(0, part) for part in range(num_parts)]
+    for comp in np.argsort(-costs, kind='stable').tolist():
+        load, part = heapq.heappop(loads)
+        parts[comp] = part
+        heapq.heappush(loads, (load + int(costs[comp]), part))
+    return parts
@@ -0,0 +1,61 @@
+""" test_allocation_ledger.py
+Tests on AllocationLedger class.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from product_trailer.allocation_ledger import AllocationLedger
+
+
+@pytest.fixture
+def ledger():
+    mvts = pd.DataFrame(
+        {'QTY': [2, -1, -3, 1]},
+        index=[10, 11, 12, 13]
+    )
+    return AllocationLedger(mvts)
+
+
+def test_initial_unallocated(ledger):
+    assert list(ledger.unallocated) == [2, 1, 3, 1]
+
+def test_allocate(ledger):
+    ledger.allocate(2, '_some_ID', 2)
+    assert (
+        (list(ledger.unallocated) == [2, 1, 1, 1])
+        and (ledger.allocations == {'_some_ID': {2}})
+    )
+
+def test_available_qty(ledger):
+    ledger.allocate(1, '_some_ID', 1)
+    assert list(ledger.available(np.array([0, 1, 2]))) == [0, 2]
+
+def test_available_itemallocated(ledger):
+    ledger.allocate(2, '_some_ID', 1)
+    assert (
+        (list(ledger.available(np.array([0, 2]), '_some_ID')) == [0])
+        and (list(ledger.available(np.array([0, 2]), '_other_ID')) == [0, 2])
+    )
+
+def test_materialise(ledger):
+    ledger.allocate(2, '_some_ID', 3)
+    ledger.allocate(3, '_some_ID', 1)
+    mvts = ledger.materialise(pd.DataFrame({'QTY': [2, -1, -3, 1]}))
+    assert (
+        (list(mvts['QTY_Unallocated']) == [2, 1, 0, 0])
+        and (list(mvts['Items_Allocated']) == [set(), set(), {'_some_ID'}, {'_some_ID'}])
+    )
+
+def test_seed_from_columns():
+    mvts = pd.DataFrame({
+        'QTY': [2, -1],
+        'QTY_Unallocated': [1, 1],
+        'Items_Allocated': [{'_some_ID'}, set()],
+    })
+    ledger = AllocationLedger(mvts)
+    assert (
+        (list(ledger.unallocated) == [1, 1])
+        and (ledger.allocations == {'_some_ID': {0}})
+    )
@@ -0,0 +1,30 @@
+""" test_benchmarks.py
+Smoke tests: each benchmark runs end to end on a small input.
+"""
+
+import importlib
+import sys
+
+import pytest
+
+from benchmarks import bench_pipeline
+
+
+@pytest.mark.parametrize(
+    'module,args',
+    [
+        ('bench_extract_items', ['--rows', '200']),
+        ('bench_long_route', ['--hops', '20']),
+        ('bench_partition', ['--skus', '50', '--sample', '5']),
+        ('bench_prep_mvt', ['--rows', '200']),
+        ('bench_report', ['--items', '50']),
+        ('bench_pipeline', ['--rows', '300']),
+    ]
+)
+def test_benchmark_runs(module, args, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(
+        bench_pipeline, 'RESULTS_PATH', tmp_path / 'results.jsonl'
+    )
+    monkeypatch.setattr(sys, 'argv', [module, *args])
+    importlib.import_module(f'benchmarks.{module}').main()
+    assert len(capsys.readouterr().out) > 0
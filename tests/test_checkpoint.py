@@ -0,0 +1,53 @@
+""" test_checkpoint.py
+Tests on TaskCheckpoint class.
+"""
+
+from product_trailer.checkpoint import TaskCheckpoint
+
+
+def test_round_trip(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9)
+    checkpoint.add('SKU1', ('items1', None))
+    checkpoint.add('SKU2', ('items2', None))
+    assert len(list((tmp_path / 'cp').glob('part-*.pkl'))) == 2
+    resumed = TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9)
+    assert resumed.load() == {'SKU1': ('items1', None), 'SKU2': ('items2', None)}
+
+def test_flush_on_interval(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', [], interval=3600)
+    checkpoint.add('SKU1', 'result')
+    assert TaskCheckpoint(tmp_path / 'cp', [], interval=3600).load() == {}
+    checkpoint.flush()
+    assert TaskCheckpoint(tmp_path / 'cp', [], interval=3600).load() == {'SKU1': 'result'}
+
+def test_other_key_ignored(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9)
+    checkpoint.add('SKU1', 'result')
+    assert TaskCheckpoint(tmp_path / 'cp', ['file 2'], interval=1e-9).load() == {}
+
+def test_disabled(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', [], interval=0)
+    checkpoint.add('SKU1', 'result')
+    checkpoint.flush()
+    assert not (tmp_path / 'cp').exists()
+
+def test_clear(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', [], interval=1e-9)
+    checkpoint.add('SKU1', 'result')
+    checkpoint.clear()
+    assert checkpoint.load() == {}
+
+def test_other_key_cleared_on_load(tmp_path):
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9)
+    checkpoint.add('SKU1', 'result')
+    assert TaskCheckpoint(tmp_path / 'cp', ['file 2'], interval=1e-9).load() == {}
+    assert not (tmp_path / 'cp').exists()
+
+def test_stale_parts_not_mixed(tmp_path):
+    stale = TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9)
+    stale.add('SKU1', 'stale result')
+    checkpoint = TaskCheckpoint(tmp_path / 'cp', ['file 2'], interval=1e-9)
+    checkpoint.add('SKU2', 'result')
+    assert len(list((tmp_path / 'cp').glob('part-*.pkl'))) == 1
+    assert TaskCheckpoint(tmp_path / 'cp', ['file 2'], interval=1e-9).load() == {'SKU2': 'result'}
+    assert TaskCheckpoint(tmp_path / 'cp', ['file 1'], interval=1e-9).load() == {}
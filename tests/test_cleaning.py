@@ -0,0 +1,40 @@
+""" test_cleaning.py
+Tests on cleaning steps of raw movements.
+"""
+
+import numpy as np
+import pandas as pd
+
+from product_trailer import cleaning
+
+
+def test_keep_integer_qty():
+    df = pd.DataFrame(
+        {'QTY': [1.0, -2.0, 1.5, np.nan, 3.0], 'a': list('abcde')}
+    )
+    cleaned = cleaning.keep_integer_qty(df)
+    assert (
+        list(cleaned['a']) == ['a', 'b', 'e']
+        and cleaned['QTY'].dtype == 'int64'
+        and list(cleaned['QTY']) == [1, -2, 3]
+        and cleaned.attrs['rejected_rows'] == {'QTY not integer': 2}
+    )
+
+def test_keep_integer_qty_keeps_previous_counts():
+    df = pd.DataFrame({'QTY': [1.0, 0.5]})
+    df.attrs['rejected_rows'] = {'other': 4}
+    assert cleaning.keep_integer_qty(df).attrs['rejected_rows'] == {
+        'other': 4, 'QTY not integer': 1
+    }
+
+def test_fill_categorical_na():
+    df = pd.DataFrame({
+        'a': pd.Categorical(['x', None, 'y']),
+        'b': pd.Categorical([None, 'NA', 'z']),
+    })
+    filled = cleaning.fill_categorical_na(df, ['a', 'b'])
+    assert (
+        list(filled['a']) == ['x', 'NA', 'y']
+        and list(filled['a'].cat.categories) == ['x', 'y', 'NA']
+        and list(filled['b']) == ['NA', 'NA', 'z']
+    )
@@ -0,0 +1,85 @@
+""" test_components.py
+Tests on the connected components of the movement graph.
+"""
+
+import numpy as np
+import pandas as pd
+
+from product_trailer.components import attach_items, movement_components
+from product_trailer.item import Item
+from product_trailer.key_codec import KeyCodec
+
+
+def make_mvts():
+    rows = [
+        # Transfer S1 -> S2, then S2 -> S3 (same Company_SLOC_Batch)
+        ['2023-01-01', 'c1', 'd1', '-2', '311', 'S1', 'x', 'b1', -1],
+        ['2023-01-01', 'c1', 'd1', '-2', '311', 'S2', 'x', 'b1', 1],
+        ['2023-01-02', 'c1', 'd2', '-2', '311', 'S2', 'x', 'b1', -1],
+        ['2023-01-02', 'c1', 'd2', '-2', '311', 'S3', 'x', 'b1', 1],
+        # Batch change b1 -> b2 in S9, unrelated to the S1-S3 moves
+        ['2023-01-03', 'c1', 'd3', '-2', '702', 'S9', 'x', 'b1', -1],
+        ['2023-01-03', 'c1', 'd4', '-2', '701', 'S9', 'x', 'b2', 1],
+        # PO from c1 to c2
+        ['2023-01-04', 'c1', 'd5', 'p1', '641', 'S7', 'x', 'b3', -1],
+        ['2023-01-09', 'c2', 'd6', 'p1', '101', 'S8', 'x', 'b3', 1],
+        # Same document, not a [-] and a [+]: not linked
+        ['2023-01-05', 'c1', 'd7', '-2', '601', 'S5', 'y', 'b4', -1],
+        ['2023-01-05', 'c1', 'd7', '-2', '601', 'S6', 'y', 'b5', -1],
+        # Sold-to change
+        ['2023-01-06', 'c1', 'd8', '-2', '956', 'NA', 'y', 'b6', -1],
+        ['2023-01-06', 'c1', 'd9', '-2', '955', 'NA', 'z', 'b6', 1],
+    ]
+    mvts = pd.DataFrame(rows, columns=[
+        'Posting Date', 'Company', 'Document', 'PO', 'Mvt Code', 'SLOC',
+        'Sold to', 'Batch', 'QTY'
+    ]).assign(
+        **{'Posting Date': lambda df: pd.to_datetime(df['Posting Date'])},
+        SKU=pd.Categorical(['sku1'] * len(rows))
+    )
+    codec = KeyCodec.from_movements(mvts)
+    return codec.encode_movements(mvts), codec
+
+
+def make_item(id, wpt, open=True):
+    return Item(id, 'FR', 'sku1', 1, open, [wpt], 1.0, 'brand', 'cat')
+
+
+def groups(comps):
+    found = {}
+    for pos, comp in enumerate(comps.tolist()):
+        found.setdefault(comp, []).append(pos)
+    return sorted(found.values())
+
+
+def test_movement_components():
+    mvts, codec = make_mvts()
+    comps = movement_components(mvts, codec)
+    assert groups(comps) == [
+        [0, 1, 2, 3], [4, 5], [6, 7], [8], [9], [10, 11]
+    ]
+
+def test_components_within_sku():
+    mvts, codec = make_mvts()
+    mvts['SKU'] = pd.Categorical(['sku1'] * 2 + ['sku2'] * 10)
+    comps = movement_components(mvts, codec)
+    assert comps[1] != comps[2]
+
+def test_attach_items():
+    mvts, codec = make_mvts()
+    comps = movement_components(mvts, codec)
+    items = [
+        make_item('_i1', [None, 'c1', 'S2', np.nan, '311', 'b1']),
+        make_item('_i2', [None, 'c1', 'PO FROM S7', 'x', 'p1', 'b3'], np.nan),
+        make_item('_i3', [None, 'c1', 'S4', np.nan, '311', 'b1']),
+        make_item('_i4.0', [None, 'c1', 'S5', np.nan, '601', 'b4']),
+        make_item('_i4.1', [None, 'c1', 'S6', np.nan, '601', 'b5']),
+    ]
+    roots = np.array(['_i1', '_i2', '_i3', '_i4', '_i4'], dtype=object)
+    comps, item_comps = attach_items(items, roots, mvts, comps, codec)
+    assert item_comps[0] == comps[0]
+    assert item_comps[1] == comps[7]
+    assert item_comps[2] == -1
+    # Items of the same entry point: components merged
+    assert item_comps[3] == item_comps[4] == comps[8] == comps[9]
+    assert len(np.unique(comps)) == 5
@@ -12,6 +12,7 @@ import pytest
 
 from product_trailer.profile import Profile
 from product_trailer.scheduler import Scheduler
+from product_trailer.decrement_increment import Decrement
 from product_trailer.forwardtracker import ForwardTracker
 from product_trailer.item import Item
 
@@ -45,201 +46,141 @@ def make_ForwardTracker(mvtfp):
     )
     return ForwardTracker(WPT_DEF, mvts)
 
+def find_decr(ft, first_step, wpt):
+    """Positions of the decrements found for waypoint wpt (values)."""
+    decrements = ft._find_decr(
+        first_step,
+        ft.codec.encode_waypoint([pd.to_datetime(wpt[0]), *wpt[1:]]),
+        '_some_ID'
+    )
+    return [decrement.mvt_pos for decrement in decrements]
+
+def make_decrement(ft, **fields):
+    """Decrement of the fields given (values), other fields empty."""
+    values = {
+        'company': '', 'document': '', 'po': '-2', 'mvt_code': '',
+        'sloc': '', 'soldto': '', 'batch': '', **fields
+    }
+    return Decrement(
+        mvt_index=None,
+        date=pd.to_datetime(values.pop('date')),
+        sku='SKU001',
+        qty=-1,
+        **{field: ft.codec.encode(val) for field, val in values.items()}
+    )
+
 class Test_find_decr:
     def test__find_decr_case1_std(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        decrements = ft._find_decr(
+        positions = find_decr(
+            ft,
             False,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'SLOC_1',
-                'NA',
-                '',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'SLOC_1', 'NA', '', 'b0101']
         )
-        assert list(decrements.index) == [3, 5, 9]
+        assert positions == [3, 5, 9]
 
     def test__find_decr_case2_itemallocated(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        ft.mvts['Items_Allocated'].iloc[3] = ['_some_ID']
-        decrements = ft._find_decr(
+        ft.ledger.allocate(3, '_some_ID', 0)
+        positions = find_decr(
+            ft,
             False,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'SLOC_1',
-                'NA',
-                '',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'SLOC_1', 'NA', '', 'b0101']
         )
-        assert list(decrements.index) == [5, 9]
+        assert positions == [5, 9]
 
     def test__find_decr_case3_date(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        decrements = ft._find_decr(
+        positions = find_decr(
+            ft,
             False,
-            [
-                pd.to_datetime('02/01/2023'),
-                '1100',
-                'SLOC_1',
-                'NA',
-                '',
-                'b0101'
-            ],
-            '_some_ID'
+            ['02/01/2023', '1100', 'SLOC_1', 'NA', '', 'b0101']
         )
-        assert list(decrements.index) == []
+        assert positions == []
 
     def test__find_decr_case4_qtyunallocated(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        ft.mvts['QTY_Unallocated'].iloc[5] = 0
-        decrements = ft._find_decr(
+        ft.ledger.unallocated[5] = 0
+        positions = find_decr(
+            ft,
             False,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'SLOC_1',
-                'NA',
-                '',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'SLOC_1', 'NA', '', 'b0101']
         )
-        assert list(decrements.index) == [3, 9]
+        assert positions == [3, 9]
 
     def test__find_decr_case5_soldto(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        decrements = ft._find_decr(
+        positions = find_decr(
+            ft,
             False,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'NA',
-                '0000222222',
-                '',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'NA', '0000222222', '', 'b0101']
         )
-        assert list(decrements.index) == [8]
+        assert positions == [8]
 
     def test__find_decr_case6_firstmvt(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        decrements = ft._find_decr(
+        positions = find_decr(
+            ft,
             True,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'SLOC_2',
-                '',
-                'C02',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'SLOC_2', '', 'C02', 'b0101']
         )
-        assert list(decrements.index) == [1]
+        assert positions == [1]
 
     def test__find_decr_case7_firstmvtinconsignment(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        decrements = ft._find_decr(
+        positions = find_decr(
+            ft,
             True,
-            [
-                pd.to_datetime('01/01/2023'),
-                '1100',
-                'NA',
-                '0000222222',
-                'C01',
-                'b0101'
-            ],
-            '_some_ID'
+            ['01/01/2023', '1100', 'NA', '0000222222', 'C01', 'b0101']
         )
-        assert list(decrements.index) == [8]
+        assert positions == [8]
 
 class Test_find_incr:
     def test__find_incr_case1_std(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        increments = ft._find_incr(
-            decr=pd.Series(
-                {
-                    'Posting Date': pd.to_datetime('01/01/2023'),
-                    'Company': '1100',
-                    'Sold to': '',
-                    'Batch': 'b0101',
-                    'Mvt Code': 'C01',
-                    'Document': 'DOC001',
-                    'PO': '-2'
-                }
-            )
-        )
-        assert list(increments.index) == [0, 4]
-    
+        decrement = make_decrement(
+            ft, date='01/01/2023', company='1100', soldto='', batch='b0101',
+            mvt_code='C01', document='DOC001'
+        )
+        increments = ft._find_incr(decrement)
+        assert increments.tolist() == [0, 4]
+
     def test__find_incr_case2_changesoldto(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        increments = ft._find_incr(
-            decr=pd.Series(
-                {
-                    'Posting Date': pd.to_datetime('01/01/2023'),
-                    'Company': '1100',
-                    'Batch': 'b0101',
-                    'Mvt Code': '956',
-                    'PO': '-2'
-                }
-            )
-        )
-        assert list(increments.index) == [10]
+        decrement = make_decrement(
+            ft, date='01/01/2023', company='1100', batch='b0101',
+            mvt_code='956'
+        )
+        increments = ft._find_incr(decrement)
+        assert increments.tolist() == [10]
 
     def test__find_incr_case3_changebatch(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        increments = ft._find_incr(
-            decr=pd.Series(
-                {
-                    'Posting Date': pd.to_datetime('01/01/2023'),
-                    'Company': '1100',
-                    'SLOC': 'SLOC_1',
-                    'Sold to': '',
-                    'Mvt Code': '702',
-                    'PO': '-2'
-                }
-            )
-        )
-        assert list(increments.index) == [11]
-    
+        decrement = make_decrement(
+            ft, date='01/01/2023', company='1100', sloc='SLOC_1', soldto='',
+            mvt_code='702'
+        )
+        increments = ft._find_incr(decrement)
+        assert increments.tolist() == [11]
+
     def test__find_incr_case4_po(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        increments = ft._find_incr(
-            decr=pd.Series(
-                {
-                    'Posting Date': pd.to_datetime('01/01/2023'),
-                    'Batch': 'b0101',
-                    'PO': 'PO001',
-                    'Mvt Code': 'something'
-                }
-            )
-        )
-        assert list(increments.index) == [4, 15]
-    
+        decrement = make_decrement(
+            ft, date='01/01/2023', batch='b0101', po='PO001',
+            mvt_code='something'
+        )
+        increments = ft._find_incr(decrement)
+        assert increments.tolist() == [4, 15]
+
     def test__find_incr_case5_nobatch(self):
         ft = make_ForwardTracker('tests/test_data/mvts_1.csv')
-        increments = ft._find_incr(
-            decr=pd.Series(
-                {
-                    'Posting Date': pd.to_datetime('01/01/2023'),
-                    'Company': '1100',
-                    'Sold to': '',
-                    'Mvt Code': 'C01',
-                    'Document': 'DOC001',
-                    'PO': '-2'
-                }
-            ),
-            nobatch=True
+        decrement = make_decrement(
+            ft, date='01/01/2023', company='1100', soldto='', mvt_code='C01',
+            document='DOC001'
         )
+        increments = ft._find_incr(decrement, nobatch=True)
         #FIXME: shouldn't take a +mvt coming from a PO! (row 4)
-        assert list(increments.index) == [0, 4]
+        assert increments.tolist() == [0, 4]
 
 
 @pytest.fixture()
@@ -308,6 +249,32 @@ class Test_make_route:
         act_item = tracker._make_route(ini_item)[0]
         assert act_item == exp_item
 
+    @pytest.mark.parametrize(
+        'dummy_mvts', ['tests/test_data/fwt_case02.xlsx'], indirect=True
+    )
+    def test_case02_nonunique_index(self, dummy_mvts):
+        unique = ForwardTracker(WPT_DEF, dummy_mvts.copy())
+        tracker = ForwardTracker(
+            WPT_DEF, dummy_mvts.set_axis([0] * len(dummy_mvts))
+        )
+        ini_item = Item(
+            id='_some_id',
+            ini_country='SomeCountry',
+            sku='SomeSKU',
+            qty=1,
+            open=True,
+            waypoints=[
+                [pd.Timestamp('2023-01-19'), '3100', 'NA', '0000449493', '632', '2210OZS1496']
+            ],
+            unit_value=10,
+            brand='SomeBrand',
+            category='SomeCategory'
+        )
+        assert (
+            tracker._make_route(deepcopy(ini_item))
+            == unique._make_route(deepcopy(ini_item))
+        )
+
     @pytest.mark.parametrize(
         'dummy_mvts', ['tests/test_data/fwt_case03.xlsx'], indirect=True
     )
@@ -0,0 +1,73 @@
+""" test_ingest.py
+Tests on ingestion of raw movements files.
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from product_trailer import ingest
+
+
+READ_KWARGS = {
+    'dtype': {'Material': 'category', 'Batch No': str},
+    'parse_dates': ['Posting Date'],
+}
+
+@pytest.fixture
+def raw_file(tmp_path):
+    fpath = tmp_path / 'raw_mvts2.xlsx'
+    shutil.copy('tests/test_data/raw_mvts2.xlsx', fpath)
+    return fpath
+
+
+def test_chunks_same_as_whole_file(raw_file):
+    whole = ingest.read_xlsx(raw_file, cache=False, **READ_KWARGS)
+    chunked = ingest.read_xlsx(
+        raw_file, chunksize=3, cache=False, **READ_KWARGS
+    )
+    assert (
+        chunked.equals(whole)
+        and list(chunked['Material'].cat.categories)
+        == list(whole['Material'].cat.categories)
+    )
+
+def test_cache_used(raw_file):
+    first = ingest.read_xlsx(raw_file, **READ_KWARGS)
+    second = ingest.read_xlsx(raw_file, **READ_KWARGS)
+    assert (
+        not first.attrs['ingest']['cached']
+        and second.attrs['ingest']['cached']
+        and second.equals(first)
+    )
+
+def test_cache_invalidated_by_options(raw_file):
+    ingest.read_xlsx(raw_file, **READ_KWARGS)
+    other = ingest.read_xlsx(raw_file, parse_dates=['Posting Date'])
+    cache_files = list((raw_file.parent / ingest.CACHE_DIRNAME).iterdir())
+    assert not other.attrs['ingest']['cached'] and len(cache_files) == 1
+
+def test_cache_dir_hit_and_mtime_invalidation(raw_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = ingest.read_xlsx(raw_file, cache_dir=cache_dir, **READ_KWARGS)
+    second = ingest.read_xlsx(raw_file, cache_dir=cache_dir, **READ_KWARGS)
+    stat = raw_file.stat()
+    os.utime(raw_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    third = ingest.read_xlsx(raw_file, cache_dir=cache_dir, **READ_KWARGS)
+    assert not first.attrs['ingest']['cached']
+    assert second.attrs['ingest']['cached'] and second.equals(first)
+    assert not third.attrs['ingest']['cached'] and third.equals(first)
+    assert len(list(cache_dir.iterdir())) == 1
+    assert not (raw_file.parent / ingest.CACHE_DIRNAME).exists()
+
+def test_csv_chunks(tmp_path):
+    fpath = tmp_path / 'mvts.csv'
+    pd.DataFrame({'a': list('xyzxy'), 'b': range(5)}).to_csv(fpath, index=False)
+    df = ingest.read_csv(fpath, chunksize=2, dtype={'a': 'category'})
+    assert (
+        list(df['a'].cat.categories) == ['x', 'y', 'z']
+        and list(df['b']) == [0, 1, 2, 3, 4]
+        and list(df.index) == [0, 1, 2, 3, 4]
+    )
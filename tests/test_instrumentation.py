@@ -0,0 +1,53 @@
+""" test_instrumentation.py
+Tests on RunTimer class and save_hot_paths.
+"""
+
+import cProfile
+import json
+
+import pandas as pd
+
+from product_trailer.instrumentation import RunTimer, save_hot_paths
+
+
+def test_stages_accumulate():
+    timer = RunTimer()
+    for _ in range(2):
+        with timer.stage('import'):
+            pass
+    with timer.stage('track'):
+        pass
+    assert list(timer.stages) == ['import', 'track']
+    assert timer.to_dict()['total_seconds'] == sum(timer.stages.values())
+
+def test_stage_timed_on_exception():
+    timer = RunTimer()
+    try:
+        with timer.stage('track'):
+            raise ValueError
+    except ValueError:
+        pass
+    assert 'track' in timer.stages
+
+def test_save_report(tmp_path):
+    timer = RunTimer()
+    timer.add_task('SKU1', {'seconds': 0.5, 'hops': 3})
+    timer.add_task('SKU2', {'seconds': 1.5, 'hops': 4})
+    json_path, csv_path = timer.save(tmp_path, 'Timing')
+    with open(json_path) as read_file:
+        report = json.load(read_file)
+    assert report['tracking'] == {'seconds': 2.0, 'hops': 7, 'skus': 2}
+    assert report['slowest_skus'][0]['sku'] == 'SKU2'
+    assert list(pd.read_csv(csv_path)['sku']) == ['SKU1', 'SKU2']
+
+def test_save_report_no_task(tmp_path):
+    assert RunTimer().save(tmp_path, 'Timing') == [tmp_path / 'Timing.json']
+
+def test_save_hot_paths(tmp_path):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    sorted(range(1000), key=lambda val: -val)
+    profiler.disable()
+    prof_path, txt_path = save_hot_paths(profiler, tmp_path, 'Hot paths')
+    assert prof_path.stat().st_size > 0
+    assert 'cumulative' in txt_path.read_text()
@@ -0,0 +1,25 @@
+""" test_item.py
+Tests on Item and WaypointChain classes.
+"""
+
+from product_trailer.item import WaypointChain
+
+
+def test_waypointchain_roundtrip():
+    wpts = [['a', 1], ['b', 2], ['c', 3]]
+    assert WaypointChain.from_list(wpts).to_list() == wpts
+
+def test_waypointchain_append_shares_history():
+    chain = WaypointChain.from_list([['a', 1], ['b', 2]])
+    branch1 = chain.append(['c', 3])
+    branch2 = chain.append(['d', 4])
+    assert (
+        (branch1.parent is branch2.parent)
+        and (chain.to_list() == [['a', 1], ['b', 2]])
+        and (branch2.to_list() == [['a', 1], ['b', 2], ['d', 4]])
+        and (len(branch1) == 3)
+    )
+
+def test_waypointchain_long():
+    chain = WaypointChain.from_list([[i] for i in range(10_000)])
+    assert (len(chain) == 10_000) and (chain.to_list()[-1] == [9_999])
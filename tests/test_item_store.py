@@ -0,0 +1,100 @@
+""" test_item_store.py
+Tests on PartitionedItemStore class.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from product_trailer.item import Item
+from product_trailer.item_table import ItemTable
+from product_trailer.item_store import PartitionedItemStore
+from product_trailer.storage import get_backend
+
+
+def make_item(id, open):
+    return Item(
+        id=id,
+        ini_country='SomeCountry',
+        sku='SomeSKU',
+        qty=1,
+        open=open,
+        waypoints=[
+            [pd.NaT, '3500', 'NA', '0000111111', '', 'b1'],
+            [pd.Timestamp('2023-01-17'), '3500', '00299', np.nan, '632', 'b1'],
+        ],
+        unit_value=10.0,
+        brand='SomeBrand',
+        category='SomeCategory'
+    )
+
+@pytest.fixture(params=['pickle', 'parquet'])
+def store(tmp_path, request):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return PartitionedItemStore(tmp_path / 'items', get_backend(request.param))
+
+
+def test_fetch_empty(store):
+    assert store.fetch() is None
+
+def test_save_splits_by_status(store):
+    items = ItemTable.from_items([
+        make_item('_id1', True), make_item('_id2', False),
+        make_item('_id3', np.nan)
+    ])
+    store.save(items, run_count=1)
+    assert (
+        list(store.fetch('open').items.index) == ['_id1', '_id3']
+        and list(store.fetch('closed').items.index) == ['_id2']
+        and len(store.fetch('all')) == 3
+    )
+
+def test_closed_items_appended(store):
+    store.save(ItemTable.from_items([
+        make_item('_id1', True), make_item('_id2', False)
+    ]), run_count=1)
+    # 2nd run: the scheduler only received the open items
+    store.save(ItemTable.from_items([
+        make_item('_id1', False), make_item('_id4', True)
+    ]), run_count=2)
+    assert (
+        list(store.fetch('closed').items.index) == ['_id2', '_id1']
+        and list(store.fetch('open').items.index) == ['_id4']
+        and len(list(
+            store.closed_path.glob('*.items' + store.backend.SUFFIX)
+        )) == 2
+    )
+
+def test_same_run_doesnt_overwrite(store):
+    store.save(ItemTable.from_items([make_item('_id1', False)]), run_count=1)
+    store.save(ItemTable.from_items([make_item('_id2', False)]), run_count=1)
+    assert list(store.fetch('closed').items.index) == ['_id1', '_id2']
+
+def test_roundtrip_waypoints(store):
+    items = [make_item('_id1', True), make_item('_id2', False)]
+    store.save(ItemTable.from_items(items), run_count=1)
+    fetched = store.fetch().to_items()
+    assert (
+        repr(sorted(fetched, key=lambda item: item.id))
+        == repr(items)
+    )
+
+def test_fetch_projection_and_filters(store):
+    items = [make_item('_id1', True), make_item('_id2', False)]
+    items[1].qty = 5
+    store.save(ItemTable.from_items(items), run_count=1)
+    fetched = store.fetch(columns=['sku', 'qty'], filters=[('qty', '>', 1)])
+    assert (
+        list(fetched.items.columns) == ['sku', 'qty']
+        and list(fetched.items.index) == ['_id2']
+        and len(fetched.waypoints) == 0
+    )
+
+def test_fetch_filters_keep_waypoints(store):
+    items = [make_item('_id1', True), make_item('_id2', True)]
+    items[1].qty = 5
+    items[1].waypoints = items[1].waypoints[:1]
+    store.save(ItemTable.from_items(items), run_count=1)
+    fetched = store.fetch(filters=[('qty', '==', 5)])
+    assert repr(fetched.to_items()) == repr(items[1:])
@@ -0,0 +1,88 @@
+""" test_item_table.py
+Tests on ItemTable class.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from product_trailer.item import Item
+from product_trailer.item_table import ItemTable
+
+
+def make_item(id, qty, open, waypoints):
+    return Item(
+        id=id,
+        ini_country='SomeCountry',
+        sku='SomeSKU',
+        qty=qty,
+        open=open,
+        waypoints=waypoints,
+        unit_value=10.0,
+        brand='SomeBrand',
+        category='SomeCategory'
+    )
+
+@pytest.fixture
+def dummy_items():
+    return [
+        make_item('_id1', 2, True, [
+            [pd.NaT, '3500', 'NA', '0000111111', '', 'b1'],
+            [pd.Timestamp('2023-01-17'), '3500', '00299', np.nan, '632', 'b1'],
+        ]),
+        make_item('_id2', 1, np.nan, [
+            [pd.NaT, '3100', 'NA', '0000222222', '', 'b2'],
+            [pd.Timestamp('2023-01-19'), '3100', '00209', np.nan, '632', 'b2'],
+            [pd.Timestamp('2023-01-20'), '3100', 'PO FROM 00209, mvt 161',
+             '0000007905', '9000667710', 'b2'],
+        ]),
+        make_item('_id3', 4, False, [
+            [pd.Timestamp('2023-01-03'), '1100', '1000', 'NA', '632', 'b3'],
+        ]),
+    ]
+
+def as_comparable(df):
+    return df.assign(waypoints=df['waypoints'].apply(repr))
+
+
+def test_from_items_shapes(dummy_items):
+    table = ItemTable.from_items(dummy_items)
+    assert (
+        (len(table) == 3)
+        and (list(table.waypoints['item_no']) == [0, 0, 1, 1, 1, 2])
+        and (list(table.waypoints['seq']) == [0, 1, 0, 1, 2, 0])
+        and (list(table.waypoints.select_dtypes('category').columns)
+             == ['company', 'sloc', 'soldto', 'mvt_code', 'batch'])
+    )
+
+def test_frame_roundtrip(dummy_items):
+    df = ItemTable.from_items(dummy_items).to_frame()
+    table = ItemTable.from_frame(df)
+    assert as_comparable(table.to_frame()).equals(as_comparable(df))
+
+def test_to_items(dummy_items):
+    act_items = ItemTable.from_items(dummy_items).to_items()
+    assert [repr(item) for item in act_items] == [repr(item) for item in dummy_items]
+
+def test_concat(dummy_items):
+    table = ItemTable.concat([
+        ItemTable.from_items(dummy_items[:1]),
+        ItemTable.from_items([]),
+        ItemTable.from_items(dummy_items[1:]),
+    ])
+    expected = ItemTable.from_items(dummy_items).to_frame()
+    assert as_comparable(table.to_frame()).equals(as_comparable(expected))
+
+def test_select(dummy_items):
+    table = ItemTable.from_items(dummy_items).select([True, False, True])
+    assert (
+        [repr(item) for item in table.to_items()]
+        == [repr(item) for item in dummy_items[::2]]
+    )
+
+def test_reorder(dummy_items):
+    table = ItemTable.from_items(dummy_items).reorder([2, 0, 1])
+    assert (
+        [repr(item) for item in table.to_items()]
+        == [repr(dummy_items[pos]) for pos in [2, 0, 1]]
+    )
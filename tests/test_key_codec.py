@@ -0,0 +1,69 @@
+""" test_key_codec.py
+Tests on KeyCodec class.
+"""
+
+import numpy as np
+import pandas as pd
+
+from product_trailer.key_codec import KeyCodec, MISSING
+
+
+def make_mvts():
+    return pd.DataFrame({
+        'Posting Date': pd.to_datetime(['2023-01-01', '2023-01-02', None]),
+        'Company': pd.Categorical(['1100', '1200', '1100']),
+        'SLOC': pd.Categorical(['NA', None, 'S1'], categories=['S1', 'NA', 'X']),
+        'Batch': np.array(['b1', None, '1100'], dtype=object),
+        'QTY': [1, -2, 3],
+    })
+
+
+class Test_encode_movements:
+    def test_shared_vocabulary(self):
+        mvts = make_mvts()
+        codec = KeyCodec.from_movements(mvts)
+        encoded = codec.encode_movements(mvts)
+        assert list(encoded.columns) == list(mvts.columns)
+        assert encoded['Company'].dtype == np.int32
+        # '1100' has the same code as a Company and as a Batch
+        assert encoded.loc[0, 'Company'] == encoded.loc[2, 'Batch']
+        assert encoded.loc[1, 'SLOC'] == MISSING
+        assert encoded.loc[1, 'Batch'] == MISSING
+
+    def test_round_trip(self):
+        mvts = make_mvts()
+        codec = KeyCodec.from_movements(mvts)
+        encoded = codec.encode_movements(mvts)
+        codec.encode('new value')  # Vocabulary extended while tracking
+        decoded = codec.decode_movements(encoded.iloc[1:])
+        assert decoded.equals(mvts.iloc[1:])
+        assert decoded.dtypes.equals(mvts.dtypes)
+
+    def test_nullable_string(self):
+        mvts = make_mvts().astype({'Batch': 'string'})
+        codec = KeyCodec.from_movements(mvts)
+        encoded = codec.encode_movements(mvts)
+        assert encoded.loc[1, 'Batch'] == MISSING
+        decoded = codec.decode_movements(encoded)
+        assert decoded['Batch'].dtype == 'string'
+        assert decoded['Batch'].isna().tolist() == [False, True, False]
+
+
+class Test_waypoints:
+    def test_round_trip(self):
+        codec = KeyCodec.from_movements(make_mvts())
+        wpt = [pd.Timestamp('2023-01-01'), '1100', 'unseen', np.nan, '', 'b1']
+        encoded = codec.encode_waypoint(wpt)
+        assert encoded[0] == wpt[0]
+        assert encoded[3] == MISSING
+        assert codec.encode(pd.NA) == MISSING
+        assert codec.encode(None) == MISSING
+        assert repr(codec.decode_waypoint(encoded)) == repr(wpt)
+
+    def test_join(self):
+        codec = KeyCodec.from_movements(make_mvts())
+        code = codec.join('PO FROM {}, mvt {}', codec.encode('S1'),
+                          codec.encode('101'))
+        assert codec.decode(code) == 'PO FROM S1, mvt 101'
+        assert codec.join('PO FROM {}, mvt {}', codec.encode('S1'),
+                          codec.encode('101')) == code
@@ -0,0 +1,125 @@
+""" test_movement_index.py
+Tests on MovementIndex class.
+"""
+
+import pandas as pd
+import pytest
+
+from product_trailer.key_codec import KeyCodec
+from product_trailer.movement_index import MovementIndex
+
+
+def read_mvts():
+    return pd.read_csv('tests/test_data/mvts_1.csv',
+        dtype={
+            'Company': 'category',
+            'Document': str,
+            'PO': 'category',
+            'Mvt Code': 'category',
+            'SLOC': 'category',
+            'Sold to': 'category',
+            'SKU': 'category',
+            'Batch': str,
+            'QTY': int
+        },
+        parse_dates=['Posting Date'],
+        na_filter=False
+    )
+
+@pytest.fixture(scope='module')
+def index():
+    return MovementIndex(read_mvts())
+
+JAN1 = pd.to_datetime('01/01/2023')
+FEB1 = pd.to_datetime('02/01/2023')
+
+
+class Test_lookup_decr:
+    def test_decr_std(self, index):
+        positions = index.lookup(
+            'decr', ('1100', 'SLOC_1', 'b0101'), from_date=JAN1
+        )
+        assert list(positions) == [3, 5, 9]
+
+    def test_decr_date(self, index):
+        positions = index.lookup(
+            'decr', ('1100', 'SLOC_1', 'b0101'), from_date=FEB1
+        )
+        assert list(positions) == []
+
+    def test_decr_soldto(self, index):
+        positions = index.lookup(
+            'decr_soldto', ('1100', 'NA', 'b0101', '0000222222'),
+            from_date=JAN1
+        )
+        assert list(positions) == [8]
+
+    def test_decr_firstmvt(self, index):
+        positions = index.lookup(
+            'decr_first', (JAN1, '1100', 'SLOC_2', 'b0101', '', 'C02')
+        )
+        assert list(positions) == [1]
+
+    def test_decr_nat(self, index):
+        positions = index.lookup(
+            'decr', ('1100', 'SLOC_1', 'b0101'), from_date=pd.NaT
+        )
+        assert list(positions) == []
+
+
+class Test_lookup_incr:
+    def test_incr_std(self, index):
+        positions = index.lookup(
+            'incr', (JAN1, '1100', '', 'b0101', 'C01', 'DOC001')
+        )
+        assert list(positions) == [0, 4]
+
+    def test_incr_changesoldto(self, index):
+        positions = index.lookup(
+            'incr_soldto_change', (JAN1, '1100', 'b0101')
+        )
+        assert list(positions) == [10]
+
+    def test_incr_changebatch(self, index):
+        positions = index.lookup(
+            'incr_batch_change', (JAN1, '1100', 'SLOC_1', '')
+        )
+        assert list(positions) == [11]
+
+    def test_incr_po(self, index):
+        positions = index.lookup('incr_po', ('b0101', 'PO001'), from_date=JAN1)
+        assert list(positions) == [4, 15]
+
+    def test_incr_nobatch(self, index):
+        positions = index.lookup(
+            'incr_nobatch', (JAN1, '1100', '', 'C01', 'DOC001')
+        )
+        assert list(positions) == [0, 4]
+
+    def test_incr_unknown_key(self, index):
+        positions = index.lookup(
+            'incr', (JAN1, '9999', '', 'b0101', 'C01', 'DOC001')
+        )
+        assert list(positions) == []
+
+
+class Test_encoded_keys:
+    def test_same_positions(self, index):
+        mvts = read_mvts()
+        codec = KeyCodec.from_movements(mvts)
+        encoded = MovementIndex(codec.encode_movements(mvts), codec)
+        key = (JAN1, '1100', 'b0101')
+        assert list(encoded.lookup(
+            'incr_soldto_change', tuple(codec.encode_waypoint(key))
+        )) == list(index.lookup('incr_soldto_change', key)) == [10]
+
+    def test_missing_code(self):
+        mvts = read_mvts()
+        mvts.loc[3, 'Batch'] = None
+        codec = KeyCodec.from_movements(mvts)
+        encoded = MovementIndex(codec.encode_movements(mvts), codec)
+        positions = encoded.lookup(
+            'decr', tuple(map(codec.encode, ['1100', 'SLOC_1', 'b0101'])),
+            from_date=JAN1
+        )
+        assert list(positions) == [5, 9]
@@ -0,0 +1,237 @@
+import json
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from product_trailer.item_table import ItemTable
+from product_trailer.postprocessing_tk import (
+    collect_stock_move,
+    export_stock_move_graph,
+    generate_stock_move_diagram,
+    iter_exportable_hist,
+    make_exportable_hist,
+    make_standard_report,
+    stock_move_edges,
+    stock_move_graph,
+)
+from product_trailer.report_writer import write_csv
+
+
+def make_tracked_items():
+    return pd.DataFrame({
+        'ini_country': ['Spain', 'France'],
+        'sku': ['SKU1', 'SKU2'],
+        'qty': [2, 1],
+        'open': [True, np.nan],
+        'waypoints': [
+            [
+                [pd.NaT, '1000', 'NA', 'S1', '632', 'B1'],
+                [pd.Timestamp('2023-01-02'), '1000', 'S00', np.nan, '632', 'B1'],
+                [pd.Timestamp('2023-01-05'), '1000', 'S01', np.nan, '311', 'B1'],
+                [pd.Timestamp('2023-02-01'), '2000', 'S00', 'S2', '601', 'B1'],
+            ],
+            [
+                [pd.NaT, '2000', 'NA', 'S3', '932', 'B2'],
+                [pd.Timestamp('2023-01-10'), '2000', 'S00', np.nan, '932', 'B2'],
+            ],
+        ],
+        'unit_value': [10.0, 20.0],
+        'brand': ['A', 'B'],
+        'category': ['C', 'D'],
+    }, index=pd.Index(['_item1', '_item2'], name='id'))
+
+
+def test_make_standard_report():
+    report = make_standard_report(make_tracked_items())
+    assert report.columns.tolist() == [
+        'id', 'ini_country', 'sku', 'qty', 'open', 'waypoints', 'unit_value',
+        'brand', 'category', 'Route', 'DCs', 'Return_Date', 'Return_Month',
+        'Company(first)', 'SLOC(first)', 'SoldTo(first)', 'Company(last)',
+        'SLOC(last)', 'SoldTo(last)', 'Num_Steps', 'Num_Companies',
+        'Num_Days_Open'
+    ]
+    first = report.iloc[0]
+    assert first['id'] == '_item1'
+    assert first['Route'] == '1000.NA > 1000.S00 > 1000.S01 > 2000.S00'
+    assert first['DCs'] == '1000 > 2000'
+    assert first['Return_Date'] == '2023-01-02'
+    assert first['Return_Month'] == '2023/01'
+    assert (first['Company(first)'], first['SLOC(first)']) == ('1000', 'NA')
+    assert first['SoldTo(first)'] == 'S1'
+    assert (first['Company(last)'], first['SoldTo(last)']) == ('2000', 'S2')
+    assert (first['Num_Steps'], first['Num_Companies']) == (4, 2)
+    assert first['Num_Days_Open'] == pd.Timedelta(days=30)
+    assert first['waypoints'] == (
+        '-, 1000, NA, S1, 632, B1'
+        '  >>>  2023-01-02, 1000, S00, nan, 632, B1'
+        '  >>>  2023-01-05, 1000, S01, nan, 311, B1'
+        '  >>>  2023-02-01, 2000, S00, S2, 601, B1'
+    )
+    second = report.iloc[1]
+    assert second['DCs'] == '2000'
+    assert np.isnan(second['SoldTo(last)'])
+    assert (second['Num_Steps'], second['Num_Companies']) == (2, 1)
+    # On a PO (open is NaN): open until its last waypoint
+    assert second['Num_Days_Open'] == pd.Timedelta(0)
+
+
+def test_make_standard_report_from_table():
+    tracked_items = make_tracked_items()
+    pd.testing.assert_frame_equal(
+        make_standard_report(ItemTable.from_frame(tracked_items)),
+        make_standard_report(tracked_items)
+    )
+
+
+def test_make_exportable_hist():
+    hist = make_exportable_hist(make_tracked_items())
+    assert hist.columns.tolist() == [
+        'id', 'ini_country', 'sku', 'qty', 'open', 'unit_value', 'brand',
+        'category', 'WaypointNo', 'Landing_Date', 'Landing_Code', 'SLOC',
+        'Soldto', 'Batch_', 'Depart_Date'
+    ]
+    assert hist['id'].tolist() == ['_item1'] * 4 + ['_item2'] * 2
+    assert hist['WaypointNo'].tolist() == [1, 2, 3, 4, 1, 2]
+    assert hist['qty'].tolist() == [2, 2, 2, 2, 1, 1]
+    assert hist['Landing_Date'].isna().tolist() == [
+        True, False, False, False, True, False
+    ]
+    assert hist['Landing_Date'].iloc[3] == pd.Timestamp('2023-02-01')
+    assert hist['Depart_Date'].iloc[0] == pd.Timestamp('2023-01-02')
+    assert hist['Depart_Date'].isna().tolist() == [
+        False, False, False, True, False, True
+    ]
+    assert hist['Landing_Code'].iloc[3] == 'S2'
+    assert np.isnan(hist['Landing_Code'].iloc[0])
+    assert hist['Batch_'].tolist() == ['632', '632', '311', '601', '932', '932']
+
+
+def test_iter_exportable_hist():
+    tracked_items = make_tracked_items()
+    chunks = list(iter_exportable_hist(tracked_items, chunk_items=1))
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks), make_exportable_hist(tracked_items)
+    )
+
+
+def test_exportable_hist_to_csv(tmp_path):
+    tracked_items = make_tracked_items()
+    fpath = tmp_path / 'details.csv'
+    write_csv(iter_exportable_hist(tracked_items, chunk_items=1), fpath)
+    written = pd.read_csv(fpath, dtype=str)
+    assert written.columns.tolist() == (
+        make_exportable_hist(tracked_items).columns.tolist()
+    )
+    assert len(written) == 6
+    assert written['WaypointNo'].tolist() == ['1', '2', '3', '4', '1', '2']
+
+
+def test_collect_stock_move():
+    tracked_items = make_tracked_items()
+    tracked_items.loc['_item2', 'waypoints'].append(
+        [pd.Timestamp('2023-01-20'), '1000', 'S00', np.nan, '311', 'B2']
+    )
+    assert collect_stock_move(tracked_items, 'company') == {
+        '1000-2000': ['1000', '2000', 2],
+        '2000-1000': ['2000', '1000', 1],
+    }
+
+
+def test_stock_move_edges_levels():
+    tracked_items = make_tracked_items()
+    edges = stock_move_edges(tracked_items, 'company_sloc')
+    assert edges.values.tolist() == [
+        ['1000.NA', '1000.S00', 2],
+        ['1000.S00', '1000.S01', 2],
+        ['1000.S01', '2000.S00', 2],
+        ['2000.NA', '2000.S00', 1],
+    ]
+    # Waypoints without sold-to: stock of the company
+    edges = stock_move_edges(tracked_items, 'soldto')
+    assert edges.values.tolist() == [
+        ['S1', '1000', 2], ['1000', 'S2', 2], ['S3', '2000', 1]
+    ]
+    # Countries of companies from the entry points of items
+    edges = stock_move_edges(tracked_items, 'country')
+    assert edges.values.tolist() == [['Spain', 'France', 2]]
+    edges = stock_move_edges(
+        tracked_items, 'country', {'1000': 'ES', '2000': 'ES'}
+    )
+    assert len(edges) == 0
+    with pytest.raises(ValueError):
+        stock_move_edges(tracked_items, 'sloc')
+
+
+STOCK_MOVE = {
+    'A-B': ['A', 'B', 10],
+    'B-C': ['B', 'C', 2],
+    'C-A': ['C', 'A', 5],
+    'A-C': ['A', 'C', 1],
+}
+
+
+def test_stock_move_graph():
+    G = stock_move_graph(STOCK_MOVE, min_qty=2)
+    assert list(G.edges(data='weight')) == [
+        ('A', 'B', 10), ('B', 'C', 2), ('C', 'A', 5)
+    ]
+    G = stock_move_graph(STOCK_MOVE, top_edges=2)
+    assert list(G.edges(data='weight')) == [('A', 'B', 10), ('C', 'A', 5)]
+
+
+def test_export_stock_move_graph(tmp_path):
+    export_stock_move_graph(STOCK_MOVE, tmp_path / 'graph.graphml')
+    G = nx.read_graphml(tmp_path / 'graph.graphml')
+    assert G.number_of_edges() == 4
+    assert G.edges['A', 'B']['weight'] == 10
+    export_stock_move_graph(STOCK_MOVE, tmp_path / 'graph.csv', top_edges=1)
+    assert pd.read_csv(tmp_path / 'graph.csv').values.tolist() == [
+        ['A', 'B', 10]
+    ]
+    with pytest.raises(ValueError):
+        export_stock_move_graph(STOCK_MOVE, tmp_path / 'graph.txt')
+
+
+def test_diagram_layout_cache(tmp_path):
+    layout_cache = tmp_path / 'layouts.json'
+    fig = generate_stock_move_diagram(STOCK_MOVE, layout_cache=layout_cache)
+    plt.close(fig)
+    cache = json.loads(layout_cache.read_text())
+    assert len(cache) == 1
+    # Positions reused for the same nodes: cached ones are drawn
+    key = next(iter(cache))
+    cache[key]['A'] = [0.5, 0.5]
+    layout_cache.write_text(json.dumps(cache))
+    fig = generate_stock_move_diagram(
+        STOCK_MOVE, layout_cache=layout_cache, max_curved_edges=0
+    )
+    assert any(
+        tuple(xy) == (0.5, 0.5)
+        for collection in fig.axes[0].collections
+        for xy in collection.get_offsets().tolist()
+    )
+    plt.close(fig)
+    # Other nodes: new layout
+    fig = generate_stock_move_diagram(
+        STOCK_MOVE, top_edges=1, layout='circular', layout_cache=layout_cache
+    )
+    plt.close(fig)
+    assert len(json.loads(layout_cache.read_text())) == 2
+    with pytest.raises(ValueError):
+        generate_stock_move_diagram(STOCK_MOVE, layout='unknown')
+
+
+def test_large_diagram_spring_fallback(tmp_path):
+    stock_move = {
+        f'{i}-{i + 1}': [f'N{i}', f'N{i + 1}', 1] for i in range(600)
+    }
+    layout_cache = tmp_path / 'layouts.json'
+    fig = generate_stock_move_diagram(stock_move, layout_cache=layout_cache)
+    plt.close(fig)
+    assert next(iter(json.loads(layout_cache.read_text()))).startswith(
+        'spectral:'
+    )
@@ -80,6 +80,37 @@ def test_find_unprocessed_with_preexisting_file(tmp_path, dummy_profile):
         newfile.write('bar')
     assert dummy_profile.find_unread(tmp_path, fprefix) == [str(newfilep2)]
 
+def test_batch_checkpoint(dummy_profile):
+    dummy_profile.start_batch(['file 1', 'file 2'])
+    # Interrupted: nothing marked as read yet
+    assert dummy_profile.interrupted_batch() == ['file 1', 'file 2']
+    assert dummy_profile.user_data.fetch('read') is None
+    dummy_profile.end_batch()
+    assert dummy_profile.interrupted_batch() == []
+    assert sorted(dummy_profile.user_data.fetch('read')) == ['file 1', 'file 2']
+
+def test_import_batch(dummy_profile):
+    files = ['tests/test_data/raw_mvts2.xlsx', 'tests/test_data/raw_mvts1.xlsx']
+    parts = [dummy_profile.import_movements(fpath) for fpath in files]
+    mvts = dummy_profile.import_batch(files)
+    assert len(mvts) == sum(map(len, parts))
+    assert mvts['Posting Date'].is_monotonic_increasing
+    assert mvts.index.is_unique
+    assert isinstance(mvts['SKU'].dtype, pd.CategoricalDtype)
+    assert mvts.attrs['ingest']['rows'] == sum(
+        part.attrs['ingest']['rows'] for part in parts
+    )
+
+def test_import_cached_in_profile(dummy_profile, tmp_path):
+    fpath = tmp_path / 'raw_mvts1.xlsx'
+    shutil.copy('tests/test_data/raw_mvts1.xlsx', fpath)
+    first = dummy_profile.import_movements(str(fpath))
+    second = dummy_profile.import_movements(str(fpath))
+    assert not first.attrs['ingest']['cached']
+    assert second.attrs['ingest']['cached']
+    assert len(list(dummy_profile.ingest_cache_path.iterdir())) == 1
+    assert not (tmp_path / '.ingest_cache').exists()
+
 def test_fetch_items_nothing(dummy_profile):
     assert dummy_profile.fetch_items() is None
 
@@ -131,9 +162,85 @@ def test_report_to_excel(dummy_profile):
     expectedfp = Path('profiles/test_profile/') / 'some_report.xlsx'
     assert expectedfp.is_file()
 
+def test_save_report_format(dummy_profile):
+    somedf = pd.DataFrame({'a': [1, 2, 3], 'b': [9, 8, 7]})
+    dummy_profile.output_config['format'] = 'csv'
+    paths = dummy_profile.save_report(
+        {'summary': somedf, 'details': iter([somedf, somedf])}, 'some_report'
+    )
+    assert [path.name for path in paths] == [
+        'some_report - summary.csv', 'some_report - details.csv'
+    ]
+    assert len(pd.read_csv(paths[1])) == 6
+
 def test_save_figure(dummy_profile):
     fig, ax = plt.subplots(nrows=1, ncols=1, figsize=(3, 3))
     ax.set_title(f'Some title')
     dummy_profile.save_figure(fig, 'some_figure')
     expectedfp = Path('profiles/test_profile/') / 'some_figure.png'
     assert expectedfp.is_file()
+
+def test_partitioned_store_tracks_open_items_only(dummy_profile):
+    from product_trailer.item_store import PartitionedItemStore
+    dummy_profile.item_store = PartitionedItemStore(
+        dummy_profile.data_path / 'items', dummy_profile.storage
+    )
+    itemdb = pd.DataFrame(
+        {
+            'ini_country': ['c1', 'c2'],
+            'sku': ['s1', 's2'],
+            'qty': [1, 2],
+            'open': [True, False],
+            'waypoints': [[[pd.NaT, 'c', 's', 'st', '', 'b']]] * 2,
+            'unit_value': [1.0, 2.0],
+            'brand': ['b1', 'b2'],
+            'category': ['c1', 'c2'],
+        },
+        index=['_id1', '_id2']
+    )
+    dummy_profile.incr_run_count()
+    dummy_profile.save_items(itemdb)
+    assert (
+        list(dummy_profile.fetch_items_to_track().index) == ['_id1']
+        and list(dummy_profile.fetch_items().index) == ['_id2', '_id1']
+    )
+
+def test_fetch_items_projection(dummy_profile):
+    itemdbp = (
+        dummy_profile.data_path
+        / (dummy_profile.db_config['fname_items'] + '42')
+    )
+    itemdb = pd.DataFrame({'a': [1, 2, 3], 'b': [9, 8, 7]})
+    itemdb.to_pickle(itemdbp)
+    assert dummy_profile.fetch_items(
+        columns=['b'], filters=[('a', '>=', 2)]
+    ).equals(itemdb.loc[[1, 2], ['b']])
+
+def test_migrate_storage(dummy_profile):
+    pytest.importorskip('pyarrow')
+    from product_trailer.storage import get_backend
+    itemdb = pd.DataFrame(
+        {
+            'ini_country': ['c1'],
+            'sku': ['s1'],
+            'qty': [1],
+            'open': [True],
+            'waypoints': [[[pd.NaT, 'c', 's', 'st', '', 'b']]],
+            'unit_value': [1.0],
+            'brand': ['b1'],
+            'category': ['c1'],
+        },
+        index=['_id1']
+    )
+    itemdb.to_pickle(
+        dummy_profile.data_path
+        / (dummy_profile.db_config['fname_items'] + '1.pkl')
+    )
+    dummy_profile.storage = get_backend('parquet')
+    migrated = dummy_profile.migrate_storage()
+    assert (
+        len(migrated) == 1
+        and (dummy_profile.data_path / 'pickle_backup' / migrated[0].name).is_file()
+        and repr(dummy_profile.fetch_items()['waypoints'].to_list())
+        == repr(itemdb['waypoints'].to_list())
+    )
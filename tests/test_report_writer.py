@@ -0,0 +1,113 @@
+import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from product_trailer.postprocessing_tk import (
+    iter_exportable_hist,
+    make_exportable_hist,
+)
+from product_trailer.report_writer import write_excel, write_report
+
+
+def make_table(n_rows=10):
+    return pd.DataFrame({
+        'id': [f'_item{i}' for i in range(n_rows)],
+        'qty': np.arange(n_rows),
+        'open': [True, False, np.nan, True, False] * (n_rows // 5),
+        'value': np.where(np.arange(n_rows) % 3 == 0, np.nan, 1.5),
+        'date': pd.to_datetime(['2023-01-02', None] * (n_rows // 2)),
+        'duration': pd.to_timedelta(np.arange(n_rows), unit='D'),
+    })
+
+
+def chunks(table, size):
+    for start in range(0, len(table), size):
+        yield table.iloc[start:start + size]
+
+
+def test_streaming_as_pandas(tmp_path):
+    table = make_table()
+    write_report({'details': table}, tmp_path / 'pandas', excel_writer='pandas')
+    write_report({'details': chunks(table, 3)}, tmp_path / 'streaming')
+    pd.testing.assert_frame_equal(
+        pd.read_excel(tmp_path / 'streaming.xlsx', sheet_name='details'),
+        pd.read_excel(tmp_path / 'pandas.xlsx', sheet_name='details')
+    )
+
+
+def test_number_formats_as_pandas(tmp_path):
+    table = pd.DataFrame({
+        'datetime': pd.to_datetime(['2023-01-02 03:04:05', None]),
+        'mixed': [datetime.date(2023, 1, 2), pd.Timestamp('2023-01-02')],
+        'duration': [datetime.timedelta(days=1.5), 'text'],
+    })
+    write_report(table, tmp_path / 'pandas', excel_writer='pandas')
+    write_report(table, tmp_path / 'streaming')
+    cells = [
+        [
+            (cell.value, cell.number_format)
+            for row in openpyxl.load_workbook(fpath).active.iter_rows()
+            for cell in row
+        ]
+        for fpath in [tmp_path / 'pandas.xlsx', tmp_path / 'streaming.xlsx']
+    ]
+    assert cells[1] == cells[0]
+
+
+def test_empty_details_header(tmp_path):
+    no_items = pd.DataFrame(columns=[
+        'ini_country', 'sku', 'qty', 'open', 'waypoints', 'unit_value',
+        'brand', 'category'
+    ])
+    for excel_writer in ['pandas', 'streaming']:
+        fpath = tmp_path / excel_writer
+        write_report({'details': iter_exportable_hist(no_items)}, fpath,
+                     excel_writer=excel_writer)
+        written = pd.read_excel(fpath.with_suffix('.xlsx'), sheet_name='details')
+        assert written.columns.tolist() == (
+            make_exportable_hist(no_items).columns.tolist()
+        )
+
+
+def test_sheets_split(tmp_path):
+    table = make_table()
+    fpath = tmp_path / 'report.xlsx'
+    write_excel(
+        {'summary': table, 'details': chunks(table, 3)}, fpath, max_rows=5
+    )
+    sheets = pd.read_excel(fpath, sheet_name=None)
+    assert list(sheets) == [
+        'summary_1', 'summary_2', 'summary_3',
+        'details_1', 'details_2', 'details_3'
+    ]
+    assert [len(sheet) for sheet in sheets.values()] == [4, 4, 2, 4, 4, 2]
+    pages = list(sheets.values())
+    pd.testing.assert_frame_equal(
+        pd.concat(pages[3:], ignore_index=True),
+        pd.concat(pages[:3], ignore_index=True)
+    )
+
+
+def test_csv_parquet(tmp_path):
+    table = make_table()
+    paths = write_report(
+        {'summary': table, 'details': chunks(table, 4)}, tmp_path / 'r', 'csv'
+    )
+    assert [path.name for path in paths] == ['r - summary.csv', 'r - details.csv']
+    assert len(pd.read_csv(paths[1])) == 10
+
+    paths = write_report(chunks(table, 4), tmp_path / 'r', 'parquet')
+    assert [path.name for path in paths] == ['r.parquet']
+    written = pd.read_parquet(paths[0])
+    pd.testing.assert_frame_equal(
+        written.drop(columns='open'), table.drop(columns='open')
+    )
+    assert written['open'].tolist()[:3] == [True, False, None]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_report(make_table(), tmp_path / 'r', 'json')
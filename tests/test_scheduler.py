@@ -5,6 +5,7 @@ Tests on Scheduler class.
 from pathlib import Path
 import shutil
 
+import pandas as pd
 import pytest
 
 from product_trailer.profile import Profile
@@ -47,6 +48,18 @@ class Test_extract_items:
             and (list(dummy_extract.select_dtypes('object').columns) == ['waypoints'])
         )
 
+    def test__extract_items_id_from_first_waypoint(self, dummy_extract):
+        assert all(
+            ID == (
+                f"_{wpts[0][1]}/{wpts[0][2]}/{wpts[0][3][4:11]}_"
+                + f"{wpts[0][4]}/{wpts[0][0]:%Y-%m-%d}_{sku}:{wpts[0][5]}"
+            )
+            for ID, sku, wpts in zip(
+                dummy_extract.index, dummy_extract['sku'],
+                dummy_extract['waypoints']
+            )
+        )
+
 
 @pytest.fixture(scope='module')
 def dummy_mvts():
@@ -68,7 +81,10 @@ class Test_prep_mvt:
         assert (
             (
                 list(dummy_mvts.select_dtypes('category').columns)
-                == ['Company', 'PO', 'Mvt Code', 'SLOC', 'Sold to', 'SKU']
+                == [
+                    'Company', 'PO', 'Mvt Code', 'SLOC', 'Sold to', 'SKU',
+                    'Company_SLOC_Batch'
+                ]
             )
             and (
                 list(dummy_mvts.select_dtypes('datetime').columns)
@@ -76,10 +92,150 @@ class Test_prep_mvt:
             )
             and (
                 list(dummy_mvts.select_dtypes('object').columns)
-                == ['Document', 'Batch', 'Items_Allocated', 'Company_SLOC_Batch']
+                == ['Document', 'Batch']
             )
             and (
                 list(dummy_mvts.select_dtypes('number').columns)
                 == ['QTY', 'QTY_Unallocated']
             )
         )
+
+
+    def test_prep_mvt_composite_key(self, dummy_mvts):
+        assert (
+            list(dummy_mvts['Company_SLOC_Batch'].astype(object))
+            == list(
+                dummy_mvts['Company'].astype(str) + '-'
+                + dummy_mvts['SLOC'].astype(str) + '-' + dummy_mvts['Batch']
+            )
+        )
+
+
+@pytest.fixture(scope='module')
+def dummy_profile():
+    profile_name = 'test_profile_scheduler4'
+    profile_path = Path('profiles') / profile_name
+    testprofile = Profile(profile_name)
+    yield testprofile
+    shutil.rmtree(profile_path)
+
+class Test_run:
+    def test_run_parallel_same_as_serial(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        results = []
+        for workers in [1, 2]:
+            dummy_profile.scheduler_config['workers'] = workers
+            scheduler = Scheduler(dummy_profile)
+            scheduler.prepare(imported)
+            all_items = scheduler.run()[0].to_frame()
+            # NaN in waypoints only compares equal to itself: compare repr
+            results.append(all_items.assign(waypoints=all_items['waypoints'].apply(repr)))
+        assert results[0].equals(results[1])
+
+
+class Test_incremental:
+    def test_same_items_as_full_run(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        dummy_profile.scheduler_config['workers'] = 1
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        dummy_profile.incr_run_count()
+        dummy_profile.save_items(scheduler.run()[0])
+
+        # No new movement for the items of one SKU
+        sku = imported['SKU'].iloc[0]
+        new_mvts = imported.loc[imported['SKU'] != sku]
+        results = []
+        for incremental in [False, True]:
+            dummy_profile.scheduler_config['incremental'] = incremental
+            scheduler = Scheduler(dummy_profile)
+            report = scheduler.prepare(new_mvts)
+            all_items = scheduler.run()[0].to_frame().sort_index()
+            results.append(all_items.assign(waypoints=all_items['waypoints'].apply(repr)))
+        dummy_profile.scheduler_config['incremental'] = False
+        assert sku not in scheduler.tasklist
+        assert ' 0 skipped' not in report['incremental']
+        assert results[0].equals(results[1])
+
+
+class Test_resume:
+    def test_resume_same_as_full_run(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        dummy_profile.scheduler_config['workers'] = 1
+        dummy_profile.scheduler_config['checkpoint_interval'] = 1e-9
+        dummy_profile.start_batch(['raw_mvts2.xlsx'])
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        expected = scheduler.run()[0].to_frame()
+
+        # Interrupted after the first task: later parts are lost
+        parts = sorted(dummy_profile.checkpoint_path.glob('part-*.pkl'))
+        for part in parts[1:]:
+            part.unlink()
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        resumed = scheduler.run(resume=True)[0].to_frame()
+        dummy_profile.end_batch()
+        dummy_profile.scheduler_config['checkpoint_interval'] = 0
+
+        assert len(parts) == len(scheduler.tasklist) > 1
+        assert scheduler.num_resumed == 1
+        assert not dummy_profile.checkpoint_path.exists()
+        assert (
+            resumed.assign(waypoints=resumed['waypoints'].apply(repr))
+            .equals(expected.assign(waypoints=expected['waypoints'].apply(repr)))
+        )
+
+    def test_other_plan_not_resumed(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        dummy_profile.scheduler_config['workers'] = 1
+        dummy_profile.scheduler_config['checkpoint_interval'] = 1e-9
+        dummy_profile.start_batch(['raw_mvts2.xlsx'])
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        scheduler.run()
+
+        # Same batch, SKUs now split into parts
+        dummy_profile.scheduler_config['split_cost'] = 1
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        scheduler.run(resume=True)
+        dummy_profile.end_batch()
+        dummy_profile.scheduler_config['split_cost'] = 0
+        dummy_profile.scheduler_config['checkpoint_interval'] = 0
+
+        assert len(scheduler.parts) > 0
+        assert scheduler.num_resumed == 0
+
+
+class Test_split:
+    def test_split_same_as_whole(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        dummy_profile.scheduler_config['workers'] = 1
+        dummy_profile.db_config['save_movements'] = True
+        results = []
+        for split_cost in [0, 1]:
+            dummy_profile.scheduler_config['split_cost'] = split_cost
+            scheduler = Scheduler(dummy_profile)
+            scheduler.prepare(imported)
+            all_items, mvts_done = scheduler.run()
+            all_items = all_items.to_frame()
+            results.append((
+                all_items.assign(waypoints=all_items['waypoints'].apply(repr)),
+                pd.concat(mvts_done).assign(Items_Allocated=lambda df: (
+                    df['Items_Allocated'].apply(sorted).apply(repr)
+                ))
+            ))
+        dummy_profile.scheduler_config['split_cost'] = 0
+        dummy_profile.db_config['save_movements'] = False
+        assert len(scheduler.parts) > 0
+        assert len(scheduler.tasks) > len(scheduler.tasklist)
+        assert results[0][0].equals(results[1][0])
+        assert results[0][1].equals(results[1][1])
+
+    def test_largest_first(self, dummy_profile):
+        imported = dummy_profile.import_movements('tests/test_data/raw_mvts2.xlsx')
+        scheduler = Scheduler(dummy_profile)
+        scheduler.prepare(imported)
+        costs = [scheduler.costs[task] for task in scheduler.tasks]
+        assert costs == sorted(costs, reverse=True)
@@ -0,0 +1,62 @@
+""" test_storage.py
+Tests on storage backends.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from product_trailer.storage import get_backend, filter_mask
+
+
+@pytest.fixture(params=['pickle', 'parquet'])
+def backend(request):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return get_backend(request.param)
+
+@pytest.fixture
+def dummy_mvts():
+    return pd.DataFrame(
+        {
+            'SKU': pd.Categorical(['s1', 's1', 's2']),
+            'Posting Date': pd.to_datetime(['2023-01-01', pd.NaT, '2023-01-03']),
+            'QTY': [-1, 2, -3],
+            'Sold to': ['0000111', np.nan, '0000222'],
+            'Items_Allocated': [set(), {'_id1', '_id2'}, {'_id3'}],
+        },
+        index=[10, 11, 12]
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend('csv')
+
+def test_roundtrip(tmp_path, backend, dummy_mvts):
+    fpath = tmp_path / ('mvts' + backend.SUFFIX)
+    backend.write(dummy_mvts, fpath)
+    read = backend.read(fpath)
+    assert (
+        read.drop(columns=['Items_Allocated'])
+        .equals(dummy_mvts.drop(columns=['Items_Allocated']))
+        and read['Items_Allocated'].to_list()
+        == dummy_mvts['Items_Allocated'].to_list()
+    )
+
+def test_read_projection_and_filters(tmp_path, backend, dummy_mvts):
+    fpath = tmp_path / ('mvts' + backend.SUFFIX)
+    backend.write(dummy_mvts, fpath)
+    read = backend.read(
+        fpath, columns=['SKU', 'QTY'], filters=[('QTY', '<', 0)]
+    )
+    assert (
+        list(read.columns) == ['SKU', 'QTY']
+        and list(read.index) == [10, 12]
+    )
+
+def test_filter_mask(dummy_mvts):
+    mask = filter_mask(
+        dummy_mvts, [('SKU', 'in', ['s1']), ('QTY', '!=', 2)]
+    )
+    assert list(mask) == [True, False, False]
@@ -0,0 +1,31 @@
+""" test_workload.py
+Tests on task cost estimates and splitting of tasks.
+"""
+
+import numpy as np
+
+from product_trailer.workload import split_task, task_cost
+
+
+def test_task_cost():
+    assert task_cost(10, 3) == 30
+    assert task_cost(10, 0) == 10
+
+def test_split_by_components():
+    mvt_comps = np.array([5, 5, 7, 5, 9, 7])
+    item_comps = np.array([7, 5, -1, 9])
+    parts = split_task(mvt_comps, item_comps, 1)
+    assert [list(mvt_pos) for mvt_pos, _ in parts] == [[0, 1, 3], [2, 5], [4]]
+    # Items no movement can reach go with the largest component
+    assert [list(item_pos) for _, item_pos in parts] == [[1, 2], [0], [3]]
+
+def test_components_balanced():
+    mvt_comps = np.array([1, 1, 1, 1, 2, 2, 3, 3, 4])
+    parts = split_task(mvt_comps, np.array([1, 2, 3, 4]), 20)
+    assert [list(mvt_pos) for mvt_pos, _ in parts] == [[0, 1, 2, 3, 8], [4, 5, 6, 7]]
+
+def test_not_split_under_max_cost():
+    parts = split_task(np.array([5, 5, 7]), np.array([5, 7]), 100)
+    assert len(parts) == 1
+    assert list(parts[0][0]) == [0, 1, 2]
+    assert list(parts[0][1]) == [0, 1]